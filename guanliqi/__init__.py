@@ -5,9 +5,14 @@ ComfyUI 节点管理器插件
 
 import os
 import json
+import asyncio
+import atexit
+import hashlib
 import logging
 import subprocess
 import sys
+import time
+from contextlib import asynccontextmanager, contextmanager
 from aiohttp import web
 import server
 
@@ -31,59 +36,200 @@ os.makedirs(MANAGED_PLUGINS_DIR, exist_ok=True)
 # 配置日志
 logger = logging.getLogger(PLUGIN_NAME)
 
-# 自动迁移旧配置文件
-OLD_CONFIG_FILE = os.path.join(PLUGIN_DIR, "config.json")
-if os.path.exists(OLD_CONFIG_FILE) and not os.path.exists(CONFIG_FILE):
-    try:
-        import shutil
-        shutil.move(OLD_CONFIG_FILE, CONFIG_FILE)
-        logger.info(f"✓ 已将配置文件迁移到: {CONFIG_FILE}")
-    except Exception as e:
-        logger.warning(f"配置文件迁移失败: {e}")
 
+# ========== 启动耗时统计 ==========
+# 导入阶段的各步骤和每个托管插件的导入都用 perf_counter 计时，结果保存在内存中，
+# 由 /node-manager/debug/startup 查看；设置 NODE_MANAGER_STARTUP_HISTORY=1 时每次启动追加一行到历史文件
+STARTUP_HISTORY_ENABLED = os.environ.get('NODE_MANAGER_STARTUP_HISTORY', '').strip().lower() in ('1', 'true', 'yes', 'on')
+STARTUP_HISTORY_FILE = os.path.join(DATA_DIR, "startup_history.jsonl")
+
+_startup_began = time.perf_counter()
+startup_report = {
+    'started_at': None,
+    'total_ms': None,
+    'phases': [],            # [{name, ms}]，按执行顺序
+    'managed_plugins': [],   # [{name, ms, node_count, success}]
+    'background': []         # 启动后后台任务的耗时 [{name, ms}]
+}
 
-# ========== 自动安装依赖 ==========
-def install_package(package_name):
-    """自动安装Python包"""
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+@contextmanager
+def startup_phase(name, target='phases'):
+    """记录一个启动阶段的耗时：with startup_phase('名称'): ..."""
+    start = time.perf_counter()
     try:
-        logger.info(f"正在安装依赖包: {package_name}")
-        subprocess.check_call(
-            [sys.executable, "-m", "pip", "install", package_name],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        logger.info(f"✓ 依赖包安装成功: {package_name}")
-        return True
-    except Exception as e:
-        logger.error(f"✗ 依赖包安装失败: {package_name}, 错误: {e}")
-        return False
+        yield
+    finally:
+        startup_report[target].append({'name': name, 'ms': _elapsed_ms(start)})
 
 
-def check_and_install_dependencies():
-    """检查并安装必要的依赖"""
-    dependencies = ['pypinyin']
+def finish_startup_report():
+    """导入结束时汇总耗时，按需追加到历史文件"""
+    from datetime import datetime
+    startup_report['started_at'] = datetime.now().isoformat(timespec='seconds')
+    startup_report['total_ms'] = _elapsed_ms(_startup_began)
+    slowest = sorted(startup_report['phases'], key=lambda phase: phase['ms'], reverse=True)[:3]
+    logger.info(f"启动耗时 {startup_report['total_ms']:.1f}ms，最慢的阶段: "
+                + ', '.join(f"{phase['name']} {phase['ms']:.1f}ms" for phase in slowest))
     
-    for package in dependencies:
+    if STARTUP_HISTORY_ENABLED:
+        import platform
+        entry = {
+            'started_at': startup_report['started_at'],
+            'host': platform.node(),
+            'python': platform.python_version(),
+            'total_ms': startup_report['total_ms'],
+            'phases': {phase['name']: phase['ms'] for phase in startup_report['phases']},
+            'managed_plugins': {plugin['name']: plugin['ms'] for plugin in startup_report['managed_plugins']}
+        }
+        try:
+            with open(STARTUP_HISTORY_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        except Exception as e:
+            logger.warning(f"写入启动历史失败: {e}")
+
+
+def read_startup_history(limit):
+    """读取最近 limit 次启动的记录"""
+    if not os.path.exists(STARTUP_HISTORY_FILE):
+        return []
+    from collections import deque
+    entries = deque(maxlen=limit)
+    with open(STARTUP_HISTORY_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    return list(entries)
+
+
+# 自动迁移旧配置文件
+with startup_phase('config_migration'):
+    OLD_CONFIG_FILE = os.path.join(PLUGIN_DIR, "config.json")
+    if os.path.exists(OLD_CONFIG_FILE) and not os.path.exists(CONFIG_FILE):
+        try:
+            import shutil
+            shutil.move(OLD_CONFIG_FILE, CONFIG_FILE)
+            logger.info(f"✓ 已将配置文件迁移到: {CONFIG_FILE}")
+        except Exception as e:
+            logger.warning(f"配置文件迁移失败: {e}")
+
+
+# ========== 可选依赖 ==========
+# 可选依赖在首次使用时才导入，导入模块时不做任何安装；
+# 默认不自动安装（受限环境中 pip 可能卡住），缺失的依赖通过 POST /node-manager/dependencies/install 手动安装；
+# 设置 NODE_MANAGER_AUTO_INSTALL=1 后，服务启动时由后台任务安装标记为 auto_install 的依赖
+AUTO_INSTALL_DEPENDENCIES = os.environ.get('NODE_MANAGER_AUTO_INSTALL', '0').strip().lower() in ('1', 'true', 'yes', 'on')
+DEPENDENCY_INSTALL_TIMEOUT = 300
+
+# 模块名 -> pip 包名、对应功能、是否自动安装
+OPTIONAL_DEPENDENCIES = {
+    'pypinyin': {'package': 'pypinyin', 'feature': '拼音搜索', 'auto_install': True},
+    'orjson': {'package': 'orjson', 'feature': '快速 JSON 序列化', 'auto_install': False},
+    'brotli': {'package': 'brotli', 'feature': 'brotli 响应压缩', 'auto_install': False},
+}
+
+# 模块名 -> 已导入的模块（导入失败为 None）
+_optional_modules = {}
+# 模块名 -> 进行中的安装任务（并发的安装请求共享同一次安装）
+_install_tasks = {}
+
+
+def import_optional(name):
+    """导入可选依赖，失败时返回 None；结果会被缓存，安装成功后重新尝试"""
+    if name not in _optional_modules:
+        import importlib
         try:
-            __import__(package)
-            logger.info(f"✓ 依赖包已存在: {package}")
+            _optional_modules[name] = importlib.import_module(name)
         except ImportError:
-            logger.warning(f"⚠ 依赖包缺失: {package}，开始自动安装...")
-            if not install_package(package):
-                logger.error(f"✗ 无法安装 {package}，拼音搜索功能可能不可用")
+            _optional_modules[name] = None
+    return _optional_modules[name]
+
+
+def pypinyin_available():
+    return import_optional('pypinyin') is not None
+
+
+def get_dependency_status():
+    """各可选依赖的可用状态"""
+    return [
+        {
+            'name': name,
+            'package': info['package'],
+            'feature': info['feature'],
+            'available': import_optional(name) is not None,
+            'installing': name in _install_tasks
+        }
+        for name, info in OPTIONAL_DEPENDENCIES.items()
+    ]
+
+
+async def _run_pip_install(name):
+    package = OPTIONAL_DEPENDENCIES[name]['package']
+    logger.info(f"正在安装依赖包: {package}")
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, '-m', 'pip', 'install', package,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=DEPENDENCY_INSTALL_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        logger.error(f"✗ 依赖包安装超时: {package}")
+        return False, '安装超时'
+    
+    if process.returncode != 0:
+        error_msg = stderr.decode('utf-8', errors='ignore')
+        logger.error(f"✗ 依赖包安装失败: {package}, 错误: {error_msg[-500:]}")
+        return False, error_msg[-200:]
+    
+    import importlib
+    importlib.invalidate_caches()
+    _optional_modules.pop(name, None)
+    if import_optional(name) is None:
+        return False, '安装完成但无法导入'
+    
+    logger.info(f"✓ 依赖包安装成功: {package}")
+    if name == 'pypinyin':
+        # 拼音可用后重建依赖拼音的索引
+        start_background_task(rebuild_pinyin_indexes())
+    return True, None
 
 
-# 检查并安装依赖
-check_and_install_dependencies()
+async def install_optional_dependency(name):
+    """安装可选依赖，返回 (是否成功, 错误信息)"""
+    if import_optional(name) is not None:
+        return True, None
+    task = _install_tasks.get(name)
+    if task is None:
+        task = asyncio.get_running_loop().create_task(_run_pip_install(name))
+        _install_tasks[name] = task
+        task.add_done_callback(lambda _: _install_tasks.pop(name, None))
+    return await task
 
-# 导入pypinyin（如果安装成功）
-try:
-    from pypinyin import lazy_pinyin, Style
-    PYPINYIN_AVAILABLE = True
-    logger.info("✓ pypinyin 加载成功，拼音搜索功能已启用")
-except ImportError:
-    PYPINYIN_AVAILABLE = False
-    logger.warning("⚠ pypinyin 不可用，拼音搜索功能已禁用")
+
+async def auto_install_dependencies():
+    """后台任务：安装缺失的自动安装依赖"""
+    for name, info in OPTIONAL_DEPENDENCIES.items():
+        if not info['auto_install'] or import_optional(name) is not None:
+            continue
+        logger.warning(f"⚠ 依赖包缺失: {info['package']}，在后台安装（{info['feature']}）...")
+        try:
+            success, _ = await install_optional_dependency(name)
+        except Exception as e:
+            logger.error(f"✗ 依赖包安装失败: {info['package']}, 错误: {e}")
+            success = False
+        if not success:
+            logger.error(f"✗ 无法安装 {info['package']}，{info['feature']}功能不可用")
 
 
 # ========== 动态加载 managed_plugins 目录下的节点 ==========
@@ -120,10 +266,14 @@ def load_managed_plugins():
                 logger.warning(f"跳过插件（缺少__init__.py）: {plugin_name}")
                 continue
             
+            import_started = time.perf_counter()
+            plugin_timing = {'name': plugin_name, 'ms': None, 'node_count': 0, 'success': False}
+            startup_report['managed_plugins'].append(plugin_timing)
             try:
                 # 动态导入插件模块
                 logger.info(f"正在加载插件: {plugin_name}")
                 module = importlib.import_module(plugin_name)
+                plugin_timing['success'] = True
                 
                 # 获取节点映射
                 if hasattr(module, 'NODE_CLASS_MAPPINGS'):
@@ -137,6 +287,7 @@ def load_managed_plugins():
                     
                     loaded_count += 1
                     node_count += len(plugin_mappings)
+                    plugin_timing['node_count'] = len(plugin_mappings)
                     logger.info(f"✓ 已加载插件 [{plugin_name}]，包含 {len(plugin_mappings)} 个节点")
                 else:
                     logger.warning(f"插件 [{plugin_name}] 没有导出 NODE_CLASS_MAPPINGS")
@@ -146,6 +297,8 @@ def load_managed_plugins():
                 import traceback
                 traceback.print_exc()
                 continue
+            finally:
+                plugin_timing['ms'] = _elapsed_ms(import_started)
     
     except Exception as e:
         logger.error(f"扫描插件目录失败: {e}")
@@ -157,115 +310,413 @@ def load_managed_plugins():
 
 
 # 在模块导入时立即加载托管插件
-load_managed_plugins()
+with startup_phase('load_managed_plugins'):
+    load_managed_plugins()
+
+
+# ========== 文件写入 ==========
+def write_file_atomic(path, data):
+    """
+    原子写入文件：先写同目录下的临时文件，再用 os.replace 替换
+    进程崩溃时只会留下完整的旧文件或新文件
+    """
+    import tempfile
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
 
 
 # ========== 建立模块名到文件夹名的映射 ==========
+# 扫描逻辑在 module_mapping.py 中：只扫描 import 语句，
+# 结果按 (路径, mtime, 大小) 缓存在 data/ 中，启动时只重新扫描新增或修改过的插件
+# 设置 NODE_MANAGER_MODULE_MAP_FOLLOW=1 可额外跟随 __init__.py 直接导入的包内模块（更准确，但冷启动更慢）
+MODULE_MAP_CACHE_FILE = os.path.join(DATA_DIR, "module_map_cache.json")
+MODULE_MAP_FOLLOW_LOCAL = os.environ.get('NODE_MANAGER_MODULE_MAP_FOLLOW', '0').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
 def build_module_to_folder_mapping():
     """
     扫描 custom_nodes 目录，建立模块名到文件夹名的映射
     用于处理文件夹名和模块名不一致的情况（如 bizyair -> bizyengine）
     """
-    module_to_folder = {}
+    from . import module_mapping
     
     # 获取 ComfyUI 的 custom_nodes 目录
     custom_nodes_dir = os.path.dirname(PLUGIN_DIR)
     
-    if not os.path.exists(custom_nodes_dir):
-        return module_to_folder
-    
-    try:
-        import ast
-        
-        for folder_name in os.listdir(custom_nodes_dir):
-            folder_path = os.path.join(custom_nodes_dir, folder_name)
-            
-            # 跳过非目录、隐藏文件夹和当前插件
-            if not os.path.isdir(folder_path) or folder_name.startswith('.') or folder_name == '__pycache__':
-                continue
-            
-            # 检查 __init__.py
-            init_file = os.path.join(folder_path, '__init__.py')
-            if not os.path.exists(init_file):
-                continue
-            
-            try:
-                # 读取 __init__.py 分析导入语句
-                with open(init_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 尝试解析 AST
-                try:
-                    tree = ast.parse(content)
-                    for node in ast.walk(tree):
-                        # 查找 from xxx import 语句
-                        if isinstance(node, ast.ImportFrom):
-                            if node.module:
-                                # 提取顶层模块名
-                                top_module = node.module.split('.')[0]
-                                # 如果不是相对导入
-                                if not top_module.startswith('.'):
-                                    module_to_folder[top_module] = folder_name
-                        # 查找 import xxx 语句
-                        elif isinstance(node, ast.Import):
-                            for alias in node.names:
-                                top_module = alias.name.split('.')[0]
-                                module_to_folder[top_module] = folder_name
-                except:
-                    # 如果 AST 解析失败，使用简单的文本匹配
-                    import re
-                    # 匹配 from xxx import
-                    from_imports = re.findall(r'from\s+([a-zA-Z_][a-zA-Z0-9_]*)', content)
-                    for module in from_imports:
-                        if module and not module.startswith('.'):
-                            module_to_folder[module] = folder_name
-                    
-                    # 匹配 import xxx
-                    imports = re.findall(r'^import\s+([a-zA-Z_][a-zA-Z0-9_]*)', content, re.MULTILINE)
-                    for module in imports:
-                        if module:
-                            module_to_folder[module] = folder_name
-                
-            except Exception as e:
-                logger.debug(f"分析插件 {folder_name} 时出错: {e}")
-                continue
-    
-    except Exception as e:
-        logger.error(f"建立模块映射时出错: {e}")
+    module_to_folder, stats = module_mapping.build_module_to_folder_mapping(
+        custom_nodes_dir,
+        cache_file=MODULE_MAP_CACHE_FILE,
+        follow_local=MODULE_MAP_FOLLOW_LOCAL,
+        write_file=write_file_atomic
+    )
     
-    logger.info(f"建立模块映射完成，共 {len(module_to_folder)} 个映射")
+    logger.info(f"建立模块映射完成，共 {len(module_to_folder)} 个映射（重新解析 {stats['parsed']}/{stats['plugins']} 个插件）")
     return module_to_folder
 
 
 # 全局模块映射表
-MODULE_TO_FOLDER_MAP = build_module_to_folder_mapping()
+with startup_phase('module_to_folder_mapping'):
+    MODULE_TO_FOLDER_MAP = build_module_to_folder_mapping()
 
 
-def load_config():
-    """加载配置文件"""
-    if os.path.exists(CONFIG_FILE):
+# ========== GitHub 仓库地址 ==========
+# 插件库、stars 和 SQLite 存储都以 'owner/repo' 作为仓库键
+GITHUB_URL_PREFIXES = ('https://github.com/', 'http://github.com/', 'https://www.github.com/')
+
+
+def _split_repo_path(path):
+    """'owner/repo[.git][/...]' -> 'owner/repo'，格式不对时返回 None"""
+    parts = path.split('?')[0].split('#')[0].strip('/').split('/')
+    if len(parts) < 2:
+        return None
+    owner, repo = parts[0], parts[1]
+    # 只去掉末尾的 .git（rstrip('.git') 会把以 g/i/t 结尾的仓库名也截掉）
+    if repo.endswith('.git'):
+        repo = repo[:-4]
+    if not owner or not repo:
+        return None
+    return f"{owner}/{repo}"
+
+
+def github_repo_key(url):
+    """GitHub 仓库地址 -> 'owner/repo'（忽略末尾的 / 和 .git 以及仓库之后的路径），不是 GitHub 地址时返回 None"""
+    url = (url or '').strip()
+    for prefix in GITHUB_URL_PREFIXES:
+        if url.lower().startswith(prefix):
+            return _split_repo_path(url[len(prefix):])
+    return None
+
+
+def normalize_repo_key(value):
+    """仓库地址或 'owner/repo' -> 'owner/repo'（github-stats.json 和前端传来的键可能是任一种形式）"""
+    value = (value or '').strip()
+    if '://' in value:
+        return github_repo_key(value)
+    return _split_repo_path(value)
+
+
+# ========== 存储后端 ==========
+# 默认使用 data/ 下的 JSON 文件；设置环境变量 NODE_MANAGER_STORAGE=sqlite 后改用 SQLite (WAL)：
+# 文件夹、文件夹节点、自定义名称、插件目录和 stars 各占一张表，修改时只写入变化的行
+STORAGE_BACKEND = os.environ.get('NODE_MANAGER_STORAGE', 'json').strip().lower()
+SQLITE_DB_FILE = os.path.join(DATA_DIR, "node_manager.db")
+
+
+class JsonStorage:
+    """JSON 文件存储：配置和插件数据库各为一个文件，每次整体原子写入"""
+
+    name = 'json'
+
+    def __init__(self, config_path, plugins_db_path):
+        self.config_path = config_path
+        self.plugins_db_path = plugins_db_path
+
+    def read_config(self):
+        """读取配置，不存在时返回 None"""
+        if not os.path.exists(self.config_path):
+            return None
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def snapshot_config(self, config):
+        """生成配置快照（在事件循环线程中调用，之后由 write_config 在线程池中写入）"""
+        return json.dumps(config, ensure_ascii=False, indent=2).encode('utf-8')
+
+    def write_config(self, snapshot):
+        write_file_atomic(self.config_path, snapshot)
+
+    def load_plugins_database(self, fields=None):
+        """读取插件数据库，fields 指定只返回其中的部分字段"""
+        if not os.path.exists(self.plugins_db_path):
+            return None
+        with open(self.plugins_db_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if fields is not None:
+            data = {key: data[key] for key in fields if key in data}
+        return data
+
+    def save_plugins_database(self, data, partial=False):
+        """保存插件数据库；partial=True 时只更新 data 中出现的字段"""
+        if partial:
+            current = self.load_plugins_database() or {}
+            current.update(data)
+            data = current
+        write_file_atomic(self.plugins_db_path, json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def close(self):
+        pass
+
+
+def _dump_row(value):
+    """单行数据的序列化（紧凑格式，相同内容得到相同文本，便于比较是否变化）"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class SqliteStorage:
+    """
+    SQLite 存储（WAL 模式）
+    - 配置拆成 folders / folder_nodes / node_custom_names / config_values 四张键值表
+    - 插件数据库拆成 catalog_plugins / stars / catalog_meta 三张表；
+      catalog_plugins 以仓库键为主键、position 列记录顺序，上游插入新插件时只写新行和顺序变化的行
+    - 记住上次写入的各行内容，保存时只 upsert 变化的行、删除消失的行
+    - 首次运行时导入已有的 config.json 和 plugins_database.json（原文件保留）
+    """
+
+    name = 'sqlite'
+
+    # 配置中按行存储的字段 -> 表名；其余顶层字段逐项存入 config_values
+    CONFIG_TABLES = {
+        'folders': 'folders',
+        'folderNodes': 'folder_nodes',
+        'nodeCustomNames': 'node_custom_names',
+    }
+    KV_TABLES = ('folders', 'folder_nodes', 'node_custom_names', 'config_values', 'catalog_meta', 'meta')
+
+    def __init__(self, db_path, config_path=None, plugins_db_path=None):
+        import sqlite3
+        import threading
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        # 写入在线程池中进行，连接由锁串行化
+        self._db_lock = threading.Lock()
+        # 上次写入（或读出）的行内容 {表名: {键: 文本}}，缺少的表在首次使用时从数据库加载
+        self._rows = {}
+        with self._db_lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            for table in self.KV_TABLES:
+                self._conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self._migrate_catalog_plugins()
+            self._conn.execute('CREATE TABLE IF NOT EXISTS catalog_plugins '
+                               '(key TEXT PRIMARY KEY, position INTEGER NOT NULL, value TEXT NOT NULL)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS stars (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self._import_json_files(config_path, plugins_db_path)
+
+    def _migrate_catalog_plugins(self):
+        """旧版 catalog_plugins 以列表下标为主键：按新格式（仓库键 + position）重写"""
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(catalog_plugins)')]
+        if not columns or 'position' in columns:
+            return
+        plugins = [json.loads(text) for _, text in self._conn.execute('SELECT key, value FROM catalog_plugins ORDER BY key')]
+        self._conn.execute('DROP TABLE catalog_plugins')
+        self._conn.execute('CREATE TABLE catalog_plugins '
+                           '(key TEXT PRIMARY KEY, position INTEGER NOT NULL, value TEXT NOT NULL)')
+        self._conn.executemany('INSERT INTO catalog_plugins (key, position, value) VALUES (?, ?, ?)',
+                               [(key, *row) for key, row in self.catalog_rows(plugins).items()])
+        logger.info(f"✓ 已将 catalog_plugins 表迁移为按仓库键存储（{len(plugins)} 个插件）")
+
+    @staticmethod
+    def catalog_rows(plugins):
+        """
+        插件目录 -> {行键: (位置, 文本)}
+        行键为仓库键（owner/repo），不是 GitHub 插件时用地址或标题；同一个键重复出现时加 #序号
+        """
+        rows = {}
+        for position, plugin in enumerate(plugins):
+            base = github_repo_key(plugin.get('reference', '')) or plugin.get('reference') or plugin.get('title') or ''
+            key, count = base, 1
+            while key in rows:
+                count += 1
+                key = f"{base}#{count}"
+            rows[key] = (position, _dump_row(plugin))
+        return rows
+
+    # ---------- 底层读写 ----------
+
+    def _select(self, table):
+        if table == 'catalog_plugins':
+            rows = self._conn.execute('SELECT key, position, value FROM catalog_plugins').fetchall()
+            return {key: (position, value) for key, position, value in rows}
+        return dict(self._conn.execute(f'SELECT key, value FROM {table}').fetchall())
+
+    def _cached_rows(self, table):
+        """上次写入的行内容（首次使用时从数据库读取）"""
+        rows = self._rows.get(table)
+        if rows is None:
+            rows = self._rows[table] = self._select(table)
+        return rows
+
+    def _sync_table(self, table, new_rows, partial=False):
+        """把表同步为 new_rows：只写入变化的行；partial=True 时不删除未出现的行"""
+        old_rows = self._cached_rows(table)
+        changed = [(key, value) for key, value in new_rows.items() if old_rows.get(key) != value]
+        removed = [] if partial else [(key,) for key in old_rows if key not in new_rows]
+        if table == 'catalog_plugins':
+            # 内容不变、只有位置变化的插件只更新 position 列
+            moved = [(value[0], key) for key, value in changed if key in old_rows and old_rows[key][1] == value[1]]
+            written = [(key, *value) for key, value in changed if key not in old_rows or old_rows[key][1] != value[1]]
+            if moved:
+                self._conn.executemany('UPDATE catalog_plugins SET position = ? WHERE key = ?', moved)
+            if written:
+                self._conn.executemany('INSERT OR REPLACE INTO catalog_plugins (key, position, value) VALUES (?, ?, ?)',
+                                       written)
+        elif changed:
+            self._conn.executemany(f'INSERT OR REPLACE INTO {table} (key, value) VALUES (?, ?)', changed)
+        if removed:
+            self._conn.executemany(f'DELETE FROM {table} WHERE key = ?', removed)
+        return changed, removed
+
+    def _write_tables(self, tables, partial_tables=()):
+        """在一个事务中同步多张表，提交成功后才更新行缓存；partial_tables 中的表只增改不删除"""
+        with self._db_lock:
+            try:
+                with self._conn:
+                    results = {
+                        table: self._sync_table(table, rows, table in partial_tables)
+                        for table, rows in tables.items()
+                    }
+            except BaseException:
+                # 事务已回滚，丢弃缓存，下次从数据库重新读取
+                for table in tables:
+                    self._rows.pop(table, None)
+                raise
+            for table, (changed, removed) in results.items():
+                cache = self._rows[table]
+                cache.update(changed)
+                for (key,) in removed:
+                    cache.pop(key, None)
+
+    def _get_meta(self, key):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _import_json_files(self, config_path, plugins_db_path):
+        """首次运行时导入 JSON 文件，导入标记记录在 meta 表中"""
+        imports = (
+            ('imported_config', config_path, self.write_config, self.snapshot_config),
+            ('imported_plugins_db', plugins_db_path, self.save_plugins_database, None),
+        )
+        for flag, path, write, prepare in imports:
+            with self._db_lock:
+                if self._get_meta(flag):
+                    continue
+            if path and os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    write(prepare(data) if prepare else data)
+                    logger.info(f"✓ 已将 {os.path.basename(path)} 导入 SQLite 数据库")
+                except Exception as e:
+                    logger.error(f"导入 {path} 失败: {e}")
+                    continue
+            with self._db_lock, self._conn:
+                self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (flag, '1'))
+
+    # ---------- 配置 ----------
+
+    def read_config(self):
+        """从各表组装配置，没有任何配置时返回 None"""
+        with self._db_lock:
+            values = self._cached_rows('config_values')
+            if not values:
+                return None
+            config = {key: json.loads(text) for key, text in values.items()}
+            for field, table in self.CONFIG_TABLES.items():
+                config[field] = {key: json.loads(text) for key, text in self._cached_rows(table).items()}
+        return config
+
+    def snapshot_config(self, config):
+        """把配置拆分成各表的行（在事件循环线程中调用，得到一致的快照）"""
+        tables = {table: {} for table in self.CONFIG_TABLES.values()}
+        tables['config_values'] = {}
+        for field, value in config.items():
+            table = self.CONFIG_TABLES.get(field)
+            if table is not None and isinstance(value, dict):
+                tables[table] = {key: _dump_row(item) for key, item in value.items()}
+            else:
+                tables['config_values'][field] = _dump_row(value)
+        return tables
+
+    def write_config(self, snapshot):
+        self._write_tables(snapshot)
+
+    # ---------- 插件数据库 ----------
+
+    def load_plugins_database(self, fields=None):
+        """
+        读取插件数据库，结构与 plugins_database.json 相同
+        fields 指定需要的字段，例如只要 stars_db 时不会读取插件目录
+        """
+        with self._db_lock:
+            def wanted(field):
+                return fields is None or field in fields
+
+            data = {}
+            meta = self._cached_rows('catalog_meta')
+            for key, text in meta.items():
+                if wanted(key):
+                    data[key] = json.loads(text)
+            if not meta and not self._select_count('catalog_plugins') and not self._select_count('stars'):
+                # 与 JSON 后端一致：从未保存过时返回 None
+                return None
+            if wanted('plugins'):
+                data['plugins'] = [json.loads(text) for _, text in sorted(self._cached_rows('catalog_plugins').values())]
+            if wanted('stars_db'):
+                data['stars_db'] = dict(self._cached_rows('stars'))
+        return data
+
+    def _select_count(self, table):
+        return self._conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def save_plugins_database(self, data, partial=False):
+        """保存插件数据库；只写入变化的插件、stars 和元数据行"""
+        tables = {}
+        meta = {key: _dump_row(value) for key, value in data.items() if key not in ('plugins', 'stars_db')}
+        if meta or not partial:
+            tables['catalog_meta'] = meta
+        if 'plugins' in data or not partial:
+            tables['catalog_plugins'] = self.catalog_rows(data.get('plugins') or [])
+        if 'stars_db' in data or not partial:
+            tables['stars'] = {key: int(stars or 0) for key, stars in (data.get('stars_db') or {}).items()}
+        # 元数据逐项合并；插件目录和 stars 出现时整体替换（仍然只写变化的行）
+        self._write_tables(tables, partial_tables=('catalog_meta',) if partial else ())
+
+    def close(self):
+        with self._db_lock:
+            self._conn.close()
+
+
+def create_storage_backend():
+    """根据 NODE_MANAGER_STORAGE 创建存储后端，SQLite 不可用时回退到 JSON 文件"""
+    if STORAGE_BACKEND == 'sqlite':
         try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                # 确保配置格式正确
-                if 'folders' not in config:
-                    config['folders'] = {}
-                if 'settings' not in config:
-                    config['settings'] = {}
-                # 确保所有必需字段存在
-                if 'hiddenPlugins' not in config:
-                    config['hiddenPlugins'] = []
-                if 'showHiddenPlugins' not in config:
-                    config['showHiddenPlugins'] = False
-                if 'folderNodes' not in config:
-                    config['folderNodes'] = {}
-                if 'nodeCustomNames' not in config:
-                    config['nodeCustomNames'] = {}
-                return config
+            backend = SqliteStorage(SQLITE_DB_FILE, CONFIG_FILE, PLUGINS_DB_FILE)
+            logger.info(f"✓ 使用 SQLite 存储: {SQLITE_DB_FILE}")
+            return backend
         except Exception as e:
-            logger.error(f"加载配置失败: {e}")
-    
-    # 默认配置
+            logger.error(f"SQLite 存储初始化失败，改用 JSON 文件: {e}")
+    elif STORAGE_BACKEND != 'json':
+        logger.warning(f"未知的存储后端 {STORAGE_BACKEND}，使用 JSON 文件")
+    return JsonStorage(CONFIG_FILE, PLUGINS_DB_FILE)
+
+
+with startup_phase('storage_init'):
+    storage = create_storage_backend()
+atexit.register(storage.close)
+
+
+# ========== 配置存储 ==========
+# 配置常驻内存，修改后延迟写盘：窗口内的多次修改只写一次
+# 写盘失败时按指数退避重试（1 秒起，最长 30 秒），期间的修改接口和 /config 会报告写盘失败
+CONFIG_FLUSH_DELAY = 0.5
+CONFIG_RETRY_DELAY = 1.0
+CONFIG_RETRY_MAX_DELAY = 30.0
+
+
+def default_config():
+    """默认配置"""
     return {
         "folders": {},
         "settings": {
@@ -279,333 +730,981 @@ def load_config():
     }
 
 
-def save_config(config):
-    """保存配置文件"""
-    try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        logger.error(f"保存配置失败: {e}")
+def normalize_config(config):
+    """确保配置格式正确，补全必需字段"""
+    if 'folders' not in config:
+        config['folders'] = {}
+    if 'settings' not in config:
+        config['settings'] = {}
+    if 'hiddenPlugins' not in config:
+        config['hiddenPlugins'] = []
+    if 'showHiddenPlugins' not in config:
+        config['showHiddenPlugins'] = False
+    if 'folderNodes' not in config:
+        config['folderNodes'] = {}
+    if 'nodeCustomNames' not in config:
+        config['nodeCustomNames'] = {}
+    return config
+
+
+class FolderIndex:
+    """
+    文件夹树的父子索引
+    在 config['folders'] 之上维护 parent -> [子文件夹ID]，
+    子树收集、环检测、层级更新和同级排序只与受影响的子树大小相关
+    根级文件夹统一以 None 为键（旧配置中的 parent 可能是空字符串）
+    """
+
+    def __init__(self, folders):
+        self.folders = folders
+        self.children = {}
+        for folder_id, folder in folders.items():
+            self.children.setdefault(folder.get('parent') or None, []).append(folder_id)
+
+    def get_children(self, parent_id):
+        """直接子文件夹（parent_id 为 None 时为根级文件夹）"""
+        return self.children.get(parent_id, [])
+
+    def get_sorted_children(self, parent_id):
+        """按 order 排序的直接子文件夹"""
+        return sorted(self.get_children(parent_id),
+                      key=lambda fid: self.folders[fid].get('order', 0))
+
+    def get_subtree(self, folder_id):
+        """文件夹及其所有子孙文件夹的ID列表"""
+        result = []
+        stack = [folder_id]
+        while stack:
+            fid = stack.pop()
+            result.append(fid)
+            stack.extend(self.get_children(fid))
+        return result
+
+    def is_descendant(self, ancestor_id, folder_id):
+        """folder_id 是否是 ancestor_id 本身或其子孙（沿父链向上查找）"""
+        visited = set()
+        current = folder_id
+        while current is not None and current not in visited:
+            if current == ancestor_id:
+                return True
+            visited.add(current)
+            folder = self.folders.get(current)
+            current = folder.get('parent') if folder else None
         return False
 
+    def add(self, folder_id, parent_id):
+        self.children.setdefault(parent_id or None, []).append(folder_id)
 
-# ========== API 路由 ==========
+    def remove(self, folder_id):
+        folder = self.folders.get(folder_id)
+        parent_id = (folder.get('parent') if folder else None) or None
+        siblings = self.children.get(parent_id)
+        if siblings and folder_id in siblings:
+            siblings.remove(folder_id)
+        self.children.pop(folder_id, None)
 
-@server.PromptServer.instance.routes.get("/node-manager/config")
-async def get_config(request):
-    """获取配置"""
-    try:
-        config = load_config()
-        return web.json_response({
-            'success': True,
-            'config': config
-        })
-    except Exception as e:
-        logger.error(f"获取配置失败: {e}")
-        return web.json_response({
-            'success': False,
-            'error': str(e)
-        }, status=500)
+    def reparent(self, folder_id, new_parent_id):
+        """修改文件夹的父级（同时更新 folders 中的 parent 字段）"""
+        old_parent_id = self.folders[folder_id].get('parent') or None
+        siblings = self.children.get(old_parent_id)
+        if siblings and folder_id in siblings:
+            siblings.remove(folder_id)
+        self.folders[folder_id]['parent'] = new_parent_id
+        self.add(folder_id, new_parent_id)
 
 
-@server.PromptServer.instance.routes.post("/node-manager/config")
-async def save_config_api(request):
-    """保存配置"""
+class ConfigStore:
+    """
+    进程内共享的配置对象
+    - 首次访问时从存储后端读取，之后一直使用内存中的配置
+    - 修改通过 lock 串行化，save 只标记为脏，由后台任务合并写盘
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._config = None
+        self._dirty = False
+        self._flush_task = None
+        self._lock = None
+        self._folder_index = None
+        # 最近一次写盘失败的错误信息（写盘成功后清空）
+        self.persist_error = None
+        # 配置修订号：每次修改递增；以启动时间为起点，重启后旧的修订号不会被误认为最新
+        import time
+        self.revision = int(time.time() * 1000)
+
+    @property
+    def lock(self):
+        """保护读-改-写过程的 asyncio 锁"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _read(self):
+        try:
+            config = self.backend.read_config()
+            if config is not None:
+                return normalize_config(config)
+        except Exception as e:
+            logger.error(f"加载配置失败: {e}")
+        return default_config()
+
+    def get(self):
+        """获取内存中的配置（首次调用时从文件加载）"""
+        if self._config is None:
+            self._config = self._read()
+        return self._config
+
+    def set(self, config):
+        """替换整个配置并安排写盘"""
+        self._config = normalize_config(config)
+        self._folder_index = None
+        self.mark_dirty()
+
+    @property
+    def folder_index(self):
+        """当前配置的文件夹索引（folders 被整体替换后自动重建）"""
+        folders = self.get()['folders']
+        if self._folder_index is None or self._folder_index.folders is not folders:
+            self._folder_index = FolderIndex(folders)
+        return self._folder_index
+
+    def invalidate_folder_index(self):
+        """folders 被就地修改且未经过索引时调用"""
+        self._folder_index = None
+
+    def mark_dirty(self):
+        """标记配置已修改（修订号加一），在事件循环中合并为一次延迟写入"""
+        self._dirty = True
+        self.revision += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有运行中的事件循环（如启动阶段），直接写盘
+            self.flush_sync()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_loop())
+
+    def _serialize(self):
+        return self.backend.snapshot_config(self._config)
+
+    def _write(self, data):
+        try:
+            self.backend.write_config(data)
+            self.persist_error = None
+            return True
+        except Exception as e:
+            logger.error(f"保存配置失败: {e}")
+            self.persist_error = str(e) or type(e).__name__
+            return False
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        delay = CONFIG_FLUSH_DELAY
+        while self._dirty:
+            await asyncio.sleep(delay)
+            # 序列化在事件循环线程中完成，拿到的是一致的快照；写文件放到线程池
+            self._dirty = False
+            data = self._serialize()
+            if await loop.run_in_executor(None, self._write, data):
+                delay = CONFIG_FLUSH_DELAY
+            else:
+                # 写入失败：保留脏标记，退避后重试
+                self._dirty = True
+                delay = min(max(delay * 2, CONFIG_RETRY_DELAY), CONFIG_RETRY_MAX_DELAY)
+                logger.warning(f"配置写盘失败，{delay:g} 秒后重试")
+
+    def flush_sync(self):
+        """同步写盘（无事件循环时及进程退出时使用）"""
+        if not self._dirty or self._config is None:
+            return True
+        self._dirty = False
+        if not self._write(self._serialize()):
+            self._dirty = True
+            return False
+        return True
+
+
+config_store = ConfigStore(storage)
+
+# 进程退出前写入尚未落盘的修改
+atexit.register(config_store.flush_sync)
+
+
+def load_config():
+    """加载配置（返回进程内共享的配置对象）"""
+    return config_store.get()
+
+
+def save_config(config):
+    """
+    保存配置（更新内存中的配置，写盘由后台合并完成）
+    写盘正在失败（最近一次写入出错且尚未恢复）时返回 False：修改保留在内存中，后台会继续重试
+    """
     try:
-        data = await request.json()
-        config = data.get('config', {})
-        
-        if save_config(config):
-            return web.json_response({
-                'success': True,
-                'message': '配置已保存'
-            })
+        if config is not config_store.get():
+            config_store.set(config)
         else:
-            return web.json_response({
-                'success': False,
-                'error': '保存配置失败'
-            }, status=500)
+            config_store.mark_dirty()
+        return config_store.persist_error is None
     except Exception as e:
         logger.error(f"保存配置失败: {e}")
-        return web.json_response({
-            'success': False,
-            'error': str(e)
-        }, status=500)
+        return False
 
 
-@server.PromptServer.instance.routes.post("/node-manager/folder/create")
-async def create_folder(request):
-    """创建文件夹"""
-    try:
-        data = await request.json()
-        folder_name = data.get('name', '').strip()
-        parent_id = data.get('parent', None)
-        
-        if not folder_name:
-            return web.json_response({
-                'success': False,
-                'error': '文件夹名称不能为空'
-            }, status=400)
-        
-        config = load_config()
-        
-        # 计算层级
-        level = 1
-        if parent_id:
-            parent = config['folders'].get(parent_id)
-            if not parent:
-                return web.json_response({
-                    'success': False,
-                    'error': '父文件夹不存在'
-                }, status=400)
-            level = parent.get('level', 1) + 1
-            if level > 3:
-                return web.json_response({
-                    'success': False,
-                    'error': '最多支持3级文件夹'
-                }, status=400)
-        
-        # 生成唯一ID
-        import time
-        folder_id = f"folder_{int(time.time() * 1000)}"
-        
-        # 计算排序位置
-        order = 0
-        if parent_id:
-            # 计算同级文件夹数量
-            siblings = [f for f in config['folders'].values() 
-                       if f.get('parent') == parent_id]
-            order = len(siblings)
-        else:
-            # 根级文件夹
-            root_folders = [f for f in config['folders'].values() 
-                           if f.get('parent') is None]
-            order = len(root_folders)
-        
-        # 创建文件夹
-        config['folders'][folder_id] = {
-            'name': folder_name,
-            'parent': parent_id,
-            'level': level,
-            'order': order,
-            'expanded': True
-        }
-        
-        if save_config(config):
-            return web.json_response({
-                'success': True,
-                'folder': {
-                    'id': folder_id,
-                    **config['folders'][folder_id]
-                }
-            })
-        else:
-            return web.json_response({
-                'success': False,
-                'error': '保存失败'
-            }, status=500)
-            
-    except Exception as e:
-        logger.error(f"创建文件夹失败: {e}")
-        return web.json_response({
-            'success': False,
-            'error': str(e)
-        }, status=500)
+def config_save_failed_response():
+    """配置写盘失败的响应：修改已保留在内存中（附带新的修订号），后台会继续重试写盘"""
+    return web.json_response({
+        'success': False,
+        'error': f"保存配置失败: {config_store.persist_error}" if config_store.persist_error else '保存配置失败',
+        'persist_error': config_store.persist_error,
+        'revision': config_store.revision
+    }, status=500)
 
 
-@server.PromptServer.instance.routes.post("/node-manager/folder/rename")
-async def rename_folder(request):
+# ========== 文件夹操作 ==========
+# 单个文件夹接口和批量接口共用以下操作函数，失败时抛出 FolderOperationError
+
+MAX_FOLDER_LEVEL = 3
+
+
+class FolderOperationError(Exception):
+    """文件夹操作失败（附带返回给前端的 HTTP 状态码）"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def generate_folder_id(folders):
+    """生成唯一的文件夹ID（同一毫秒内创建多个时顺延）"""
+    import time
+    timestamp = int(time.time() * 1000)
+    while f"folder_{timestamp}" in folders:
+        timestamp += 1
+    return f"folder_{timestamp}"
+
+
+def apply_create_folder(config, folder_index, name, parent_id=None, folder_id=None):
+    """创建文件夹，返回新文件夹（含 id）"""
+    # 根级文件夹的父级统一为 None（/batch 和 PATCH 的客户端可能传空字符串）
+    parent_id = parent_id or None
+    name = (name or '').strip()
+    if not name:
+        raise FolderOperationError('文件夹名称不能为空')
+    
+    # 计算层级
+    level = 1
+    if parent_id:
+        parent = config['folders'].get(parent_id)
+        if not parent:
+            raise FolderOperationError('父文件夹不存在')
+        level = parent.get('level', 1) + 1
+        if level > MAX_FOLDER_LEVEL:
+            raise FolderOperationError('最多支持3级文件夹')
+    
+    # 生成唯一ID（批量操作中允许由前端指定，便于后续操作引用）
+    if folder_id:
+        if folder_id in config['folders']:
+            raise FolderOperationError(f'文件夹ID已存在: {folder_id}', status=409)
+    else:
+        folder_id = generate_folder_id(config['folders'])
+    
+    # 计算排序位置（同级文件夹数量）
+    order = len(folder_index.get_children(parent_id))
+    
+    # 创建文件夹
+    config['folders'][folder_id] = {
+        'name': name,
+        'parent': parent_id,
+        'level': level,
+        'order': order,
+        'expanded': True
+    }
+    folder_index.add(folder_id, parent_id)
+    
+    return {'id': folder_id, **config['folders'][folder_id]}
+
+
+def apply_rename_folder(config, folder_id, name):
     """重命名文件夹"""
+    name = (name or '').strip()
+    if not folder_id or not name:
+        raise FolderOperationError('参数不完整')
+    if folder_id not in config['folders']:
+        raise FolderOperationError('文件夹不存在', status=404)
+    
+    config['folders'][folder_id]['name'] = name
+
+
+def apply_delete_folders(config, folder_index, folder_ids):
+    """删除文件夹（含子文件夹），返回被删除的文件夹ID集合"""
+    if not folder_ids:
+        raise FolderOperationError('未选择文件夹')
+    
+    # 收集所有要删除的文件夹（含子文件夹）
+    to_delete = set()
+    for folder_id in folder_ids:
+        if folder_id in config['folders']:
+            to_delete.update(folder_index.get_subtree(folder_id))
+    
+    # 删除
+    for folder_id in to_delete:
+        if folder_id in config['folders']:
+            folder_index.remove(folder_id)
+            del config['folders'][folder_id]
+    
+    return to_delete
+
+
+def apply_move_folder(config, folder_index, folder_id, target_parent=None, target_order=0):
+    """移动文件夹（拖拽）"""
+    target_parent = target_parent or None
+    if not folder_id:
+        raise FolderOperationError('参数不完整')
+    if folder_id not in config['folders']:
+        raise FolderOperationError('文件夹不存在', status=404)
+    
+    folder = config['folders'][folder_id]
+    
+    # 检查是否移动到自己的子文件夹下
+    if target_parent and folder_index.is_descendant(folder_id, target_parent):
+        raise FolderOperationError('不能移动到自己的子文件夹')
+    
+    # 计算新层级
+    new_level = 1
+    if target_parent:
+        parent = config['folders'].get(target_parent)
+        if not parent:
+            raise FolderOperationError('目标父文件夹不存在')
+        new_level = parent.get('level', 1) + 1
+        if new_level > MAX_FOLDER_LEVEL:
+            raise FolderOperationError('最多支持3级文件夹')
+    
+    # 更新父级
+    old_parent = folder.get('parent') or None
+    folder_index.reparent(folder_id, target_parent)
+    
+    # 更新层级（子树中的文件夹依次加深一级）
+    stack = [(folder_id, new_level)]
+    while stack:
+        fid, level = stack.pop()
+        config['folders'][fid]['level'] = level
+        stack.extend((child_id, level + 1) for child_id in folder_index.get_children(fid))
+    
+    # 重新排序同级文件夹（target_order 是按 order 排序后的位置）
+    siblings = [fid for fid in folder_index.get_sorted_children(target_parent)
+                if fid != folder_id]
+    siblings.insert(target_order, folder_id)
+    
+    for idx, fid in enumerate(siblings):
+        config['folders'][fid]['order'] = idx
+    
+    # 重新排序原来父级下的文件夹
+    if old_parent != target_parent:
+        for idx, fid in enumerate(folder_index.get_sorted_children(old_parent)):
+            config['folders'][fid]['order'] = idx
+
+
+def apply_toggle_folder(config, folder_id, expanded=None):
+    """切换（或设置）文件夹展开状态，返回新的状态"""
+    if not folder_id:
+        raise FolderOperationError('参数不完整')
+    if folder_id not in config['folders']:
+        raise FolderOperationError('文件夹不存在', status=404)
+    
+    folder = config['folders'][folder_id]
+    folder['expanded'] = (not folder.get('expanded', True)) if expanded is None else bool(expanded)
+    return folder['expanded']
+
+
+def apply_add_folder_nodes(config, folder_id, node_ids):
+    """把节点加入文件夹，返回实际新增的数量"""
+    if folder_id not in config['folders']:
+        raise FolderOperationError('文件夹不存在', status=404)
+    
+    folder_nodes = config['folderNodes'].setdefault(folder_id, [])
+    existing = set(folder_nodes)
+    added = 0
+    for node_id in node_ids:
+        if node_id not in existing:
+            folder_nodes.append(node_id)
+            existing.add(node_id)
+            added += 1
+    return added
+
+
+def apply_remove_folder_nodes(config, folder_id, node_ids):
+    """把节点移出文件夹，返回实际移除的数量"""
+    folder_nodes = config['folderNodes'].get(folder_id)
+    if not folder_nodes:
+        return 0
+    
+    to_remove = set(node_ids)
+    remaining = [node_id for node_id in folder_nodes if node_id not in to_remove]
+    removed = len(folder_nodes) - len(remaining)
+    config['folderNodes'][folder_id] = remaining
+    return removed
+
+
+def folder_operation_error_response(error):
+    return web.json_response({
+        'success': False,
+        'error': str(error)
+    }, status=error.status)
+
+
+# ========== 配置增量修改 (JSON Patch / Merge Patch) ==========
+
+class JsonPatchError(Exception):
+    """补丁无法应用（附带 HTTP 状态码）"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_json_pointer(pointer):
+    """解析 RFC 6901 JSON Pointer，返回路径片段列表"""
+    if pointer == '':
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith('/'):
+        raise JsonPatchError(f'无效的路径: {pointer}')
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _json_pointer_index(container, token, allow_end=False):
+    """把路径片段解析为数组下标"""
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token[0] == '0'):
+        raise JsonPatchError(f'无效的数组下标: {token}')
+    index = int(token)
+    limit = len(container) + (1 if allow_end else 0)
+    if index >= limit:
+        raise JsonPatchError(f'数组下标越界: {token}')
+    return index
+
+
+def _json_pointer_get(container, token):
+    if isinstance(container, dict):
+        if token not in container:
+            raise JsonPatchError(f'路径不存在: {token}')
+        return container[token]
+    if isinstance(container, list):
+        return container[_json_pointer_index(container, token)]
+    raise JsonPatchError(f'路径不存在: {token}')
+
+
+def _json_pointer_read(document, tokens):
+    current = document
+    for token in tokens:
+        current = _json_pointer_get(current, token)
+    return current
+
+
+class _PatchTarget:
+    """
+    写时复制的补丁目标
+    只复制被修改路径上的容器，未修改的部分与原配置共享，原配置保持不变
+    """
+
+    def __init__(self, document):
+        self.root = self._copy(document)
+        self._copied = {id(self.root)}
+
+    @staticmethod
+    def _copy(container):
+        return dict(container) if isinstance(container, dict) else list(container)
+
+    def parent_of(self, tokens):
+        """返回路径最后一段所在的容器（沿途容器都已复制，可以安全修改）"""
+        current = self.root
+        for token in tokens[:-1]:
+            child = _json_pointer_get(current, token)
+            if not isinstance(child, (dict, list)):
+                raise JsonPatchError(f'路径不存在: {token}')
+            if id(child) not in self._copied:
+                child = self._copy(child)
+                self._copied.add(id(child))
+                if isinstance(current, dict):
+                    current[token] = child
+                else:
+                    current[_json_pointer_index(current, token)] = child
+            current = child
+        return current
+
+    def add(self, tokens, value):
+        if not tokens:
+            raise JsonPatchError('不能替换整个配置')
+        parent, token = self.parent_of(tokens), tokens[-1]
+        if isinstance(parent, dict):
+            parent[token] = value
+        elif isinstance(parent, list):
+            parent.insert(_json_pointer_index(parent, token, allow_end=True), value)
+        else:
+            raise JsonPatchError(f'路径不存在: {token}')
+
+    def remove(self, tokens):
+        if not tokens:
+            raise JsonPatchError('不能删除整个配置')
+        parent, token = self.parent_of(tokens), tokens[-1]
+        if isinstance(parent, dict):
+            if token not in parent:
+                raise JsonPatchError(f'路径不存在: {token}')
+            return parent.pop(token)
+        if isinstance(parent, list):
+            return parent.pop(_json_pointer_index(parent, token))
+        raise JsonPatchError(f'路径不存在: {token}')
+
+    def replace(self, tokens, value):
+        self.remove(tokens)
+        self.add(tokens, value)
+
+
+def apply_json_patch(document, operations):
+    """
+    应用 RFC 6902 JSON Patch，返回新文档（原文档不变）
+    任一操作失败则整体失败
+    """
+    import copy
+    
+    if not isinstance(operations, list):
+        raise JsonPatchError('patch 必须是数组')
+    
+    target = _PatchTarget(document)
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise JsonPatchError(f'第 {index} 个补丁操作格式错误')
+        op = operation['op']
+        tokens = parse_json_pointer(operation['path'])
+        
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError(f'第 {index} 个补丁操作缺少 value')
+        
+        if op == 'add':
+            target.add(tokens, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            target.remove(tokens)
+        elif op == 'replace':
+            target.replace(tokens, copy.deepcopy(operation['value']))
+        elif op in ('move', 'copy'):
+            from_tokens = parse_json_pointer(operation.get('from'))
+            if op == 'move':
+                if tokens[:len(from_tokens)] == from_tokens and len(tokens) > len(from_tokens):
+                    raise JsonPatchError('不能移动到自己的子路径')
+                value = target.remove(from_tokens)
+            else:
+                value = copy.deepcopy(_json_pointer_read(target.root, from_tokens))
+            target.add(tokens, value)
+        elif op == 'test':
+            if _json_pointer_read(target.root, tokens) != operation['value']:
+                raise JsonPatchError(f'第 {index} 个补丁操作 test 未通过: {operation["path"]}', status=409)
+        else:
+            raise JsonPatchError(f'不支持的补丁操作: {op}')
+    
+    return target.root
+
+
+def apply_merge_patch(target, patch):
+    """应用 RFC 7396 JSON Merge Patch，返回新文档（值为 null 表示删除）"""
+    import copy
+    
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+# ========== 条件请求 (ETag) ==========
+# 读接口的 ETag 由配置修订号、注册表版本或插件库修订号直接拼出，
+# If-None-Match 命中时在构建和序列化响应之前就返回 304
+
+
+def make_etag(*parts):
+    """由版本信息生成强 ETag"""
+    return '"' + '-'.join(str(part) for part in parts) + '"'
+
+
+def etag_matches(request, etag):
+    """请求的 If-None-Match 是否包含当前 ETag"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        # 压缩后的表示带有编码后缀（见 json_response）
+        for suffix in ('-gzip"', '-br"'):
+            if tag.endswith(suffix):
+                tag = tag[:-len(suffix)] + '"'
+        if tag == etag:
+            return True
+    return False
+
+
+def not_modified_response(etag):
+    return web.Response(status=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+
+def directory_mtime(path):
+    """目录的修改时间（增删子目录时会变化），目录不存在时返回 0"""
     try:
-        data = await request.json()
-        folder_id = data.get('id')
-        new_name = data.get('name', '').strip()
-        
-        if not folder_id or not new_name:
-            return web.json_response({
-                'success': False,
-                'error': '参数不完整'
-            }, status=400)
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+# ========== JSON 响应编码与压缩 ==========
+# 大响应（节点列表、插件商店目录）使用 orjson（已安装时）序列化，并按 Accept-Encoding 做 gzip/brotli 压缩；
+# 带 cache_key 的快照响应会缓存编码和压缩后的字节，重复请求直接返回
+RESPONSE_CACHE_SIZE = 16
+COMPRESS_MIN_SIZE = 1024
+# 超过该大小的正文在线程池中压缩，避免阻塞事件循环
+COMPRESS_IN_EXECUTOR_SIZE = 256 * 1024
+
+# {cache_key: {'identity': bytes, 'gzip': bytes, 'br': bytes}}，按最近使用排序
+from collections import OrderedDict
+_response_cache = OrderedDict()
+
+
+def encode_json(data):
+    """序列化为 UTF-8 JSON 字节（优先 orjson，遇到其不支持的数据时回退到标准库）"""
+    orjson = import_optional('orjson')
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _comfyui_compresses_responses():
+    """ComfyUI 启用了 --enable-compress-response-body 时由它负责压缩，避免重复压缩"""
+    try:
+        from comfy.cli_args import args
+        return bool(getattr(args, 'enable_compress_response_body', False))
+    except Exception:
+        return False
+
+
+def select_content_encoding(request):
+    """根据 Accept-Encoding 选择压缩方式：br（需安装 brotli）优先，其次 gzip"""
+    header = request.headers.get('Accept-Encoding', '')
+    accepted = set()
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        quality = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                pass
+        if quality > 0:
+            accepted.add(name.strip().lower())
+    if 'br' in accepted and import_optional('brotli') is not None:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return import_optional('brotli').compress(body, quality=5)
+    import gzip
+    return gzip.compress(body, compresslevel=6)
+
+
+def _cache_encoded(cache_key, encodings):
+    _response_cache[cache_key] = encodings
+    _response_cache.move_to_end(cache_key)
+    while len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+
+async def _build_json_response(request, encodings, status, etag):
+    encoding = None
+    if len(encodings['identity']) >= COMPRESS_MIN_SIZE and not _comfyui_compresses_responses():
+        encoding = select_content_encoding(request)
+    if encoding is not None and encoding not in encodings:
+        body = encodings['identity']
+        if len(body) >= COMPRESS_IN_EXECUTOR_SIZE:
+            loop = asyncio.get_running_loop()
+            encodings[encoding] = await loop.run_in_executor(None, _compress, body, encoding)
+        else:
+            encodings[encoding] = _compress(body, encoding)
+    
+    headers = {'Vary': 'Accept-Encoding'}
+    if encoding is not None:
+        headers['Content-Encoding'] = encoding
+    if etag is not None:
+        # 不同编码的表示使用不同的 ETag（etag_matches 会忽略编码后缀）
+        headers['ETag'] = etag[:-1] + '-' + encoding + '"' if encoding else etag
+        headers['Cache-Control'] = 'no-cache'
+    return web.Response(body=encodings[encoding or 'identity'], status=status,
+                        content_type='application/json', headers=headers)
+
+
+async def json_response(request, data, status=200, etag=None, cache_key=None):
+    """
+    序列化并（按需）压缩 JSON 响应
+    cache_key 用于不可变的快照（如注册表版本、插件库修订号），编码结果会被缓存
+    """
+    encodings = {'identity': encode_json(data)}
+    response = await _build_json_response(request, encodings, status, etag)
+    if cache_key is not None:
+        _cache_encoded(cache_key, encodings)
+    return response
+
+
+async def cached_json_response(request, cache_key, etag=None):
+    """命中缓存时直接返回已编码的响应，否则返回 None"""
+    encodings = _response_cache.get(cache_key)
+    if encodings is None:
+        return None
+    _response_cache.move_to_end(cache_key)
+    return await _build_json_response(request, encodings, 200, etag)
+
+
+# ========== API 路由 ==========
+
+@server.PromptServer.instance.routes.get("/node-manager/config")
+async def get_config(request):
+    """获取配置（ETag 为配置修订号；persist_error 不为空表示配置写盘失败，后台正在重试）"""
+    try:
+        revision = config_store.revision
+        persist_error = config_store.persist_error
+        etag = make_etag('config', revision, 'unsaved') if persist_error else make_etag('config', revision)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
         
         config = load_config()
-        
-        if folder_id not in config['folders']:
-            return web.json_response({
-                'success': False,
-                'error': '文件夹不存在'
-            }, status=404)
-        
-        config['folders'][folder_id]['name'] = new_name
-        
-        if save_config(config):
-            return web.json_response({
-                'success': True,
-                'message': '重命名成功'
-            })
-        else:
-            return web.json_response({
-                'success': False,
-                'error': '保存失败'
-            }, status=500)
-            
+        return await json_response(request, {
+            'success': True,
+            'config': config,
+            'revision': revision,
+            'persist_error': persist_error
+        }, etag=etag)
     except Exception as e:
-        logger.error(f"重命名文件夹失败: {e}")
+        logger.error(f"获取配置失败: {e}")
         return web.json_response({
             'success': False,
             'error': str(e)
         }, status=500)
 
 
-@server.PromptServer.instance.routes.post("/node-manager/folder/delete")
-async def delete_folder(request):
-    """删除文件夹"""
+@server.PromptServer.instance.routes.post("/node-manager/config")
+async def save_config_api(request):
+    """保存配置"""
     try:
         data = await request.json()
-        folder_ids = data.get('ids', [])
-        
-        if not folder_ids:
-            return web.json_response({
-                'success': False,
-                'error': '未选择文件夹'
-            }, status=400)
+        config = data.get('config', {})
+        base_revision = data.get('revision')
         
-        config = load_config()
+        async with config_store.lock:
+            # 可选的修订号检查：携带 revision 时拒绝基于旧版本的整体覆盖
+            if base_revision is not None and base_revision != config_store.revision:
+                return web.json_response({
+                    'success': False,
+                    'error': '配置已被修改，请刷新后重试',
+                    'revision': config_store.revision
+                }, status=409)
+            saved = save_config(config)
         
-        # 递归获取所有子文件夹
-        def get_all_children(parent_id):
-            children = [parent_id]
-            for fid, folder in config['folders'].items():
-                if folder.get('parent') == parent_id:
-                    children.extend(get_all_children(fid))
-            return children
-        
-        # 收集所有要删除的文件夹
-        to_delete = set()
-        for folder_id in folder_ids:
-            if folder_id in config['folders']:
-                to_delete.update(get_all_children(folder_id))
-        
-        # 删除
-        for folder_id in to_delete:
-            if folder_id in config['folders']:
-                del config['folders'][folder_id]
-        
-        if save_config(config):
+        if saved:
             return web.json_response({
                 'success': True,
-                'message': f'已删除 {len(to_delete)} 个文件夹'
+                'message': '配置已保存',
+                'revision': config_store.revision
             })
         else:
-            return web.json_response({
-                'success': False,
-                'error': '保存失败'
-            }, status=500)
-            
+            return config_save_failed_response()
     except Exception as e:
-        logger.error(f"删除文件夹失败: {e}")
+        logger.error(f"保存配置失败: {e}")
         return web.json_response({
             'success': False,
             'error': str(e)
         }, status=500)
 
 
-@server.PromptServer.instance.routes.post("/node-manager/folder/move")
-async def move_folder(request):
-    """移动文件夹（拖拽）"""
+@server.PromptServer.instance.routes.patch("/node-manager/config")
+async def patch_config_api(request):
+    """
+    增量修改配置
+    请求体: {revision, patch: [RFC 6902 操作]} 或 {revision, merge: {RFC 7396 合并补丁}}
+    revision 与当前修订号不一致时返回 409
+    """
     try:
         data = await request.json()
-        folder_id = data.get('id')
-        target_parent = data.get('target_parent', None)
-        target_order = data.get('target_order', 0)
+        base_revision = data.get('revision')
         
-        if not folder_id:
+        if base_revision is None:
             return web.json_response({
                 'success': False,
-                'error': '参数不完整'
+                'error': '缺少 revision'
             }, status=400)
-        
-        config = load_config()
-        
-        if folder_id not in config['folders']:
+        if ('patch' in data) == ('merge' in data):
             return web.json_response({
                 'success': False,
-                'error': '文件夹不存在'
-            }, status=404)
-        
-        folder = config['folders'][folder_id]
-        
-        # 检查是否移动到自己的子文件夹下
-        def is_descendant(parent_id, child_id):
-            if parent_id == child_id:
-                return True
-            for fid, f in config['folders'].items():
-                if f.get('parent') == parent_id:
-                    if is_descendant(fid, child_id):
-                        return True
-            return False
-        
-        if target_parent and is_descendant(folder_id, target_parent):
-            return web.json_response({
-                'success': False,
-                'error': '不能移动到自己的子文件夹'
+                'error': '需要提供 patch 或 merge 其中之一'
             }, status=400)
         
-        # 计算新层级
-        new_level = 1
-        if target_parent:
-            parent = config['folders'].get(target_parent)
-            if not parent:
+        async with config_store.lock:
+            if base_revision != config_store.revision:
                 return web.json_response({
                     'success': False,
-                    'error': '目标父文件夹不存在'
-                }, status=400)
-            new_level = parent.get('level', 1) + 1
-            if new_level > 3:
+                    'error': '配置已被修改，请刷新后重试',
+                    'revision': config_store.revision
+                }, status=409)
+            
+            config = load_config()
+            try:
+                if 'patch' in data:
+                    new_config = apply_json_patch(config, data['patch'])
+                else:
+                    new_config = apply_merge_patch(config, data['merge'])
+            except JsonPatchError as e:
+                return web.json_response({
+                    'success': False,
+                    'error': str(e),
+                    'revision': config_store.revision
+                }, status=e.status)
+            
+            if not isinstance(new_config, dict):
                 return web.json_response({
                     'success': False,
-                    'error': '最多支持3级文件夹'
+                    'error': '配置必须是对象'
                 }, status=400)
+            
+            if save_config(new_config):
+                return web.json_response({
+                    'success': True,
+                    'revision': config_store.revision
+                })
+            else:
+                return config_save_failed_response()
+    except Exception as e:
+        logger.error(f"增量修改配置失败: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+def _folder_operation_success(**fields):
+    """文件夹操作成功的响应（附带当前配置修订号，便于前端继续增量修改）"""
+    return web.json_response({
+        'success': True,
+        **fields,
+        'revision': config_store.revision
+    })
+
+
+@server.PromptServer.instance.routes.post("/node-manager/folder/create")
+async def create_folder(request):
+    """创建文件夹"""
+    try:
+        data = await request.json()
         
-        # 更新层级（递归更新子文件夹）
-        def update_level(fid, level):
-            config['folders'][fid]['level'] = level
-            for child_id, child in config['folders'].items():
-                if child.get('parent') == fid:
-                    update_level(child_id, level + 1)
-        
-        # 更新父级和层级
-        old_parent = folder.get('parent')
-        folder['parent'] = target_parent
-        update_level(folder_id, new_level)
-        
-        # 重新排序同级文件夹
-        siblings = [fid for fid, f in config['folders'].items() 
-                   if f.get('parent') == target_parent and fid != folder_id]
-        siblings.insert(target_order, folder_id)
+        async with config_store.lock:
+            config = load_config()
+            folder = apply_create_folder(config, config_store.folder_index,
+                                         data.get('name', ''), data.get('parent', None))
+            
+            if save_config(config):
+                return _folder_operation_success(folder=folder)
+            else:
+                return config_save_failed_response()
+            
+    except FolderOperationError as e:
+        return folder_operation_error_response(e)
+    except Exception as e:
+        logger.error(f"创建文件夹失败: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@server.PromptServer.instance.routes.post("/node-manager/folder/rename")
+async def rename_folder(request):
+    """重命名文件夹"""
+    try:
+        data = await request.json()
         
-        for idx, fid in enumerate(siblings):
-            config['folders'][fid]['order'] = idx
+        async with config_store.lock:
+            config = load_config()
+            apply_rename_folder(config, data.get('id'), data.get('name', ''))
+            
+            if save_config(config):
+                return _folder_operation_success(message='重命名成功')
+            else:
+                return config_save_failed_response()
+            
+    except FolderOperationError as e:
+        return folder_operation_error_response(e)
+    except Exception as e:
+        logger.error(f"重命名文件夹失败: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@server.PromptServer.instance.routes.post("/node-manager/folder/delete")
+async def delete_folder(request):
+    """删除文件夹"""
+    try:
+        data = await request.json()
         
-        # 重新排序原来父级下的文件夹
-        if old_parent != target_parent:
-            old_siblings = [fid for fid, f in config['folders'].items() 
-                           if f.get('parent') == old_parent]
-            for idx, fid in enumerate(sorted(old_siblings, 
-                                            key=lambda x: config['folders'][x].get('order', 0))):
-                config['folders'][fid]['order'] = idx
+        async with config_store.lock:
+            config = load_config()
+            to_delete = apply_delete_folders(config, config_store.folder_index, data.get('ids', []))
+            
+            if save_config(config):
+                return _folder_operation_success(message=f'已删除 {len(to_delete)} 个文件夹')
+            else:
+                return config_save_failed_response()
+            
+    except FolderOperationError as e:
+        return folder_operation_error_response(e)
+    except Exception as e:
+        logger.error(f"删除文件夹失败: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@server.PromptServer.instance.routes.post("/node-manager/folder/move")
+async def move_folder(request):
+    """移动文件夹（拖拽）"""
+    try:
+        data = await request.json()
         
-        if save_config(config):
-            return web.json_response({
-                'success': True,
-                'message': '移动成功'
-            })
-        else:
-            return web.json_response({
-                'success': False,
-                'error': '保存失败'
-            }, status=500)
+        async with config_store.lock:
+            config = load_config()
+            apply_move_folder(config, config_store.folder_index, data.get('id'),
+                              data.get('target_parent', None), data.get('target_order', 0))
+            
+            if save_config(config):
+                return _folder_operation_success(message='移动成功')
+            else:
+                return config_save_failed_response()
             
+    except FolderOperationError as e:
+        return folder_operation_error_response(e)
     except Exception as e:
         logger.error(f"移动文件夹失败: {e}")
         return web.json_response({
@@ -619,38 +1718,155 @@ async def toggle_folder(request):
     """切换文件夹展开/折叠状态"""
     try:
         data = await request.json()
-        folder_id = data.get('id')
-        
-        if not folder_id:
-            return web.json_response({
-                'success': False,
-                'error': '参数不完整'
-            }, status=400)
         
-        config = load_config()
+        async with config_store.lock:
+            config = load_config()
+            expanded = apply_toggle_folder(config, data.get('id'))
+            
+            if save_config(config):
+                return _folder_operation_success(expanded=expanded)
+            else:
+                return config_save_failed_response()
+            
+    except FolderOperationError as e:
+        return folder_operation_error_response(e)
+    except Exception as e:
+        logger.error(f"切换文件夹状态失败: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+# 批量操作支持的操作类型及其必需字段
+BATCH_OPERATIONS = {
+    'folder.create': ('name',),
+    'folder.rename': ('id', 'name'),
+    'folder.move': ('id',),
+    'folder.delete': ('ids',),
+    'folder.toggle': ('id',),
+    'nodes.add': ('folder', 'nodes'),
+    'nodes.remove': ('folder', 'nodes'),
+    'customName.set': ('node',),
+}
+
+
+def validate_batch_operations(operations):
+    """批量操作的结构校验（执行前一次性完成），返回错误信息或 None"""
+    if not isinstance(operations, list) or not operations:
+        return '参数 operations 必须是非空数组'
+    
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            return f'第 {index} 个操作格式错误'
+        op = operation.get('op')
+        if op not in BATCH_OPERATIONS:
+            return f'第 {index} 个操作类型不支持: {op}'
+        for field in BATCH_OPERATIONS[op]:
+            if field not in operation:
+                return f'第 {index} 个操作 ({op}) 缺少字段: {field}'
+        if op in ('nodes.add', 'nodes.remove') and not isinstance(operation['nodes'], list):
+            return f'第 {index} 个操作 ({op}) 的 nodes 必须是数组'
+        if op == 'folder.delete' and not isinstance(operation['ids'], list):
+            return f'第 {index} 个操作 ({op}) 的 ids 必须是数组'
+    return None
+
+
+def apply_batch_operation(config, folder_index, operation):
+    """执行单个批量操作，返回该操作的结果"""
+    op = operation['op']
+    
+    if op == 'folder.create':
+        folder = apply_create_folder(config, folder_index, operation['name'],
+                                     operation.get('parent'), operation.get('id'))
+        return {'folder': folder}
+    
+    if op == 'folder.rename':
+        apply_rename_folder(config, operation['id'], operation['name'])
+        return {}
+    
+    if op == 'folder.move':
+        apply_move_folder(config, folder_index, operation['id'],
+                          operation.get('target_parent'), operation.get('target_order', 0))
+        return {}
+    
+    if op == 'folder.delete':
+        deleted = apply_delete_folders(config, folder_index, operation['ids'])
+        return {'deleted': sorted(deleted)}
+    
+    if op == 'folder.toggle':
+        return {'expanded': apply_toggle_folder(config, operation['id'], operation.get('expanded'))}
+    
+    if op == 'nodes.add':
+        return {'added': apply_add_folder_nodes(config, operation['folder'], operation['nodes'])}
+    
+    if op == 'nodes.remove':
+        return {'removed': apply_remove_folder_nodes(config, operation['folder'], operation['nodes'])}
+    
+    # customName.set：name 为空时移除自定义名称
+    name = operation.get('name')
+    if name:
+        config['nodeCustomNames'][operation['node']] = name
+    else:
+        config['nodeCustomNames'].pop(operation['node'], None)
+    return {}
+
+
+@server.PromptServer.instance.routes.post("/node-manager/batch")
+async def batch_operations(request):
+    """
+    批量执行文件夹 / 文件夹节点 / 自定义名称操作
+    所有操作在配置副本上按顺序执行，全部成功才替换并保存一次；任一失败则整体不生效
+    """
+    try:
+        data = await request.json()
+        operations = data.get('operations')
         
-        if folder_id not in config['folders']:
+        error = validate_batch_operations(operations)
+        if error:
             return web.json_response({
                 'success': False,
-                'error': '文件夹不存在'
-            }, status=404)
+                'error': error
+            }, status=400)
         
-        folder = config['folders'][folder_id]
-        folder['expanded'] = not folder.get('expanded', True)
+        import copy
         
-        if save_config(config):
-            return web.json_response({
-                'success': True,
-                'expanded': folder['expanded']
-            })
-        else:
-            return web.json_response({
-                'success': False,
-                'error': '保存失败'
-            }, status=500)
+        async with config_store.lock:
+            config = load_config()
+            
+            # 只复制会被修改的部分
+            working = dict(config)
+            working['folders'] = copy.deepcopy(config['folders'])
+            working['folderNodes'] = copy.deepcopy(config['folderNodes'])
+            working['nodeCustomNames'] = dict(config['nodeCustomNames'])
+            folder_index = FolderIndex(working['folders'])
             
+            results = []
+            for index, operation in enumerate(operations):
+                try:
+                    result = apply_batch_operation(working, folder_index, operation)
+                except FolderOperationError as e:
+                    return web.json_response({
+                        'success': False,
+                        'error': str(e),
+                        'failed_index': index,
+                        'failed_op': operation['op'],
+                        'results': results
+                    }, status=e.status)
+                results.append({'index': index, 'op': operation['op'], 'success': True, **result})
+            
+            # 全部成功，替换配置并只保存一次
+            config['folders'] = working['folders']
+            config['folderNodes'] = working['folderNodes']
+            config['nodeCustomNames'] = working['nodeCustomNames']
+            
+            if save_config(config):
+                return _folder_operation_success(results=results, count=len(results))
+            else:
+                return config_save_failed_response()
+        
     except Exception as e:
-        logger.error(f"切换文件夹状态失败: {e}")
+        logger.error(f"批量操作失败: {e}")
         return web.json_response({
             'success': False,
             'error': str(e)
@@ -721,71 +1937,683 @@ def scan_plugin_nodes():
     except Exception as e:
         logger.error(f"扫描插件目录失败: {e}")
     
-    return {'nodes': nodes, 'plugins': plugins}
+    return {'nodes': nodes, 'plugins': plugins}
+
+
+def get_custom_nodes_dir():
+    """获取 custom_nodes 目录路径"""
+    # 当前插件在 custom_nodes/888888/
+    # 向上两级就是 ComfyUI 根目录
+    comfyui_root = os.path.dirname(os.path.dirname(PLUGIN_DIR))
+    custom_nodes_dir = os.path.join(comfyui_root, 'custom_nodes')
+    return custom_nodes_dir
+
+
+# 插件文件夹清单按目录 mtime 缓存 {目录: (mtime, 记录元组)}
+# 目录增删子文件夹时 mtime 会变化；子文件夹内的变化（如 git clone 稍后写出 __init__.py）不会，
+# 所以缓存中只保存文件夹名和路径，has_init 由 scan_custom_nodes_folders 每次重新检查
+_FOLDER_SCAN_CACHE = {}
+
+
+def scan_plugin_folders(directory):
+    """
+    用 os.scandir 列出目录下的插件文件夹（跳过隐藏文件夹和 __pycache__）
+    返回 ({'name', 'path'}, ...) 元组，目录未变化时直接返回缓存，调用方不要修改记录
+    """
+    mtime = directory_mtime(directory)
+    cached = _FOLDER_SCAN_CACHE.get(directory)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    
+    records = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or entry.name == '__pycache__':
+                continue
+            try:
+                # d_type 已由 scandir 返回，普通目录无需额外 stat（符号链接除外）
+                if not entry.is_dir():
+                    continue
+            except OSError:
+                continue
+            records.append({'name': entry.name, 'path': entry.path})
+    
+    records = tuple(records)
+    _FOLDER_SCAN_CACHE[directory] = (mtime, records)
+    logger.debug(f"扫描 {directory}：共 {len(records)} 个插件文件夹")
+    return records
+
+
+def scan_custom_nodes_folders():
+    """扫描 custom_nodes 目录下的所有插件文件夹"""
+    custom_nodes_dir = get_custom_nodes_dir()
+    
+    if not os.path.exists(custom_nodes_dir):
+        logger.warning(f"custom_nodes 目录不存在: {custom_nodes_dir}")
+        return []
+    
+    try:
+        return [
+            dict(record, has_init=os.path.isfile(os.path.join(record['path'], '__init__.py')), node_count=0)
+            for record in scan_plugin_folders(custom_nodes_dir)
+        ]
+    except Exception as e:
+        logger.error(f"扫描 custom_nodes 目录失败: {e}")
+        return []
+
+
+def scan_managed_plugin_folders():
+    """扫描 managed_plugins 目录下的插件文件夹名"""
+    if not os.path.exists(MANAGED_PLUGINS_DIR):
+        return []
+    return [record['name'] for record in scan_plugin_folders(MANAGED_PLUGINS_DIR)]
+
+
+# ========== 插件目录监视 ==========
+# custom_nodes 和 managed_plugins 的文件夹清单缓存在内存中，只在目录变化后重新扫描：
+# Linux 上用 inotify 监视目录增删，其他平台按目录 mtime 轮询；
+# 清单变化时通过 send_sync 推送 node-manager.plugins-changed 事件，浏览器无需轮询
+# 设置 NODE_MANAGER_WATCH=0 关闭监视（每次读取清单时比较目录 mtime）
+PLUGIN_WATCH_ENABLED = os.environ.get('NODE_MANAGER_WATCH', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+PLUGIN_WATCH_INTERVAL = 2.0  # 轮询间隔（秒）
+PLUGIN_WATCH_DEBOUNCE = 0.5  # git clone / 解压会产生大量事件，合并后再处理
+PLUGINS_CHANGED_EVENT = 'node-manager.plugins-changed'
+
+# inotify 事件掩码（只关心子目录的增删和被监视目录本身的移除）
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+INOTIFY_WATCH_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+
+def notify_plugins_changed(version, changes):
+    """向浏览器推送插件目录变化事件"""
+    for key, change in changes.items():
+        logger.info(f"插件目录变化 ({key}): 新增 {change['added']}，移除 {change['removed']}")
+    try:
+        server.PromptServer.instance.send_sync(PLUGINS_CHANGED_EVENT, {'version': version, 'changes': changes})
+    except Exception as e:
+        logger.debug(f"推送插件目录变化失败: {e}")
+    # 已开始扫描过元数据时，顺带更新新增/移除插件的元数据
+    if plugin_metadata_scanner.version:
+        plugin_metadata_scanner.request_scan()
+
+
+class PluginInventory:
+    """
+    两个插件目录的文件夹清单
+    由事件驱动（inotify）时只在 invalidate() 后重新扫描，否则每次读取时比较目录 mtime；
+    两种方式下，读取时都会复查还没有 __init__.py 的文件夹
+    """
+    
+    def __init__(self):
+        # 以毫秒时间戳为初值，重启后的版本号不会与旧页面缓存的 ETag 重合
+        self.version = int(time.time() * 1000)
+        self.event_driven = False
+        # {清单名: (目录 mtime, 扫描结果)}
+        self._entries = {}
+        # 已失效但保留旧结果（用于计算增删）的清单名
+        self._stale = set()
+    
+    @staticmethod
+    def _sources():
+        return {
+            'custom_nodes': (get_custom_nodes_dir(), scan_custom_nodes_folders),
+            'managed_plugins': (MANAGED_PLUGINS_DIR, scan_managed_plugin_folders)
+        }
+    
+    @staticmethod
+    def _names(records):
+        return {record['name'] if isinstance(record, dict) else record for record in records}
+    
+    @staticmethod
+    def _init_appeared(records):
+        """
+        记录为没有 __init__.py 的文件夹现在是否有了：目录监视在新文件夹出现后就会扫描，
+        手动 git clone 通常稍后才写出 __init__.py，而这不会再产生顶层目录事件
+        """
+        return any(
+            isinstance(record, dict) and record.get('has_init') is False
+            and os.path.isfile(os.path.join(record['path'], '__init__.py'))
+            for record in records
+        )
+    
+    def invalidate(self, paths=None):
+        """标记目录需要重新扫描（paths 为空时标记全部）"""
+        for key, (path, _) in self._sources().items():
+            if paths is None or path in paths:
+                self._stale.add(key)
+    
+    def ensure_current(self):
+        """重新扫描已失效的目录；清单有变化时递增版本号并推送事件。返回版本号"""
+        changes = {}
+        for key, (path, scan) in self._sources().items():
+            cached = self._entries.get(key)
+            if (cached is not None and key not in self._stale
+                    and (self.event_driven or cached[0] == directory_mtime(path))
+                    and not self._init_appeared(cached[1])):
+                continue
+            self._stale.discard(key)
+            mtime = directory_mtime(path)
+            records = scan()
+            self._entries[key] = (mtime, records)
+            if cached is not None and cached[1] != records:
+                old_names, new_names = self._names(cached[1]), self._names(records)
+                changes[key] = {
+                    'added': sorted(new_names - old_names),
+                    'removed': sorted(old_names - new_names)
+                }
+        if changes:
+            self.version += 1
+            notify_plugins_changed(self.version, changes)
+        return self.version
+    
+    def custom_nodes(self):
+        """custom_nodes 下的插件文件夹信息（返回副本，调用方可以修改）"""
+        self.ensure_current()
+        return [dict(record) for record in self._entries['custom_nodes'][1]]
+    
+    def managed_plugins(self):
+        """managed_plugins 下的插件文件夹名"""
+        self.ensure_current()
+        return list(self._entries['managed_plugins'][1])
+    
+    def installed_names(self):
+        """已安装（custom_nodes 下）的插件文件夹名集合"""
+        self.ensure_current()
+        return self._names(self._entries['custom_nodes'][1])
+
+
+plugin_inventory = PluginInventory()
+
+
+class PluginFolderWatcher:
+    """监视插件目录的增删，变化时刷新插件清单（清单自身负责推送事件）"""
+    
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self.backend = None
+        self._fd = None
+        self._wd_paths = {}
+        self._dirty = set()
+        self._flush_handle = None
+        self._poll_task = None
+    
+    @staticmethod
+    def _paths():
+        return [path for path in (get_custom_nodes_dir(), MANAGED_PLUGINS_DIR) if os.path.isdir(path)]
+    
+    def start(self):
+        """在事件循环中启动监视：优先 inotify，不可用时退回 mtime 轮询"""
+        loop = asyncio.get_running_loop()
+        if self._start_inotify(loop):
+            self.backend = 'inotify'
+            self.inventory.event_driven = True
+            # 监视开始前的变化不会产生事件，先全部重新扫描一次
+            self.inventory.invalidate()
+        else:
+            self.backend = 'poll'
+            self._poll_task = start_background_task(self._poll())
+        logger.info(f"插件目录监视已启动 ({self.backend})")
+    
+    def stop(self):
+        if self._fd is not None:
+            try:
+                asyncio.get_running_loop().remove_reader(self._fd)
+            except Exception:
+                pass
+            os.close(self._fd)
+            self._fd = None
+            self.inventory.event_driven = False
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+    
+    def _start_inotify(self, loop):
+        if not sys.platform.startswith('linux'):
+            return False
+        fd = None
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+            for path in self._paths():
+                wd = libc.inotify_add_watch(fd, os.fsencode(path), INOTIFY_WATCH_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f'inotify_add_watch 失败: {path}')
+                self._wd_paths[wd] = path
+            loop.add_reader(fd, self._read_inotify_events)
+        except Exception as e:
+            logger.debug(f"inotify 不可用，改用轮询: {e}")
+            if fd is not None and fd >= 0:
+                os.close(fd)
+            self._wd_paths.clear()
+            return False
+        self._fd = fd
+        return True
+    
+    def _read_inotify_events(self):
+        import struct
+        header_size = struct.calcsize('iIII')
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except (BlockingIOError, InterruptedError):
+                break
+            if not data:
+                break
+            # 只需要知道哪个目录发生了变化，不解析文件名
+            offset = 0
+            while offset + header_size <= len(data):
+                wd, mask, _, name_length = struct.unpack_from('iIII', data, offset)
+                offset += header_size + name_length
+                if mask & IN_Q_OVERFLOW:
+                    self._dirty.update(self._wd_paths.values())
+                elif wd in self._wd_paths:
+                    self._dirty.add(self._wd_paths[wd])
+                if mask & IN_IGNORED:
+                    # 被监视的目录已被删除或移走，之后的变化只能靠 mtime 判断
+                    self.inventory.event_driven = False
+        if self._dirty and self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(PLUGIN_WATCH_DEBOUNCE, self._flush)
+    
+    def _flush(self):
+        self._flush_handle = None
+        dirty, self._dirty = self._dirty, set()
+        self.inventory.invalidate(dirty)
+        try:
+            self.inventory.ensure_current()
+        except Exception as e:
+            logger.error(f"刷新插件清单失败: {e}")
+    
+    async def _poll(self):
+        mtimes = {path: directory_mtime(path) for path in self._paths()}
+        while True:
+            await asyncio.sleep(PLUGIN_WATCH_INTERVAL)
+            current = {path: directory_mtime(path) for path in mtimes}
+            if current != mtimes:
+                mtimes = current
+                try:
+                    # 清单按 mtime 判断失效，这里只需触发一次检查（有变化时会推送事件）
+                    self.inventory.ensure_current()
+                except Exception as e:
+                    logger.error(f"刷新插件清单失败: {e}")
+
+
+plugin_folder_watcher = PluginFolderWatcher(plugin_inventory)
+
+
+# ========== 插件元数据扫描 ==========
+# 后台线程池统计每个插件文件夹的磁盘占用、文件数、最后修改时间和 git 信息（直接读取 .git，不启动子进程），
+# 结果按 (文件夹 mtime, .git mtime) 缓存在 data/ 中；/node-manager/plugins?metadata=1 时附加到插件列表
+# 这两个 mtime 只反映顶层文件的增删和 git 操作，子目录内的写入（下载模型、生成缓存）不会改变它们，
+# 所以每个插件的统计超过 PLUGIN_METADATA_FULL_SCAN_AGE 秒后会完整重新统计一次，期间的大小和文件数是近似值
+PLUGIN_METADATA_CACHE_FILE = os.path.join(DATA_DIR, "plugin_metadata.json")
+PLUGIN_METADATA_CACHE_FORMAT = 1
+PLUGIN_METADATA_WORKERS = 4
+# /plugins?metadata=1 距上次扫描超过该秒数时在后台重新检查缓存键
+PLUGIN_METADATA_MAX_AGE = 60
+# 缓存键未变化的插件，统计结果超过该秒数后也重新遍历整个文件夹
+PLUGIN_METADATA_FULL_SCAN_AGE = 30 * 60
+
+
+def _read_text(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _format_timestamp(timestamp):
+    from datetime import datetime
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+def resolve_git_dir(path):
+    """插件文件夹的 git 目录（.git 为文件时按 gitdir: 指向解析），不是仓库时返回 None"""
+    dot_git = os.path.join(path, '.git')
+    if os.path.isdir(dot_git):
+        return dot_git
+    content = _read_text(dot_git)
+    if content and content.startswith('gitdir:'):
+        return os.path.normpath(os.path.join(path, content[len('gitdir:'):].strip()))
+    return None
+
+
+def _read_git_ref(git_dir, common_dir, ref):
+    """读取引用指向的提交（松散引用优先，其次 packed-refs）"""
+    for base in dict.fromkeys((git_dir, common_dir)):
+        value = _read_text(os.path.join(base, *ref.split('/')))
+        if value and not value.startswith('ref:'):
+            return value.strip() or None
+    for line in (_read_text(os.path.join(common_dir, 'packed-refs')) or '').splitlines():
+        if line and line[0] not in '#^':
+            sha, _, name = line.partition(' ')
+            if name.strip() == ref:
+                return sha
+    return None
+
+
+def _strip_url_credentials(url):
+    """去掉远程地址中的用户名/令牌（https://token@github.com/... -> https://github.com/...）"""
+    scheme, sep, rest = url.partition('://')
+    if sep:
+        host, slash, path = rest.partition('/')
+        if '@' in host:
+            return f"{scheme}://{host.rsplit('@', 1)[1]}{slash}{path}"
+    return url
+
+
+def _read_git_remote(common_dir):
+    """从 git config 读取远程地址（优先 origin）"""
+    import re
+    urls = {}
+    section = None
+    for line in (_read_text(os.path.join(common_dir, 'config')) or '').splitlines():
+        # [section] 或 [section "subsection"]
+        match = re.match(r'^\s*\[\s*([^\s\]"]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]', line)
+        if match:
+            section = (match.group(1).lower(), match.group(2))
+            continue
+        if section and section[0] == 'remote':
+            key, sep, value = line.strip().partition('=')
+            if sep and key.strip().lower() == 'url':
+                urls.setdefault(section[1], value.strip())
+    url = urls.get('origin') or next(iter(urls.values()), None)
+    return _strip_url_credentials(url) if url else None
+
+
+def _read_head_updated_at(git_dir):
+    """HEAD 最近一次变化（克隆、拉取、切换分支）的时间，取自 logs/HEAD 最后一行"""
+    try:
+        with open(os.path.join(git_dir, 'logs', 'HEAD'), 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 4096))
+            lines = f.read().decode('utf-8', errors='replace').strip().splitlines()
+        # <旧提交> <新提交> <姓名> <邮箱> <时间戳> <时区>\t<说明>
+        timestamp = int(lines[-1].split('\t', 1)[0].rsplit(' ', 2)[1])
+        return _format_timestamp(timestamp)
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def read_git_info(path):
+    """读取插件文件夹的 git 信息 {commit, branch, remote, head_updated_at}，不是仓库时返回 None"""
+    git_dir = resolve_git_dir(path)
+    if git_dir is None:
+        return None
+    
+    # 工作树 (git worktree) 的引用和配置在公共目录中
+    common_dir = git_dir
+    commondir = _read_text(os.path.join(git_dir, 'commondir'))
+    if commondir:
+        common_dir = os.path.normpath(os.path.join(git_dir, commondir.strip()))
+    
+    head = (_read_text(os.path.join(git_dir, 'HEAD')) or '').strip()
+    branch = None
+    commit = None
+    if head.startswith('ref:'):
+        ref = head[len('ref:'):].strip()
+        if ref.startswith('refs/heads/'):
+            branch = ref[len('refs/heads/'):]
+        commit = _read_git_ref(git_dir, common_dir, ref)
+    elif head:
+        # 分离头指针
+        commit = head
+    
+    return {
+        'commit': commit,
+        'branch': branch,
+        'remote': _read_git_remote(common_dir),
+        'head_updated_at': _read_head_updated_at(git_dir)
+    }
+
+
+def collect_plugin_metadata(path):
+    """
+    统计插件文件夹：总大小、文件数、最后修改时间（不含 .git）和 git 信息
+    不跟随符号链接（插件常把模型目录链接进来）
+    """
+    size = 0
+    file_count = 0
+    latest_mtime = 0
+    stack = [(path, False)]
+    while stack:
+        current, in_git = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, in_git or entry.name == '.git'))
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                size += stat.st_size
+                file_count += 1
+                if not in_git and stat.st_mtime > latest_mtime:
+                    latest_mtime = stat.st_mtime
+    
+    return {
+        'size_bytes': size,
+        'file_count': file_count,
+        'last_modified': _format_timestamp(latest_mtime),
+        'git': read_git_info(path)
+    }
+
+
+def plugin_metadata_key(path):
+    """元数据缓存键：文件夹和 .git 目录的 mtime（拉取更新会改写 .git 下的文件）"""
+    return [directory_mtime(path), directory_mtime(os.path.join(path, '.git'))]
+
+
+class PluginMetadataScanner:
+    """在后台线程池中扫描 custom_nodes 下各插件的元数据"""
+    
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.version = 0
+        # {插件路径: {'key': [...], 'metadata': {...}, 'scanned_at': 统计时间}}，首次扫描时从磁盘加载
+        self._entries = None
+        self._task = None
+        self._executor = None
+        self._last_scan = 0
+    
+    @property
+    def scanning(self):
+        return self._task is not None and not self._task.done()
+    
+    def get(self, path):
+        entry = (self._entries or {}).get(path)
+        return entry['metadata'] if entry else None
+    
+    def request_scan(self, max_age=None):
+        """启动后台扫描（正在扫描或距上次扫描不足 max_age 秒时不重复启动）"""
+        if self.scanning:
+            return self._task
+        if max_age is not None and time.time() - self._last_scan < max_age:
+            return None
+        self._task = start_background_task(self.scan())
+        return self._task
+    
+    def _load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == PLUGIN_METADATA_CACHE_FORMAT:
+                return data.get('entries', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.debug(f"读取插件元数据缓存失败: {e}")
+        return {}
+    
+    def _save(self):
+        try:
+            data = json.dumps({'format': PLUGIN_METADATA_CACHE_FORMAT, 'entries': self._entries}, ensure_ascii=False)
+            write_file_atomic(self.cache_file, data.encode('utf-8'))
+        except Exception as e:
+            logger.debug(f"保存插件元数据缓存失败: {e}")
+    
+    async def scan(self):
+        """重新扫描 (文件夹 mtime, .git mtime) 变化过、或统计结果已超过 PLUGIN_METADATA_FULL_SCAN_AGE 的插件"""
+        try:
+            await self._scan()
+        finally:
+            self._last_scan = time.time()
+    
+    async def _scan(self):
+        from concurrent.futures import ThreadPoolExecutor
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=PLUGIN_METADATA_WORKERS, thread_name_prefix='plugin-metadata')
+        if self._entries is None:
+            self._entries = await loop.run_in_executor(self._executor, self._load)
+            self.version += 1
+        
+        paths = [plugin['path'] for plugin in plugin_inventory.custom_nodes()]
+        keys = await loop.run_in_executor(self._executor, lambda: {path: plugin_metadata_key(path) for path in paths})
+        expired = time.time() - PLUGIN_METADATA_FULL_SCAN_AGE
+        stale = [
+            path for path in paths
+            if (self._entries.get(path) or {}).get('key') != keys[path]
+            or self._entries[path].get('scanned_at', 0) < expired
+        ]
+        removed = [path for path in self._entries if path not in keys]
+        if not stale and not removed:
+            return
+        
+        started = time.perf_counter()
+        scanned_at = time.time()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self._executor, collect_plugin_metadata, path) for path in stale),
+            return_exceptions=True
+        )
+        for path, result in zip(stale, results):
+            if isinstance(result, Exception):
+                logger.debug(f"扫描插件元数据失败 {path}: {result}")
+                continue
+            self._entries[path] = {'key': keys[path], 'metadata': result, 'scanned_at': scanned_at}
+        for path in removed:
+            del self._entries[path]
+        
+        self.version += 1
+        await loop.run_in_executor(self._executor, self._save)
+        logger.info(f"插件元数据扫描完成：更新 {len(stale)} 个，移除 {len(removed)} 个，耗时 {_elapsed_ms(started):.0f}ms")
+    
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
 
 
-def get_custom_nodes_dir():
-    """获取 custom_nodes 目录路径"""
-    # 当前插件在 custom_nodes/888888/
-    # 向上两级就是 ComfyUI 根目录
-    comfyui_root = os.path.dirname(os.path.dirname(PLUGIN_DIR))
-    custom_nodes_dir = os.path.join(comfyui_root, 'custom_nodes')
-    return custom_nodes_dir
+plugin_metadata_scanner = PluginMetadataScanner(PLUGIN_METADATA_CACHE_FILE)
 
 
-def scan_custom_nodes_folders():
-    """扫描 custom_nodes 目录下的所有插件文件夹"""
-    plugins = []
-    custom_nodes_dir = get_custom_nodes_dir()
+def wants_metadata(request):
+    """请求是否要求附带插件元数据（?metadata=1）"""
+    return request.query.get('metadata', '').lower() in ('1', 'true', 'yes')
+
+
+# ========== 模块来源解析 ==========
+# 模块名 -> 插件来源 的缓存（节点数以千计，但模块只有数百个）
+# MODULE_TO_FOLDER_MAP 只在启动时建立一次，缓存在进程内一直有效
+_MODULE_SOURCE_CACHE = {}
+
+
+def _extract_custom_nodes_folder(path):
+    """从文件路径或路径形式的模块名中提取 custom_nodes 下的第一级文件夹名"""
+    normalized = path.replace('\\', '/')
+    if '/custom_nodes/' not in normalized:
+        return None
+    after_custom = normalized.split('/custom_nodes/', 1)[1]
+    return after_custom.split('/')[0] or None
+
+
+def _resolve_module_source_uncached(module_name):
+    """解析模块所属的插件来源（未缓存版本）"""
+    if not module_name:
+        return "ComfyUI"
     
-    if not os.path.exists(custom_nodes_dir):
-        logger.warning(f"custom_nodes 目录不存在: {custom_nodes_dir}")
-        return plugins
+    # 方法1: 从模块的 __file__ 获取实际文件路径（最准确）
+    module_obj = sys.modules.get(module_name)
+    file_path = getattr(module_obj, '__file__', None)
+    if file_path:
+        plugin_folder = _extract_custom_nodes_folder(file_path)
+        if plugin_folder:
+            return plugin_folder
     
-    try:
-        for item_name in os.listdir(custom_nodes_dir):
-            item_path = os.path.join(custom_nodes_dir, item_name)
-            
-            # 跳过非目录和隐藏文件
-            if not os.path.isdir(item_path):
-                continue
-            if item_name.startswith('.'):
-                continue
-            if item_name == '__pycache__':
-                continue
-            
-            # 记录插件文件夹
-            plugin_info = {
-                'name': item_name,
-                'path': item_path,
-                'has_init': os.path.exists(os.path.join(item_path, '__init__.py')),
-                'node_count': 0
-            }
-            
-            plugins.append(plugin_info)
-            logger.info(f"发现插件文件夹: {item_name}")
-        
-        logger.info(f"共发现 {len(plugins)} 个插件文件夹")
-        
-    except Exception as e:
-        logger.error(f"扫描 custom_nodes 目录失败: {e}")
+    # 方法2: 模块名中包含 custom_nodes (各种格式)
+    if 'custom_nodes' in module_name:
+        # 路径形式: F:\ai\ComfyUI\custom_nodes\plugin-name 或 /path/to/custom_nodes/plugin-name
+        plugin_folder = _extract_custom_nodes_folder(module_name)
+        if plugin_folder:
+            # 处理 plugin-name.submodule 的情况，只取插件名
+            return plugin_folder.split('.')[0]
+        
+        # 点分隔: custom_nodes.plugin_name.xxx -> plugin_name
+        parts = module_name.split('.')
+        if len(parts) >= 2 and parts[1]:
+            return parts[1]
+        return "ComfyUI"
     
-    return plugins
+    # 方法3: 不包含 custom_nodes 但也不是内置节点，取模块名第一部分
+    if module_name.startswith('nodes.') or module_name.startswith('comfy.'):
+        return "ComfyUI"
+    top_module = module_name.split('.')[0]
+    if not top_module or top_module in ('nodes', 'comfy'):
+        return "ComfyUI"
+    
+    # 使用模块映射表（处理文件夹名和模块名不一致的情况）
+    # 例如 bizyair -> bizyengine, Hello nano banana -> Gemini_Imagen_Generator
+    return MODULE_TO_FOLDER_MAP.get(top_module, top_module)
 
 
-def get_comfyui_nodes():
-    """获取 ComfyUI 所有已注册的节点"""
+def resolve_module_source(module_name):
+    """将节点类的 __module__ 解析为插件来源（插件文件夹名），结果按模块缓存"""
+    source = _MODULE_SOURCE_CACHE.get(module_name)
+    if source is None:
+        source = _resolve_module_source_uncached(module_name)
+        _MODULE_SOURCE_CACHE[module_name] = source
+    return source
+
+
+def get_comfyui_nodes(node_items=None, display_mappings=None):
+    """
+    获取 ComfyUI 所有已注册的节点
+    node_items / display_mappings 可由调用方传入映射的副本（用于在线程池中构建快照）
+    """
     nodes = []
     
     try:
-        # 获取 ComfyUI 的 NODE_CLASS_MAPPINGS
-        import nodes as comfy_nodes
-        
-        if hasattr(comfy_nodes, 'NODE_CLASS_MAPPINGS'):
-            node_mappings = comfy_nodes.NODE_CLASS_MAPPINGS
+        if node_items is None:
+            # 获取 ComfyUI 的 NODE_CLASS_MAPPINGS
+            import nodes as comfy_nodes
+            node_items = list(getattr(comfy_nodes, 'NODE_CLASS_MAPPINGS', {}).items())
             display_mappings = getattr(comfy_nodes, 'NODE_DISPLAY_NAME_MAPPINGS', {})
-            
-            for node_id, node_class in node_mappings.items():
+        if display_mappings is None:
+            display_mappings = {}
+        
+        if node_items:
+            for node_id, node_class in node_items:
                 try:
                     # 获取节点信息
                     display_name = display_mappings.get(node_id, node_id)
@@ -802,45 +2630,8 @@ def get_comfyui_nodes():
                     elif node_class.__doc__:
                         description = node_class.__doc__.strip()
                     
-                    # 判断来源 - 改进的识别逻辑
-                    source = "ComfyUI"
-                    if hasattr(node_class, '__module__'):
-                        module_name = node_class.__module__
-                        
-                        # 方法1: 检查是否包含 custom_nodes (各种格式)
-                        if 'custom_nodes' in module_name:
-                            # Windows路径: F:\ai\ComfyUI\custom_nodes\plugin-name
-                            if '\\custom_nodes\\' in module_name:
-                                after_custom = module_name.split('\\custom_nodes\\')[1]
-                                plugin_folder = after_custom.split('\\')[0]
-                                # 处理 plugin-name.submodule 的情况，只取插件名
-                                plugin_folder = plugin_folder.split('.')[0]
-                                source = plugin_folder
-                            # Unix路径: /path/to/custom_nodes/plugin-name
-                            elif '/custom_nodes/' in module_name:
-                                after_custom = module_name.split('/custom_nodes/')[1]
-                                plugin_folder = after_custom.split('/')[0]
-                                # 处理 plugin-name.submodule 的情况，只取插件名
-                                plugin_folder = plugin_folder.split('.')[0]
-                                source = plugin_folder
-                            # 点分隔: custom_nodes.plugin_name.xxx
-                            else:
-                                parts = module_name.split('.')
-                                if len(parts) >= 2:
-                                    # custom_nodes.plugin_name -> plugin_name
-                                    source = parts[1]
-                        
-                        # 方法2: 不包含 custom_nodes 但也不是内置节点
-                        elif not module_name.startswith('nodes.') and not module_name.startswith('comfy.'):
-                            # 直接从模块名提取第一部分
-                            parts = module_name.split('.')
-                            if len(parts) > 0 and parts[0] and parts[0] not in ['nodes', 'comfy']:
-                                source = parts[0]
-                        
-                        # 方法3: 使用模块映射表（处理文件夹名和模块名不一致的情况）
-                        # 例如 bizyair -> bizyengine, Hello nano banana -> Gemini_Imagen_Generator
-                        if source != "ComfyUI" and source in MODULE_TO_FOLDER_MAP:
-                            source = MODULE_TO_FOLDER_MAP[source]
+                    # 判断来源（按模块缓存）
+                    source = resolve_module_source(getattr(node_class, '__module__', None))
                     
                     nodes.append({
                         'id': node_id,
@@ -875,21 +2666,197 @@ def get_comfyui_nodes():
     return nodes
 
 
+# ========== 节点注册表快照 ==========
+class NodeRegistrySnapshot:
+    """
+    节点注册表快照
+    由 NODE_CLASS_MAPPINGS 构建一次并带有版本号，
+    映射未变化前由 /nodes、/node-sources、/plugins 共享
+    """
+
+    def __init__(self, version, nodes):
+        self.version = version
+        self.nodes = nodes
+        self.nodes_by_id = {}
+        self.node_sources = {}
+        self.nodes_by_plugin = {}
+        # 节点内容指纹，用于和历史版本比较出变化的节点
+        self.fingerprints = {}
+        for node in nodes:
+            self.nodes_by_id[node['id']] = node
+            self.node_sources[node['id']] = node['source']
+            self.nodes_by_plugin.setdefault(node['source'], []).append(node)
+            self.fingerprints[node['id']] = (
+                node['display_name'],
+                node['category'],
+                node['description'],
+                node['source']
+            )
+        
+        # /nodes 使用的按插件分组结果
+        self.plugins = [
+            {
+                'name': source,
+                'nodes': plugin_nodes,
+                'node_count': len(plugin_nodes)
+            }
+            for source, plugin_nodes in self.nodes_by_plugin.items()
+        ]
+        
+        # 标准化名称 -> 来源（保留第一个匹配，与逐个比较的结果一致）
+        self.normalized_sources = {}
+        for source in self.nodes_by_plugin:
+            self.normalized_sources.setdefault(normalize_plugin_name(source), source)
+        
+        self._category_trees = None
+        self._pinyin_texts = None
+
+    @property
+    def category_trees(self):
+        """分类树（仅 /plugins 需要，首次访问时构建）"""
+        if self._category_trees is None:
+            self._category_trees = build_category_tree(self.nodes_by_plugin)
+        return self._category_trees
+
+    @property
+    def pinyin_texts(self):
+        """需要拼音的文本（显示名、分类段、插件名，首次访问时收集）"""
+        if self._pinyin_texts is None:
+            self._pinyin_texts = collect_pinyin_texts(self.nodes, self.nodes_by_plugin)
+        return self._pinyin_texts
+
+
+_registry_snapshot = None
+_registry_lock = None
+
+# 历史版本的节点指纹 {version: {node_id: fingerprint}}，用于增量同步
+REGISTRY_HISTORY_SIZE = 8
+_registry_history = {}
+
+# 拼音代数：pypinyin 安装后递增，计入注册表版本，使 ETag、version 和 ?since 随拼音一起失效
+_pinyin_generation = 0
+
+
+def compute_registry_version(node_items):
+    """
+    计算节点映射的版本号
+    基于映射的键和节点类标识，插件热重载替换节点类时版本也会变化
+    """
+    hasher = hashlib.sha1(f"pinyin:{_pinyin_generation}\n".encode('utf-8'))
+    for node_id, node_class in node_items:
+        hasher.update(f"{node_id}\0{id(node_class)}\n".encode('utf-8', errors='replace'))
+    return hasher.hexdigest()[:16]
+
+
+async def get_node_registry():
+    """获取节点注册表快照（映射变化时才重建，并发的首次请求共享同一次构建）"""
+    global _registry_snapshot, _registry_lock
+    import nodes as comfy_nodes
+    
+    node_items = list(getattr(comfy_nodes, 'NODE_CLASS_MAPPINGS', {}).items())
+    version = compute_registry_version(node_items)
+    
+    snapshot = _registry_snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    
+    if _registry_lock is None:
+        _registry_lock = asyncio.Lock()
+    
+    async with _registry_lock:
+        # 等待期间其他请求可能已经构建好了
+        snapshot = _registry_snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        
+        display_mappings = dict(getattr(comfy_nodes, 'NODE_DISPLAY_NAME_MAPPINGS', {}))
+        loop = asyncio.get_running_loop()
+        nodes = await loop.run_in_executor(None, get_comfyui_nodes, node_items, display_mappings)
+        
+        snapshot = NodeRegistrySnapshot(version, nodes)
+        
+        # 保留旧版本的指纹，供带 since 参数的客户端做增量同步
+        if _registry_snapshot is not None:
+            _registry_history[_registry_snapshot.version] = _registry_snapshot.fingerprints
+            while len(_registry_history) > REGISTRY_HISTORY_SIZE:
+                del _registry_history[next(iter(_registry_history))]
+        _registry_history.pop(version, None)
+        
+        _registry_snapshot = snapshot
+        logger.info(f"节点注册表快照已更新，版本: {version}")
+        return snapshot
+
+
+def get_registry_delta(registry, since):
+    """
+    计算从 since 版本到当前快照的节点变化
+    返回 (added_ids, changed_ids, removed_ids)；since 未知时返回 None
+    """
+    old_fingerprints = _registry_history.get(since)
+    if old_fingerprints is None:
+        return None
+    
+    added, changed = [], []
+    for node_id, fingerprint in registry.fingerprints.items():
+        old = old_fingerprints.get(node_id)
+        if old is None:
+            added.append(node_id)
+        elif old != fingerprint:
+            changed.append(node_id)
+    removed = [node_id for node_id in old_fingerprints if node_id not in registry.fingerprints]
+    return added, changed, removed
+
+
 @server.PromptServer.instance.routes.get("/node-manager/node-sources")
 async def get_node_sources(request):
-    """获取节点到插件来源的映射 (轻量级)"""
+    """获取节点到插件来源的映射 (轻量级)，支持 ?since=<version> 增量同步，?pinyin=1 附带拼音"""
     try:
-        all_nodes = get_comfyui_nodes()
-        
-        # 构建 node_id -> source 映射
-        node_sources = {}
-        for node in all_nodes:
-            node_sources[node['id']] = node['source']
-        
-        return web.json_response({
+        with_pinyin = wants_pinyin(request)
+        registry = await get_node_registry()
+        etag = make_etag('sources', registry.version)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+        
+        since = request.query.get('since')
+        if since:
+            if since == registry.version:
+                return web.Response(status=304)
+            
+            delta = get_registry_delta(registry, since)
+            if delta is not None:
+                added, changed, removed = delta
+                # 只关心来源发生变化的节点（指纹最后一项为来源）
+                old_fingerprints = _registry_history[since]
+                response_data = {
+                    'success': True,
+                    'delta': True,
+                    'since': since,
+                    'version': registry.version,
+                    'added': {node_id: registry.node_sources[node_id] for node_id in added},
+                    'changed': {node_id: registry.node_sources[node_id]
+                                for node_id in changed
+                                if old_fingerprints[node_id][-1] != registry.node_sources[node_id]},
+                    'removed': removed
+                }
+                if with_pinyin:
+                    # 显示名或分类变化的节点也需要新的拼音
+                    response_data['pinyin'] = await pinyin_index.lookup(collect_pinyin_texts(
+                        registry.nodes_by_id[node_id] for node_id in added + changed))
+                return await json_response(request, response_data, etag=etag)
+        
+        # 完整映射是注册表快照的一部分，编码结果按 ETag 缓存
+        cache_key = etag + ':pinyin' if with_pinyin else etag
+        cached = await cached_json_response(request, cache_key, etag)
+        if cached is not None:
+            return cached
+        response_data = {
             'success': True,
-            'node_sources': node_sources
-        })
+            'node_sources': registry.node_sources,
+            'version': registry.version
+        }
+        if with_pinyin:
+            response_data['pinyin'] = await pinyin_index.lookup(registry.pinyin_texts)
+        return await json_response(request, response_data, etag=etag, cache_key=cache_key)
         
     except Exception as e:
         logger.error(f"获取节点来源映射失败: {e}")
@@ -901,30 +2868,55 @@ async def get_node_sources(request):
 
 @server.PromptServer.instance.routes.get("/node-manager/nodes")
 async def get_nodes(request):
-    """获取所有节点列表"""
+    """获取所有节点列表，支持 ?since=<version> 增量同步，?pinyin=1 附带拼音"""
     try:
-        # 获取 ComfyUI 所有已注册节点
-        all_nodes = get_comfyui_nodes()
-        
-        # 按插件分组
-        plugins_map = {}
-        for node in all_nodes:
-            source = node['source']
-            if source not in plugins_map:
-                plugins_map[source] = {
-                    'name': source,
-                    'nodes': [],
-                    'node_count': 0
+        with_pinyin = wants_pinyin(request)
+        # 获取已注册节点的快照（已按插件分组）
+        registry = await get_node_registry()
+        etag = make_etag('nodes', registry.version)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+        
+        # 增量同步：只返回新增、删除和变化的节点
+        since = request.query.get('since')
+        if since:
+            if since == registry.version:
+                return web.Response(status=304)
+            
+            delta = get_registry_delta(registry, since)
+            if delta is not None:
+                added, changed, removed = delta
+                response_data = {
+                    'success': True,
+                    'delta': True,
+                    'since': since,
+                    'version': registry.version,
+                    'added': [registry.nodes_by_id[node_id] for node_id in added],
+                    'changed': [registry.nodes_by_id[node_id] for node_id in changed],
+                    'removed': removed,
+                    'total_count': len(registry.nodes)
                 }
-            plugins_map[source]['nodes'].append(node)
-            plugins_map[source]['node_count'] += 1
-        
-        return web.json_response({
+                if with_pinyin:
+                    response_data['pinyin'] = await pinyin_index.lookup(
+                        collect_pinyin_texts(response_data['added'] + response_data['changed']))
+                return await json_response(request, response_data, etag=etag)
+        
+        # 完整列表是注册表快照，编码和压缩结果按 ETag 缓存
+        cache_key = etag + ':pinyin' if with_pinyin else etag
+        cached = await cached_json_response(request, cache_key, etag)
+        if cached is not None:
+            return cached
+        response_data = {
             'success': True,
-            'nodes': all_nodes,
-            'plugins': list(plugins_map.values()),
-            'total_count': len(all_nodes)
-        })
+            'nodes': registry.nodes,
+            'plugins': registry.plugins,
+            'total_count': len(registry.nodes),
+            'version': registry.version
+        }
+        if with_pinyin:
+            # 随节点列表附带拼音索引，客户端无需再请求 /search/pinyin
+            response_data['pinyin'] = await pinyin_index.lookup(registry.pinyin_texts)
+        return await json_response(request, response_data, etag=etag, cache_key=cache_key)
         
     except Exception as e:
         logger.error(f"获取节点列表失败: {e}")
@@ -1012,6 +3004,35 @@ def build_category_tree(nodes_by_plugin):
     return plugin_trees
 
 
+@server.PromptServer.instance.routes.get("/node-manager/debug/startup")
+async def debug_startup(request):
+    """调试：插件导入各阶段和每个托管插件的耗时，?history=N 附带最近 N 次启动记录"""
+    try:
+        response = {
+            'success': True,
+            'startup': startup_report,
+            'history_enabled': STARTUP_HISTORY_ENABLED
+        }
+        history = request.query.get('history')
+        if history:
+            try:
+                limit = max(int(history), 1)
+            except ValueError:
+                return web.json_response({
+                    'success': False,
+                    'error': '参数 history 必须是整数'
+                }, status=400)
+            loop = asyncio.get_running_loop()
+            response['history'] = await loop.run_in_executor(None, read_startup_history, limit)
+        return web.json_response(response)
+    except Exception as e:
+        logger.error(f"获取启动耗时失败: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
 @server.PromptServer.instance.routes.get("/node-manager/debug/nodes")
 async def debug_nodes(request):
     """调试：查看节点的模块信息"""
@@ -1028,56 +3049,8 @@ async def debug_nodes(request):
                 module_name = node_class.__module__ if hasattr(node_class, '__module__') else 'Unknown'
                 display_name = display_mappings.get(node_id, node_id)
                 
-                # 判断来源 - 使用和 get_comfyui_nodes 一样的逻辑
-                source = "ComfyUI"
-                if hasattr(node_class, '__module__'):
-                    # 尝试从模块的 __file__ 属性获取实际文件路径（最准确）
-                    try:
-                        import sys
-                        if module_name in sys.modules:
-                            module_obj = sys.modules[module_name]
-                            if hasattr(module_obj, '__file__') and module_obj.__file__:
-                                file_path = module_obj.__file__
-                                # 标准化路径分隔符
-                                file_path = file_path.replace('\\', '/')
-                                
-                                # 查找 custom_nodes 目录
-                                if '/custom_nodes/' in file_path:
-                                    # 提取 custom_nodes 后的第一个文件夹名
-                                    after_custom = file_path.split('/custom_nodes/')[1]
-                                    plugin_folder = after_custom.split('/')[0]
-                                    source = plugin_folder
-                    except:
-                        pass
-                    
-                    # 如果 __file__ 不可用，回退到解析 __module__
-                    if source == "ComfyUI" and 'custom_nodes' in module_name:
-                        if '\\custom_nodes\\' in module_name:
-                            after_custom = module_name.split('\\custom_nodes\\')[1]
-                            plugin_folder = after_custom.split('\\')[0]
-                            plugin_folder = plugin_folder.split('.')[0]
-                            source = plugin_folder
-                        elif '/custom_nodes/' in module_name:
-                            after_custom = module_name.split('/custom_nodes/')[1]
-                            plugin_folder = after_custom.split('/')[0]
-                            plugin_folder = plugin_folder.split('.')[0]
-                            source = plugin_folder
-                        else:
-                            parts = module_name.split('.')
-                            if len(parts) >= 2:
-                                source = parts[1]
-                    
-                    # 如果还是 ComfyUI，尝试从模块名提取
-                    if source == "ComfyUI" and not module_name.startswith('nodes.') and not module_name.startswith('comfy.'):
-                        parts = module_name.split('.')
-                        if len(parts) > 0 and parts[0] and parts[0] not in ['nodes', 'comfy']:
-                            module_source = parts[0]
-                            
-                            # 使用模块映射表（处理文件夹名和模块名不一致的情况）
-                            if module_source in MODULE_TO_FOLDER_MAP:
-                                source = MODULE_TO_FOLDER_MAP[module_source]
-                            else:
-                                source = module_source
+                # 判断来源 - 与 get_comfyui_nodes 共用同一个解析器
+                source = resolve_module_source(getattr(node_class, '__module__', None))
                 
                 all_nodes_debug.append({
                     'id': node_id,
@@ -1104,16 +3077,26 @@ async def debug_nodes(request):
 async def get_plugins(request):
     """获取所有插件文件夹列表（带分类树，包含重复检测）"""
     try:
-        # 1. 扫描 custom_nodes 目录
-        plugins = scan_custom_nodes_folders()
-        
-        # 2. 扫描 managed_plugins 目录
-        managed_plugins = []
-        if os.path.exists(MANAGED_PLUGINS_DIR):
-            for folder in os.listdir(MANAGED_PLUGINS_DIR):
-                folder_path = os.path.join(MANAGED_PLUGINS_DIR, folder)
-                if os.path.isdir(folder_path) and not folder.startswith('.'):
-                    managed_plugins.append(folder)
+        # 插件列表只取决于两个插件目录的内容和节点注册表
+        registry = await get_node_registry()
+        include_metadata = wants_metadata(request)
+        etag_parts = ['plugins', registry.version, plugin_inventory.ensure_current()]
+        if include_metadata:
+            # 元数据在后台扫描，本次响应返回已有的结果
+            plugin_metadata_scanner.request_scan(max_age=PLUGIN_METADATA_MAX_AGE)
+            etag_parts += ['metadata', plugin_metadata_scanner.version, int(plugin_metadata_scanner.scanning)]
+        etag = make_etag(*etag_parts)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+        cached = await cached_json_response(request, etag, etag)
+        if cached is not None:
+            return cached
+        
+        # 1. custom_nodes 目录的插件文件夹（清单只在目录变化后重新扫描）
+        plugins = plugin_inventory.custom_nodes()
+        
+        # 2. managed_plugins 目录的插件文件夹
+        managed_plugins = plugin_inventory.managed_plugins()
         
         # 3. 检测重复（同时在两个目录）
         managed_set = set(managed_plugins)
@@ -1124,19 +3107,11 @@ async def get_plugins(request):
             else:
                 plugin['is_duplicate'] = False
         
-        # 获取已注册的节点
-        all_nodes = get_comfyui_nodes()
-        
-        # 按插件分组节点
-        nodes_by_plugin = {}
-        for node in all_nodes:
-            source = node['source']
-            if source not in nodes_by_plugin:
-                nodes_by_plugin[source] = []
-            nodes_by_plugin[source].append(node)
+        # 已注册节点的快照（已按插件分组）
+        nodes_by_plugin = registry.nodes_by_plugin
         
-        # 构建分类树
-        category_trees = build_category_tree(nodes_by_plugin)
+        # 分类树随快照缓存
+        category_trees = registry.category_trees
         
         # 创建标准化映射
         for plugin in plugins:
@@ -1149,33 +3124,38 @@ async def get_plugins(request):
                 plugin['categories'] = category_trees.get(folder_name, {})
             else:
                 # 2. 标准化匹配（连字符转下划线）
-                normalized_folder = normalize_plugin_name(folder_name)
-                found = False
-                
-                for source in nodes_by_plugin.keys():
-                    normalized_source = normalize_plugin_name(source)
-                    if normalized_folder == normalized_source:
-                        plugin['node_count'] = len(nodes_by_plugin[source])
-                        plugin['python_name'] = source  # 保存实际的Python模块名
-                        plugin['categories'] = category_trees.get(source, {})
-                        found = True
-                        break
+                source = registry.normalized_sources.get(normalize_plugin_name(folder_name))
                 
-                if not found:
+                if source is not None:
+                    plugin['node_count'] = len(nodes_by_plugin[source])
+                    plugin['python_name'] = source  # 保存实际的Python模块名
+                    plugin['categories'] = category_trees.get(source, {})
+                else:
                     plugin['node_count'] = 0
                     plugin['python_name'] = folder_name
                     plugin['categories'] = {}
             
             plugin['has_nodes'] = plugin['node_count'] > 0
         
+        # 可选：磁盘占用、文件数、最后修改时间和 git 信息
+        if include_metadata:
+            for plugin in plugins:
+                metadata = plugin_metadata_scanner.get(plugin['path'])
+                if metadata:
+                    plugin.update(metadata)
+        
         # 按节点数量排序，节点多的在前
         plugins.sort(key=lambda x: x['node_count'], reverse=True)
         
-        return web.json_response({
+        result = {
             'success': True,
             'plugins': plugins,
-            'total_count': len(plugins)
-        })
+            'total_count': len(plugins),
+            'version': registry.version
+        }
+        if include_metadata:
+            result['metadata_pending'] = plugin_metadata_scanner.scanning
+        return await json_response(request, result, etag=etag, cache_key=etag)
         
     except Exception as e:
         logger.error(f"获取插件列表失败: {e}")
@@ -1193,24 +3173,22 @@ async def toggle_hidden_plugins(request):
         plugin_names = data.get('pluginNames', [])
         action = data.get('action', 'hide')  # 'hide' 或 'show'
         
-        config = load_config()
-        if 'hiddenPlugins' not in config:
-            config['hiddenPlugins'] = []
-        
-        hidden_set = set(config['hiddenPlugins'])
-        
-        if action == 'hide':
-            hidden_set.update(plugin_names)
-        else:  # show
-            hidden_set.difference_update(plugin_names)
-        
-        config['hiddenPlugins'] = list(hidden_set)
-        save_config(config)
-        
-        return web.json_response({
-            'success': True,
-            'hiddenPlugins': config['hiddenPlugins']
-        })
+        async with config_store.lock:
+            config = load_config()
+            if 'hiddenPlugins' not in config:
+                config['hiddenPlugins'] = []
+            
+            hidden_set = set(config['hiddenPlugins'])
+            
+            if action == 'hide':
+                hidden_set.update(plugin_names)
+            else:  # show
+                hidden_set.difference_update(plugin_names)
+            
+            config['hiddenPlugins'] = list(hidden_set)
+            if not save_config(config):
+                return config_save_failed_response()
+            return _folder_operation_success(hiddenPlugins=config['hiddenPlugins'])
     except Exception as e:
         logger.error(f"切换插件隐藏状态失败: {e}")
         return web.json_response({
@@ -1226,14 +3204,12 @@ async def toggle_show_hidden(request):
         data = await request.json()
         show_hidden = data.get('showHidden', False)
         
-        config = load_config()
-        config['showHiddenPlugins'] = show_hidden
-        save_config(config)
-        
-        return web.json_response({
-            'success': True,
-            'showHiddenPlugins': show_hidden
-        })
+        async with config_store.lock:
+            config = load_config()
+            config['showHiddenPlugins'] = show_hidden
+            if not save_config(config):
+                return config_save_failed_response()
+            return _folder_operation_success(showHiddenPlugins=show_hidden)
     except Exception as e:
         logger.error(f"切换显示隐藏插件失败: {e}")
         return web.json_response({
@@ -1298,18 +3274,27 @@ async def delete_plugins(request):
                     'error': str(e)
                 })
         
+        if deleted:
+            # 不等目录监视的事件，下次读取插件清单时立即重新扫描
+            plugin_inventory.invalidate()
+        
         # 从配置中移除已删除插件的隐藏状态
+        persist_error = None
         if deleted:
-            config = load_config()
-            hidden_plugins = config.get('hiddenPlugins', [])
-            config['hiddenPlugins'] = [p for p in hidden_plugins if p not in deleted]
-            save_config(config)
+            async with config_store.lock:
+                config = load_config()
+                hidden_plugins = config.get('hiddenPlugins', [])
+                config['hiddenPlugins'] = [p for p in hidden_plugins if p not in deleted]
+                if not save_config(config):
+                    persist_error = config_store.persist_error
         
         response_data = {
             'success': len(deleted) > 0,
             'deleted': deleted,
             'errors': errors,
-            'message': f'成功删除 {len(deleted)} 个插件' + (f'，{len(errors)} 个失败' if errors else '')
+            'message': f'成功删除 {len(deleted)} 个插件' + (f'，{len(errors)} 个失败' if errors else ''),
+            'revision': config_store.revision,
+            'persist_error': persist_error
         }
         
         if len(deleted) > 0:
@@ -1324,14 +3309,698 @@ async def delete_plugins(request):
         }, status=500)
 
 
+# ========== 拼音索引 ==========
+# 启动后在后台为所有节点显示名、分类段和插件名预先计算拼音，按文本哈希持久化到 data/，
+# 之后只为新出现的文本增量计算；/search/pinyin 变为查表
+PINYIN_INDEX_FILE = os.path.join(DATA_DIR, "pinyin_index.json")
+PINYIN_INDEX_FORMAT = 1
+PINYIN_FLUSH_DELAY = 2.0
+
+
+def contains_chinese(text):
+    """文本是否包含中文（只有含中文的文本需要拼音）"""
+    return any('\u4e00' <= ch <= '\u9fa5' for ch in text)
+
+
+def compute_pinyin(text):
+    """计算拼音首字母和全拼（小写），需要 pypinyin"""
+    pypinyin = import_optional('pypinyin')
+    lazy_pinyin, Style = pypinyin.lazy_pinyin, pypinyin.Style
+    return {
+        'initials': ''.join([py[0].lower() for py in lazy_pinyin(text, style=Style.FIRST_LETTER)]),  # 首字母：jzq
+        'full': ''.join(lazy_pinyin(text, style=Style.NORMAL)).lower()  # 全拼：jiazaiqi
+    }
+
+
+class PinyinIndex:
+    """
+    文本 -> 拼音 的持久化索引
+    以文本的 sha1 前缀为键保存 [首字母, 全拼]，文件中不重复保存原文
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = None
+        self._dirty = False
+        self._flush_task = None
+
+    @staticmethod
+    def text_key(text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('format') == PINYIN_INDEX_FORMAT:
+                    entries = data.get('entries', {})
+            except Exception as e:
+                logger.warning(f"读取拼音索引失败，将重新生成: {e}")
+        self._entries = entries
+        return entries
+
+    def get(self, text):
+        """查询已索引的拼音，未索引时返回 None"""
+        entry = self._load().get(self.text_key(text))
+        if entry is None:
+            return None
+        return {'initials': entry[0], 'full': entry[1]}
+
+    def missing(self, texts):
+        """返回尚未索引的文本"""
+        entries = self._load()
+        return [text for text in texts if self.text_key(text) not in entries]
+
+    def add(self, computed):
+        """加入新计算的拼音 {text: {'initials', 'full'}}，并安排写盘"""
+        if not computed:
+            return
+        entries = self._load()
+        for text, data in computed.items():
+            entries[self.text_key(text)] = [data['initials'], data['full']]
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_loop())
+
+    def _serialize(self):
+        return json.dumps({'format': PINYIN_INDEX_FORMAT, 'entries': self._entries},
+                          ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while self._dirty:
+            await asyncio.sleep(PINYIN_FLUSH_DELAY)
+            self._dirty = False
+            data = self._serialize()
+            try:
+                await loop.run_in_executor(None, write_file_atomic, self.path, data)
+            except Exception as e:
+                logger.error(f"保存拼音索引失败: {e}")
+                break
+
+    def flush_sync(self):
+        if not self._dirty or self._entries is None:
+            return
+        self._dirty = False
+        try:
+            write_file_atomic(self.path, self._serialize())
+        except Exception as e:
+            logger.error(f"保存拼音索引失败: {e}")
+
+    async def lookup(self, texts):
+        """
+        批量查询拼音 {text: {'initials', 'full'}}
+        未索引的文本在线程池中计算后加入索引
+        """
+        texts = [text for text in dict.fromkeys(texts) if text and isinstance(text, str)]
+        missing = self.missing(texts)
+        if missing and pypinyin_available():
+            loop = asyncio.get_running_loop()
+            computed = await loop.run_in_executor(None, lambda: {text: compute_pinyin(text) for text in missing})
+            self.add(computed)
+        result = {}
+        for text in texts:
+            data = self.get(text)
+            if data is not None:
+                result[text] = data
+        return result
+
+
+pinyin_index = PinyinIndex(PINYIN_INDEX_FILE)
+atexit.register(pinyin_index.flush_sync)
+
+
+def collect_pinyin_texts(nodes, plugin_names=()):
+    """需要拼音的文本：节点显示名、分类路径的每一段、插件名"""
+    texts = set(plugin_names)
+    for node in nodes:
+        texts.add(node['display_name'])
+        for part in node['category'].split('/'):
+            texts.add(part.strip())
+    return sorted(text for text in texts if text and contains_chinese(text))
+
+
+def wants_pinyin(request):
+    """请求是否要求随节点数据附带拼音（?pinyin=1）"""
+    return request.query.get('pinyin', '').lower() in ('1', 'true', 'yes')
+
+
+async def build_pinyin_index():
+    """后台任务：为注册表、插件文件夹和自定义文件夹名称补全拼音索引"""
+    if not pypinyin_available():
+        return
+    try:
+        registry = await get_node_registry()
+        texts = list(registry.pinyin_texts)
+        texts.extend(name for name in plugin_inventory.installed_names() if contains_chinese(name))
+        texts.extend(folder.get('name', '') for folder in load_config()['folders'].values()
+                     if contains_chinese(folder.get('name', '')))
+        missing = pinyin_index.missing(texts)
+        if missing:
+            await pinyin_index.lookup(missing)
+        logger.info(f"拼音索引就绪：共 {len(texts)} 条文本，新计算 {len(missing)} 条")
+    except Exception as e:
+        logger.error(f"构建拼音索引失败: {e}")
+
+
+_background_tasks = set()
+
+
+def start_background_task(coro):
+    """启动后台任务并保留引用，避免任务被垃圾回收"""
+    task = asyncio.get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+# ========== 节点搜索 ==========
+# 由注册表快照建立的倒排索引：短字段（ID、显示名、分类、来源、拼音）建立 1~3 字符的 n-gram 倒排，
+# 描述建立词倒排；查询先由倒排得到候选，再逐个打分，注册表版本或自定义名称变化时只更新变化的节点
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 2000
+SEARCH_GRAM_SIZE = 3
+
+# 各字段的匹配得分（显示名和拼音与前端 matchText 的打分一致）
+SEARCH_FIELD_SCORES = {
+    'name': {'exact': 100, 'start': 80, 'contain': 50},
+    'id': {'exact': 90, 'start': 70, 'contain': 45},
+    'category': {'exact': 45, 'start': 35, 'contain': 30},
+    'source': {'exact': 40, 'start': 30, 'contain': 25},
+    'pinyin_initials': {'contain': 40},
+    'pinyin_full': {'contain': 35},
+    'description': {'token': 15},
+}
+SEARCH_GRAM_FIELDS = ('name', 'id', 'category', 'source', 'pinyin_initials', 'pinyin_full')
+
+# ?fields= 可用的字段组
+SEARCH_FIELD_GROUPS = {
+    'name': ('name', 'pinyin_initials', 'pinyin_full'),
+    'id': ('id',),
+    'category': ('category',),
+    'source': ('source',),
+    'description': ('description',),
+    'pinyin': ('pinyin_initials', 'pinyin_full'),
+}
+
+
+def tokenize_search_text(text):
+    """拆分为小写词：英文单词、数字和连续的中文"""
+    import re
+    return re.findall(r'[a-z0-9]+|[\u4e00-\u9fa5]+', text.lower())
+
+
+def text_grams(text):
+    """文本中所有长度为 1~SEARCH_GRAM_SIZE 的子串"""
+    grams = set()
+    for size in range(1, SEARCH_GRAM_SIZE + 1):
+        for i in range(len(text) - size + 1):
+            grams.add(text[i:i + size])
+    return grams
+
+
+class NodeSearchIndex:
+    """节点搜索索引（修改只在 NodeSearchIndex.lock 内进行）"""
+
+    def __init__(self):
+        self.version = None
+        self.config_revision = None
+        self._lock = None
+        # node_id -> 文档 {字段: 小写文本}
+        self.docs = {}
+        # node_id -> 建索引时的输入，用于判断节点是否需要重新索引
+        self._doc_keys = {}
+        # n-gram -> {node_id}
+        self.grams = {}
+        # 描述中的词 -> {node_id}
+        self.tokens = {}
+        self._vocabulary = None
+
+    @property
+    def lock(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    # ---------- 建立和更新 ----------
+
+    def reset(self):
+        """清空索引，下次 ensure_current 时全部重建"""
+        self.version = None
+        self.config_revision = None
+        self.docs = {}
+        self._doc_keys = {}
+        self.grams = {}
+        self.tokens = {}
+        self._vocabulary = None
+
+    def _make_doc(self, node, custom_name):
+        name = custom_name or node['display_name']
+        pinyin = pinyin_index.get(name) if contains_chinese(name) else None
+        return {
+            'name': name.lower(),
+            'id': node['id'].lower(),
+            'category': str(node['category'] or '').lower(),
+            'source': node['source'].lower(),
+            'pinyin_initials': pinyin['initials'] if pinyin else '',
+            'pinyin_full': pinyin['full'] if pinyin else '',
+            'description': tokenize_search_text(str(node['description'] or '')),
+        }
+
+    def _add(self, node_id, doc):
+        self.docs[node_id] = doc
+        for field in SEARCH_GRAM_FIELDS:
+            for gram in text_grams(doc[field]):
+                self.grams.setdefault(gram, set()).add(node_id)
+        for token in doc['description']:
+            postings = self.tokens.get(token)
+            if postings is None:
+                postings = self.tokens[token] = set()
+                self._vocabulary = None
+            postings.add(node_id)
+
+    def _remove(self, node_id):
+        doc = self.docs.pop(node_id, None)
+        self._doc_keys.pop(node_id, None)
+        if doc is None:
+            return
+        for field in SEARCH_GRAM_FIELDS:
+            for gram in text_grams(doc[field]):
+                postings = self.grams.get(gram)
+                if postings is not None:
+                    postings.discard(node_id)
+                    if not postings:
+                        del self.grams[gram]
+        for token in doc['description']:
+            postings = self.tokens.get(token)
+            if postings is not None:
+                postings.discard(node_id)
+                if not postings:
+                    del self.tokens[token]
+                    self._vocabulary = None
+
+    def sync(self, registry, custom_names, config_revision):
+        """按注册表快照和自定义名称更新索引，返回重新索引的节点数"""
+        updated = 0
+        for node in registry.nodes:
+            node_id = node['id']
+            custom_name = custom_names.get(node_id)
+            doc_key = (registry.fingerprints[node_id], custom_name)
+            if self._doc_keys.get(node_id) == doc_key:
+                continue
+            self._remove(node_id)
+            self._add(node_id, self._make_doc(node, custom_name))
+            self._doc_keys[node_id] = doc_key
+            updated += 1
+        for node_id in [node_id for node_id in self.docs if node_id not in registry.nodes_by_id]:
+            self._remove(node_id)
+            updated += 1
+        self.version = registry.version
+        self.config_revision = config_revision
+        return updated
+
+    async def ensure_current(self):
+        """注册表版本或配置修订号变化时增量更新（需在 lock 内调用）"""
+        registry = await get_node_registry()
+        revision = config_store.revision
+        if self.version == registry.version and self.config_revision == revision:
+            return registry
+        custom_names = dict(load_config().get('nodeCustomNames', {}))
+        # 显示名和自定义名称的拼音（已索引的直接命中）
+        await pinyin_index.lookup(list(registry.pinyin_texts) +
+                                  [name for name in custom_names.values()
+                                   if isinstance(name, str) and contains_chinese(name)])
+        loop = asyncio.get_running_loop()
+        updated = await loop.run_in_executor(None, self.sync, registry, custom_names, revision)
+        if updated:
+            logger.info(f"节点搜索索引已更新 {updated} 个节点，共 {len(self.docs)} 个")
+        return registry
+
+    # ---------- 查询 ----------
+
+    def _gram_candidates(self, term):
+        if len(term) <= SEARCH_GRAM_SIZE:
+            return self.grams.get(term, set())
+        postings = [self.grams.get(term[i:i + SEARCH_GRAM_SIZE])
+                    for i in range(len(term) - SEARCH_GRAM_SIZE + 1)]
+        if any(p is None for p in postings):
+            return set()
+        postings.sort(key=len)
+        return set.intersection(*postings)
+
+    def _token_candidates(self, term):
+        """描述中以 term 开头的词对应的节点"""
+        import bisect
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.tokens)
+        vocabulary = self._vocabulary
+        candidates = set()
+        i = bisect.bisect_left(vocabulary, term)
+        while i < len(vocabulary) and vocabulary[i].startswith(term):
+            candidates |= self.tokens[vocabulary[i]]
+            i += 1
+        return candidates
+
+    @staticmethod
+    def _match(doc, term, fields):
+        """返回 (得分, 匹配类型, 字段)，不匹配时返回 None"""
+        best = None
+        for field in fields:
+            scores = SEARCH_FIELD_SCORES[field]
+            if field == 'description':
+                if any(token.startswith(term) for token in doc['description']):
+                    match = (scores['token'], 'description', field)
+                else:
+                    continue
+            else:
+                text = doc[field]
+                if not text or term not in text:
+                    continue
+                if text == term and 'exact' in scores:
+                    match = (scores['exact'], 'exact', field)
+                elif text.startswith(term) and 'start' in scores:
+                    match = (scores['start'], 'start', field)
+                elif field.startswith('pinyin'):
+                    match = (scores['contain'], field, field)
+                else:
+                    match = (scores['contain'], 'contain', field)
+            if best is None or match[0] > best[0]:
+                best = match
+        return best
+
+    def search(self, query, limit=SEARCH_DEFAULT_LIMIT, fields=None):
+        """
+        多个词之间为"且"关系，总分为各词最佳得分之和
+        返回 (按得分排序的前 limit 个结果, 匹配总数)
+        """
+        fields = tuple(fields or SEARCH_FIELD_SCORES)
+        terms = list(dict.fromkeys(query.lower().split()))
+        if not terms:
+            return [], 0
+        
+        matches = None
+        for term in terms:
+            candidates = set()
+            if any(field in SEARCH_GRAM_FIELDS for field in fields):
+                candidates |= self._gram_candidates(term)
+            if 'description' in fields:
+                candidates |= self._token_candidates(term)
+            if matches is not None:
+                candidates &= matches.keys()
+            term_matches = {}
+            for node_id in candidates:
+                match = self._match(self.docs[node_id], term, fields)
+                if match is None:
+                    continue
+                previous = matches[node_id] if matches is not None else None
+                if previous is None:
+                    term_matches[node_id] = match
+                else:
+                    # 累加得分，匹配类型和字段取得分最高的词
+                    best = match if match[0] > previous[0] else previous
+                    term_matches[node_id] = (previous[0] + match[0], best[1], best[2])
+            matches = term_matches
+            if not matches:
+                return [], 0
+        
+        # 得分高的在前；同分时名称短的在前（只对前 limit 个排序）
+        import heapq
+        ranked = heapq.nsmallest(limit, matches.items(),
+                                 key=lambda item: (-item[1][0], len(self.docs[item[0]]['name']), item[0]))
+        results = [
+            {'id': node_id, 'score': score, 'match_type': match_type, 'field': field}
+            for node_id, (score, match_type, field) in ranked
+        ]
+        return results, len(matches)
+
+
+node_search_index = NodeSearchIndex()
+
+
+def parse_search_fields(value):
+    """解析 ?fields=name,id，返回字段元组；含未知字段组时抛出 ValueError"""
+    if not value:
+        return None
+    fields = []
+    for group in value.split(','):
+        group = group.strip()
+        if not group:
+            continue
+        if group not in SEARCH_FIELD_GROUPS:
+            raise ValueError(f"未知的搜索字段: {group}")
+        fields.extend(SEARCH_FIELD_GROUPS[group])
+    return tuple(dict.fromkeys(fields)) or None
+
+
+# ========== 模糊查找 ==========
+# SymSpell 风格的删除字典：对节点 ID 和显示名（小写）的前 FUZZY_PREFIX_LENGTH 个字符，
+# 预先生成删除最多 FUZZY_MAX_DISTANCE 个字符后的所有变体；查询时只需生成查询词前缀的删除变体，
+# 查表得到少量候选后再计算编辑距离
+FUZZY_MAX_DISTANCE = 2
+FUZZY_PREFIX_LENGTH = 7
+
+
+def generate_deletes(text, max_distance):
+    """删除最多 max_distance 个字符得到的所有字符串（含原串）"""
+    results = {text}
+    frontier = {text}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            for i in range(len(item)):
+                next_frontier.add(item[:i] + item[i + 1:])
+        next_frontier -= results
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Damerau-Levenshtein 距离（相邻字符交换算一次编辑）
+    只计算对角线附近宽度为 max_distance 的带状区域，超过 max_distance 时提前返回 max_distance + 1
+    """
+    len_a, len_b = len(a), len(b)
+    if abs(len_a - len_b) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+    too_far = max_distance + 1
+    previous2 = None
+    previous = [j if j <= max_distance else too_far for j in range(len_b + 1)]
+    for i in range(1, len_a + 1):
+        current = [too_far] * (len_b + 1)
+        if i <= max_distance:
+            current[0] = i
+        start = max(1, i - max_distance)
+        end = min(len_b, i + max_distance)
+        row_min = current[0]
+        char_a = a[i - 1]
+        for j in range(start, end + 1):
+            if char_a == b[j - 1]:
+                value = previous[j - 1]
+            else:
+                value = min(previous[j], current[j - 1], previous[j - 1]) + 1
+                if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == b[j - 1]:
+                    value = min(value, previous2[j - 2] + 1)
+            if value > too_far:
+                value = too_far
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return too_far
+        previous2, previous = previous, current
+    return min(previous[len_b], too_far)
+
+
+class FuzzyNodeLookup:
+    """节点 ID 和显示名的容错查找（修改只在 lock 内进行）"""
+
+    def __init__(self, max_distance=FUZZY_MAX_DISTANCE, prefix_length=FUZZY_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.version = None
+        self._lock = None
+        # 小写词 -> {node_id}
+        self.terms = {}
+        # 删除变体 -> {小写词}
+        self.deletes = {}
+        # node_id -> 该节点的小写词
+        self._node_terms = {}
+        self.display_names = {}
+
+    @property
+    def lock(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _add_term(self, term, node_id):
+        node_ids = self.terms.get(term)
+        if node_ids is None:
+            node_ids = self.terms[term] = set()
+            for variant in generate_deletes(term[:self.prefix_length], self.max_distance):
+                self.deletes.setdefault(variant, set()).add(term)
+        node_ids.add(node_id)
+
+    def _remove_term(self, term, node_id):
+        node_ids = self.terms.get(term)
+        if node_ids is None:
+            return
+        node_ids.discard(node_id)
+        if node_ids:
+            return
+        del self.terms[term]
+        for variant in generate_deletes(term[:self.prefix_length], self.max_distance):
+            variant_terms = self.deletes.get(variant)
+            if variant_terms is not None:
+                variant_terms.discard(term)
+                if not variant_terms:
+                    del self.deletes[variant]
+
+    def sync(self, registry):
+        """按注册表快照更新（只处理词发生变化的节点）"""
+        for node in registry.nodes:
+            node_id = node['id']
+            terms = {node_id.lower(), node['display_name'].lower()}
+            old_terms = self._node_terms.get(node_id, set())
+            if terms == old_terms:
+                continue
+            for term in old_terms - terms:
+                self._remove_term(term, node_id)
+            for term in terms - old_terms:
+                self._add_term(term, node_id)
+            self._node_terms[node_id] = terms
+        for node_id in [node_id for node_id in self._node_terms if node_id not in registry.nodes_by_id]:
+            for term in self._node_terms.pop(node_id):
+                self._remove_term(term, node_id)
+        self.display_names = {node['id']: node['display_name'] for node in registry.nodes}
+        self.version = registry.version
+
+    async def ensure_current(self):
+        """注册表版本变化时在线程池中增量更新（需在 lock 内调用）"""
+        registry = await get_node_registry()
+        if self.version != registry.version:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.sync, registry)
+        return registry
+
+    def lookup(self, query, max_distance=None, limit=10):
+        """
+        查找编辑距离不超过 max_distance 的节点
+        返回 [{'id', 'display_name', 'matched', 'distance'}]，按距离排序
+        """
+        if max_distance is None:
+            max_distance = self.max_distance
+        max_distance = min(max_distance, self.max_distance)
+        query = query.strip().lower()
+        if not query:
+            return []
+        
+        candidates = set()
+        for variant in generate_deletes(query[:self.prefix_length], max_distance):
+            candidates |= self.deletes.get(variant, set())
+        
+        best = {}
+        for term in candidates:
+            distance = edit_distance(query, term, max_distance)
+            if distance > max_distance:
+                continue
+            for node_id in self.terms[term]:
+                if node_id not in best or distance < best[node_id][0]:
+                    best[node_id] = (distance, term)
+        
+        ranked = sorted(best.items(), key=lambda item: (item[1][0], abs(len(item[1][1]) - len(query)), item[0]))
+        return [
+            {
+                'id': node_id,
+                'display_name': self.display_names.get(node_id, node_id),
+                'matched': term,
+                'distance': distance
+            }
+            for node_id, (distance, term) in ranked[:limit]
+        ]
+
+
+fuzzy_node_lookup = FuzzyNodeLookup()
+
+
+async def fuzzy_lookup_nodes(query, max_distance=None, limit=10):
+    """在最新的注册表上做容错查找"""
+    async with fuzzy_node_lookup.lock:
+        await fuzzy_node_lookup.ensure_current()
+        return fuzzy_node_lookup.lookup(query, max_distance, limit)
+
+
+async def warm_up_indexes():
+    """后台任务：依次构建拼音索引、节点搜索索引和模糊查找索引"""
+    with startup_phase('pinyin_index', target='background'):
+        await build_pinyin_index()
+    try:
+        with startup_phase('search_index', target='background'):
+            async with node_search_index.lock:
+                await node_search_index.ensure_current()
+        with startup_phase('fuzzy_lookup', target='background'):
+            async with fuzzy_node_lookup.lock:
+                await fuzzy_node_lookup.ensure_current()
+    except Exception as e:
+        logger.error(f"构建节点搜索索引失败: {e}")
+
+
+async def rebuild_pinyin_indexes():
+    """pypinyin 安装后：补全拼音索引，更新注册表版本，重建带拼音的搜索索引和响应缓存"""
+    global _pinyin_generation, _registry_snapshot
+    await build_pinyin_index()
+    # 旧版本的响应不含拼音：换新版本号并丢弃增量历史，客户端的 ETag 和 ?since 都会回退到完整响应
+    _pinyin_generation += 1
+    _registry_snapshot = None
+    _registry_history.clear()
+    _response_cache.clear()
+    async with node_search_index.lock:
+        node_search_index.reset()
+        await node_search_index.ensure_current()
+
+
+async def on_server_startup(app):
+    """ComfyUI 服务启动后（所有节点已加载）执行的后台工作"""
+    start_background_task(warm_up_indexes())
+    if AUTO_INSTALL_DEPENDENCIES:
+        start_background_task(auto_install_dependencies())
+    if PLUGIN_WATCH_ENABLED:
+        plugin_folder_watcher.start()
+    plugin_metadata_scanner.request_scan()
+    await get_http_session()
+
+
+async def on_server_cleanup(app):
+    """ComfyUI 服务关闭时释放监视器、后台扫描线程和 HTTP 连接池"""
+    plugin_folder_watcher.stop()
+    plugin_metadata_scanner.close()
+    await close_http_session()
+
+
+server.PromptServer.instance.app.on_startup.append(on_server_startup)
+server.PromptServer.instance.app.on_cleanup.append(on_server_cleanup)
+
+
 @server.PromptServer.instance.routes.post("/node-manager/search/pinyin")
 async def get_pinyin_data(request):
-    """获取文本的拼音数据（用于前端搜索）"""
+    """获取文本的拼音数据（用于前端搜索，查询预先计算的拼音索引）"""
     try:
-        if not PYPINYIN_AVAILABLE:
+        if not pypinyin_available():
             return web.json_response({
                 'success': False,
-                'error': 'pypinyin 不可用'
+                'error': 'pypinyin 不可用，可通过 /node-manager/dependencies/install 安装'
             }, status=503)
         
         data = await request.json()
@@ -1343,22 +4012,8 @@ async def get_pinyin_data(request):
                 'error': '参数 texts 必须是数组'
             }, status=400)
         
-        # 批量获取拼音
-        result = {}
-        for text in texts:
-            if not text or not isinstance(text, str):
-                continue
-            
-            # 获取拼音首字母（小写）
-            pinyin_initials = ''.join([py[0].lower() for py in lazy_pinyin(text, style=Style.FIRST_LETTER)])
-            
-            # 获取全拼（小写，用于更精确的匹配）
-            pinyin_full = ''.join(lazy_pinyin(text, style=Style.NORMAL))
-            
-            result[text] = {
-                'initials': pinyin_initials,  # 首字母：jzq
-                'full': pinyin_full.lower()    # 全拼：jiazaiqi
-            }
+        # 查询拼音索引（未索引的文本计算后加入索引）
+        result = await pinyin_index.lookup(texts)
         
         return web.json_response({
             'success': True,
@@ -1374,6 +4029,210 @@ async def get_pinyin_data(request):
         }, status=500)
 
 
+@server.PromptServer.instance.routes.get("/node-manager/search")
+async def search_nodes_api(request):
+    """
+    服务端节点搜索
+    参数：q 关键词（空格分隔多个词）、limit 返回数量、fields 限定字段组（name,id,category,source,description,pinyin）、
+    fuzzy=1 没有结果时按编辑距离返回近似的节点（match_type 为 fuzzy）
+    """
+    try:
+        query = request.query.get('q', '').strip()
+        try:
+            limit = min(max(int(request.query.get('limit', SEARCH_DEFAULT_LIMIT)), 1), SEARCH_MAX_LIMIT)
+            fields = parse_search_fields(request.query.get('fields'))
+        except ValueError as e:
+            return web.json_response({
+                'success': False,
+                'error': str(e)
+            }, status=400)
+        
+        async with node_search_index.lock:
+            registry = await node_search_index.ensure_current()
+            results, total = node_search_index.search(query, limit, fields)
+        
+        if not results and request.query.get('fuzzy', '').lower() in ('1', 'true', 'yes'):
+            # 可能是拼写错误：按编辑距离给出近似的节点，得分低于任何精确匹配
+            for match in await fuzzy_lookup_nodes(query, limit=limit):
+                results.append({
+                    'id': match['id'],
+                    'score': 20 - 5 * match['distance'],
+                    'match_type': 'fuzzy',
+                    'field': 'name' if match['matched'] == match['display_name'].lower() else 'id',
+                    'distance': match['distance']
+                })
+        
+        return await json_response(request, {
+            'success': True,
+            'query': query,
+            'results': results,
+            'total': total,
+            'version': registry.version
+        })
+        
+    except Exception as e:
+        logger.error(f"节点搜索失败: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@server.PromptServer.instance.routes.get("/node-manager/search/fuzzy")
+async def fuzzy_search_api(request):
+    """容错查找（"您是不是要找"）：q 节点类名或显示名，max_distance 最大编辑距离（1~2），limit 返回数量"""
+    try:
+        query = request.query.get('q', '').strip()
+        try:
+            max_distance = min(max(int(request.query.get('max_distance', FUZZY_MAX_DISTANCE)), 0), FUZZY_MAX_DISTANCE)
+            limit = min(max(int(request.query.get('limit', 10)), 1), SEARCH_MAX_LIMIT)
+        except ValueError:
+            return web.json_response({
+                'success': False,
+                'error': '参数 max_distance 和 limit 必须是整数'
+            }, status=400)
+        
+        results = await fuzzy_lookup_nodes(query, max_distance, limit)
+        return web.json_response({
+            'success': True,
+            'query': query,
+            'results': results
+        })
+        
+    except Exception as e:
+        logger.error(f"模糊查找失败: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@server.PromptServer.instance.routes.get("/node-manager/dependencies")
+async def get_dependencies(request):
+    """获取可选依赖的状态"""
+    return web.json_response({
+        'success': True,
+        'dependencies': get_dependency_status(),
+        'auto_install': AUTO_INSTALL_DEPENDENCIES
+    })
+
+
+@server.PromptServer.instance.routes.post("/node-manager/dependencies/install")
+async def install_dependency_api(request):
+    """安装可选依赖 {name: 'pypinyin'}"""
+    try:
+        data = await request.json()
+        name = data.get('name', '')
+        
+        if name not in OPTIONAL_DEPENDENCIES:
+            return web.json_response({
+                'success': False,
+                'error': f'未知的依赖: {name}'
+            }, status=400)
+        
+        success, error = await install_optional_dependency(name)
+        if not success:
+            return web.json_response({
+                'success': False,
+                'error': f'安装失败: {error}'
+            }, status=500)
+        
+        return web.json_response({
+            'success': True,
+            'message': f'{OPTIONAL_DEPENDENCIES[name]["package"]} 已安装',
+            'dependencies': get_dependency_status()
+        })
+        
+    except Exception as e:
+        logger.error(f"安装依赖失败: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+# ========== HTTP 客户端 ==========
+# 插件商店和 GitHub 请求共用一个长连接会话（服务启动时创建，关闭时释放）：
+# 连接池限制每个主机的并发连接数并保持 keep-alive，DNS 解析结果缓存
+# 上游地址可通过环境变量覆盖（例如测试时指向本地的 aiohttp 替身服务）
+STORE_PLUGIN_LIST_URL = os.environ.get(
+    'NODE_MANAGER_PLUGIN_LIST_URL',
+    'https://raw.githubusercontent.com/ltdrdata/ComfyUI-Manager/main/custom-node-list.json')
+STORE_GITHUB_STATS_URL = os.environ.get(
+    'NODE_MANAGER_GITHUB_STATS_URL',
+    'https://raw.githubusercontent.com/ltdrdata/ComfyUI-Manager/main/github-stats.json')
+GITHUB_API_URL = os.environ.get('NODE_MANAGER_GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+
+HTTP_CONNECTION_LIMIT = 64
+HTTP_LIMIT_PER_HOST = 16
+HTTP_KEEPALIVE_TIMEOUT = 30
+HTTP_DNS_CACHE_TTL = 300
+
+_http_session = None
+
+
+async def get_http_session():
+    """共享的 aiohttp 会话（尚未创建或已关闭时新建）"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        import aiohttp
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_CONNECTION_LIMIT,
+            limit_per_host=HTTP_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL
+        )
+        _http_session = aiohttp.ClientSession(connector=connector, timeout=http_timeout(30))
+    return _http_session
+
+
+async def close_http_session():
+    global _http_session
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+
+@asynccontextmanager
+async def http_session():
+    """借用共享会话（退出时不关闭）"""
+    yield await get_http_session()
+
+
+async def fetch_upstream_json(session, url, validator, timeout):
+    """
+    条件请求上游 JSON 文件：validator 为上次保存的 {'url', 'etag', 'last_modified'}
+    返回 (数据, validator)；上游未变化 (304) 时数据为 None，validator 保持不变
+    """
+    headers = {}
+    if validator and validator.get('url') == url:
+        if validator.get('etag'):
+            headers['If-None-Match'] = validator['etag']
+        if validator.get('last_modified'):
+            headers['If-Modified-Since'] = validator['last_modified']
+    
+    async with session.get(url, headers=headers, timeout=timeout) as response:
+        if response.status == 304 and headers:
+            return None, validator
+        if response.status != 200:
+            raise Exception(f"获取 {url} 失败: HTTP {response.status}")
+        text = await response.text()
+        return json.loads(text), {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+
+
+def http_timeout(seconds):
+    """
+    单个请求的超时：只限制建立连接和两次读取之间的等待
+    不含在连接池中排队的时间（并发请求多于每主机连接数时会排队）
+    """
+    import aiohttp
+    return aiohttp.ClientTimeout(total=None, sock_connect=seconds, sock_read=seconds)
+
+
 def load_github_token():
     """加载GitHub Token"""
     try:
@@ -1387,217 +4246,600 @@ def load_github_token():
     return None
 
 
-def load_plugins_database():
-    """从数据库加载插件数据"""
+# 插件库修订号（每次保存递增，以启动时间为起点）和最近一次已知的 last_update，用于商店接口的 ETag
+# checked_at：上游返回 304 时记录的检查时间（插件库未变化，不重写数据库）
+_catalog_state = {
+    'revision': int(time.time() * 1000),
+    'last_update': None,
+    'checked_at': None
+}
+
+
+def load_plugins_database(fields=None):
+    """从数据库加载插件数据（fields 指定只读取的字段，如 ('stars_db',)）"""
     try:
-        if os.path.exists(PLUGINS_DB_FILE):
-            with open(PLUGINS_DB_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        data = storage.load_plugins_database(fields)
+        if data and 'last_update' in data:
+            _catalog_state['last_update'] = data['last_update']
+        return data
     except Exception as e:
         logger.error(f"读取插件数据库失败: {e}")
     return None
 
 
-def save_plugins_database(data):
-    """保存插件数据到数据库"""
+def save_plugins_database(data, partial=False):
+    """保存插件数据到数据库（partial=True 时只更新 data 中出现的字段）"""
     try:
-        with open(PLUGINS_DB_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        storage.save_plugins_database(data, partial)
+        _catalog_state['revision'] += 1
+        if 'last_update' in data:
+            _catalog_state['last_update'] = data['last_update']
         return True
     except Exception as e:
         logger.error(f"保存插件数据库失败: {e}")
         return False
 
 
+def catalog_checked_at(last_update):
+    """插件库最近一次确认为最新的时间：数据库的 last_update 和上游 304 的检查时间中较新的一个"""
+    checked_at = _catalog_state['checked_at']
+    if checked_at and (not last_update or checked_at > last_update):
+        return checked_at
+    return last_update
+
+
+def get_catalog_etag():
+    """
+    商店插件列表的 ETag：插件库修订号 + 插件清单版本号（安装状态）
+    缓存已过期（超过1小时）时返回 None，请求需要走完整流程以触发刷新
+    """
+    from datetime import datetime, timedelta
+    last_update = catalog_checked_at(_catalog_state['last_update'])
+    if not last_update:
+        return None
+    try:
+        if datetime.now() - datetime.fromisoformat(last_update) >= timedelta(hours=1):
+            return None
+    except ValueError:
+        return None
+    return make_etag('catalog', _catalog_state['revision'], plugin_inventory.ensure_current())
+
+
+def catalog_plugin_name(plugin, repo_key):
+    """插件名：GitHub 插件为仓库名（即 git clone 创建的文件夹名），其他插件为标题"""
+    if repo_key:
+        return repo_key.split('/')[1]
+    return plugin.get('title', 'Unknown')
+
+
 def merge_stars_to_plugins(plugins, stars_db):
     """将stars数据合并到插件列表"""
     for plugin in plugins:
-        github_url = plugin.get('reference', '')
-        if github_url.startswith('https://github.com/'):
-            repo_path = github_url.replace('https://github.com/', '').replace('.git', '').rstrip('/')
-            repo_key = '/'.join(repo_path.split('/')[:2])  # owner/repo
-            if repo_key in stars_db:
-                plugin['stars'] = stars_db[repo_key]
+        plugin['stars'] = stars_db.get(github_repo_key(plugin.get('reference', '')), 0)
+    return plugins
+
+
+# ========== 商店插件索引 ==========
+# 插件库按修订号在内存中建立一次索引（合并后的 stars、搜索文本、各排序方式的顺序），
+# 分页查询（offset/limit/sort/installed/q）只返回一页插件和总数，不再下发完整的插件列表
+STORE_PAGE_DEFAULT_LIMIT = 50
+STORE_PAGE_MAX_LIMIT = 500
+STORE_QUERY_PARAMS = ('offset', 'limit', 'sort', 'seed', 'installed', 'q')
+# default：插件库原始顺序；added：最近收录（上游列表末尾的在前）；random：按 seed 打乱，翻页时顺序不变
+STORE_SORTS = ('default', 'random', 'stars', 'name', 'added')
+STORE_INSTALLED_FILTERS = ('all', 'installed', 'uninstalled')
+# 缓存最近的查询结果（匹配的插件下标），翻页时不必重新筛选和排序
+STORE_QUERY_CACHE_SIZE = 32
+
+
+def parse_store_query(query):
+    """
+    解析商店分页查询参数，没有任何分页参数时返回 None（返回完整插件列表）
+    参数不合法时抛出 ValueError
+    """
+    if not any(name in query for name in STORE_QUERY_PARAMS):
+        return None
+    try:
+        offset = int(query.get('offset', 0))
+        limit = int(query.get('limit', STORE_PAGE_DEFAULT_LIMIT))
+        seed = int(query.get('seed', 0))
+    except ValueError:
+        raise ValueError("offset、limit、seed 必须是整数")
+    sort = query.get('sort', 'default')
+    if sort not in STORE_SORTS:
+        raise ValueError(f"未知的排序方式: {sort}")
+    installed = query.get('installed', 'all')
+    if installed not in STORE_INSTALLED_FILTERS:
+        raise ValueError(f"未知的安装状态筛选: {installed}")
+    return {
+        'offset': max(offset, 0),
+        'limit': min(max(limit, 1), STORE_PAGE_MAX_LIMIT),
+        'sort': sort,
+        'seed': seed if sort == 'random' else 0,
+        'installed': installed,
+        'terms': tuple(query.get('q', '').lower().split())
+    }
+
+
+def store_query_etag(catalog_etag, query):
+    """分页查询的 ETag：插件库 ETag + 查询参数摘要"""
+    digest = hashlib.sha1(json.dumps(query, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+    return catalog_etag[:-1] + '-' + digest + '"'
+
+
+class StoreCatalogIndex:
+    """
+    插件库的内存索引（对应一个插件库修订号）
+    每个插件在建立索引时统一计算一次仓库键（repo_key）和插件名（plugin_name），并从 stars_db 合并 stars；
+    by_repo_key / by_name 为仓库键、插件名（不区分大小写）到插件下标列表的索引
+    """
+    
+    def __init__(self, revision, db_data):
+        self.revision = revision
+        self.plugins = db_data.get('plugins', [])
+        stars_db = db_data.get('stars_db', {})
+        
+        self.by_repo_key = {}
+        self.by_name = {}
+        for i, plugin in enumerate(self.plugins):
+            repo_key = github_repo_key(plugin.get('reference', ''))
+            plugin['repo_key'] = repo_key
+            plugin['plugin_name'] = catalog_plugin_name(plugin, repo_key)
+            if repo_key:
+                plugin['stars'] = stars_db.get(repo_key, 0)
+                self.by_repo_key.setdefault(repo_key, []).append(i)
             else:
-                plugin['stars'] = 0
+                plugin.setdefault('stars', 0)
+            self.by_name.setdefault(plugin['plugin_name'].casefold(), []).append(i)
+        
+        self.search_texts = [
+            '\n'.join(str(plugin.get(field) or '') for field in ('title', 'description', 'author')).lower()
+            for plugin in self.plugins
+        ]
+        self.stars_stats = {source: 0 for source in ('local', 'manager', 'none')}
+        for plugin in self.plugins:
+            if plugin.get('stars_source') in self.stars_stats:
+                self.stars_stats[plugin['stars_source']] += 1
+        self._orders = {}
+        self._results = OrderedDict()
+        self._installed = (None, {})
+        self._by_node = None
+    
+    def installed_folders(self, installed_names, inventory_version):
+        """
+        {插件下标: 已安装的文件夹名}：按插件名查找 custom_nodes 下的文件夹（不区分大小写）
+        只遍历已安装的文件夹，插件清单版本变化时重新计算
+        """
+        if self._installed[0] != inventory_version:
+            folders = {}
+            for folder in installed_names:
+                for i in self.by_name.get(folder.casefold(), ()):
+                    # 大小写完全一致的文件夹优先
+                    if i not in folders or folder == self.plugins[i]['plugin_name']:
+                        folders[i] = folder
+            self._installed = (inventory_version, folders)
+        return self._installed[1]
+    
+    def plugin_for_node(self, node_type):
+        """提供该节点类型的插件（按插件库中的 nodes 字段，首次调用时建立索引），找不到时返回 None"""
+        if self._by_node is None:
+            self._by_node = {}
+            for plugin in self.plugins:
+                provided_nodes = plugin.get('nodes', [])
+                if isinstance(provided_nodes, list):
+                    for provided in provided_nodes:
+                        if isinstance(provided, str):
+                            self._by_node[provided] = plugin
+        return self._by_node.get(node_type)
+    
+    def update_stars(self, stars):
+        """
+        原地更新 stars {仓库键: stars}（懒加载只补充 stars，插件列表不变）
+        已计算的排序和查询结果保持不变，正在翻页的 stars 排序不会因此重排；重建索引时才按新的 stars 排序
+        """
+        for repo_key, value in stars.items():
+            for i in self.by_repo_key.get(repo_key, ()):
+                self.plugins[i]['stars'] = value
+    
+    def order(self, sort, seed=0):
+        """某种排序方式下的插件下标顺序"""
+        key = (sort, seed) if sort == 'random' else sort
+        order = self._orders.get(key)
+        if order is not None:
+            return order
+        
+        indexes = range(len(self.plugins))
+        if sort == 'stars':
+            order = sorted(indexes, key=lambda i: -(self.plugins[i].get('stars') or 0))
+        elif sort == 'name':
+            order = sorted(indexes, key=lambda i: (self.plugins[i].get('title') or '').casefold())
+        elif sort == 'added':
+            order = list(reversed(indexes))
+        elif sort == 'random':
+            import random
+            order = list(indexes)
+            random.Random(seed).shuffle(order)
         else:
-            plugin['stars'] = 0
-    return plugins
+            order = list(indexes)
+        
+        if sort == 'random':
+            # 随机顺序只保留最近一个 seed（每次打开商店会换新的 seed）
+            for cached in [k for k in self._orders if isinstance(k, tuple)]:
+                del self._orders[cached]
+        self._orders[key] = order
+        return order
+    
+    def matches(self, query, installed_names, inventory_version):
+        """符合筛选条件的插件下标（按排序方式排列）"""
+        key = (query['sort'], query['seed'], query['installed'], query['terms'], inventory_version)
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+            return result
+        
+        result = self.order(query['sort'], query['seed'])
+        terms = query['terms']
+        if terms:
+            texts = self.search_texts
+            result = [i for i in result if all(term in texts[i] for term in terms)]
+        if query['installed'] != 'all':
+            wanted = query['installed'] == 'installed'
+            folders = self.installed_folders(installed_names, inventory_version)
+            result = [i for i in result if (i in folders) == wanted]
+        
+        self._results[key] = result
+        while len(self._results) > STORE_QUERY_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return result
+    
+    def page(self, query, installed_names, inventory_version):
+        """返回 (当前页的插件, 匹配总数)；插件为副本，附带当前的安装状态"""
+        result = self.matches(query, installed_names, inventory_version)
+        folders = self.installed_folders(installed_names, inventory_version)
+        start = query['offset']
+        page = []
+        for i in result[start:start + query['limit']]:
+            plugin = dict(self.plugins[i])
+            plugin['installed_folder'] = folders.get(i)
+            plugin['is_installed'] = i in folders
+            page.append(plugin)
+        return page, len(result)
+
+
+_store_index = None
+
+
+def store_index_is_current():
+    return _store_index is not None and _store_index.revision == _catalog_state['revision']
+
+
+def use_store_index(index):
+    """把刚保存的插件库建立的索引作为当前修订号的索引"""
+    global _store_index
+    index.revision = _catalog_state['revision']
+    _store_index = index
+
+
+def get_store_index(db_data=None):
+    """当前插件库修订号的索引（刷新插件列表、更新 stars 后重建）；插件库为空时返回 None"""
+    global _store_index
+    if not store_index_is_current():
+        revision = _catalog_state['revision']
+        if db_data is None:
+            db_data = load_plugins_database()
+        if not db_data or not db_data.get('plugins'):
+            return None
+        _store_index = StoreCatalogIndex(revision, db_data)
+    return _store_index
+
+
+def build_store_page(db_data, query):
+    """分页查询 -> 响应数据"""
+    installed_names = plugin_inventory.installed_names()
+    index = get_store_index(db_data)
+    if index is None:
+        plugins, matched_count, total_count = [], 0, 0
+        stars_stats = {'local': 0, 'manager': 0, 'none': 0}
+    else:
+        plugins, matched_count = index.page(query, installed_names, plugin_inventory.version)
+        total_count = len(index.plugins)
+        stars_stats = dict(index.stars_stats)
+    
+    return {
+        'success': True,
+        'plugins': plugins,
+        'offset': query['offset'],
+        'limit': query['limit'],
+        'sort': query['sort'],
+        'seed': query['seed'],
+        'matched_count': matched_count,
+        'has_more': query['offset'] + len(plugins) < matched_count,
+        'total_count': total_count,
+        'installed_count': len(installed_names),
+        'from_cache': True,
+        'stars_stats': stars_stats
+    }
+
+
+def build_cached_catalog(db_data):
+    """数据库中的插件列表（合并最新的安装状态和stars）-> 响应数据"""
+    installed_names = plugin_inventory.installed_names()
+    
+    # 插件库索引中的插件已合并 stars_db 中的stars（修复缓存中stars为0的问题）
+    index = get_store_index(db_data)
+    if index is None:
+        plugins, folders = [], {}
+        stars_stats = {'local': 0, 'manager': 0, 'none': 0}
+    else:
+        plugins = index.plugins
+        folders = index.installed_folders(installed_names, plugin_inventory.version)
+        stars_stats = index.stars_stats
+    
+    # 更新安装状态
+    for i, plugin in enumerate(plugins):
+        plugin['installed_folder'] = folders.get(i)
+        plugin['is_installed'] = i in folders
+    
+    # 统计stars来源（缓存数据中也应该有stars_source字段）
+    local_count = stars_stats['local']
+    manager_count = stars_stats['manager']
+    none_count = stars_stats['none']
+    
+    logger.info(f"✓ 从缓存返回插件列表，共 {len(plugins)} 个插件")
+    logger.info(f"  - Stars来源: 本地{local_count} / Manager{manager_count} / 无{none_count}")
+    
+    return {
+        'success': True,
+        'plugins': plugins,
+        'total_count': len(plugins),
+        'installed_count': len(installed_names),
+        'from_cache': True,
+        'stars_stats': {
+            'local': local_count,
+            'manager': manager_count,
+            'none': none_count
+        }
+    }
+
+
+async def catalog_cache_response(request, db_data, stale=False, query=None):
+    """
+    用数据库中的插件列表响应（query 为分页查询参数时只返回一页）
+    stale=True：插件列表正在后台刷新，响应不带 ETag、不缓存，刷新完成后浏览器会收到通知
+    只缓存完整列表的编码结果：分页结果很小，从索引生成也很快，放进共享的响应缓存只会挤掉 /nodes 等大响应
+    """
+    if query is None:
+        payload = build_cached_catalog(db_data)
+    else:
+        payload = build_store_page(db_data, query)
+    if stale:
+        payload['stale'] = True
+        return await json_response(request, payload)
+    etag = get_catalog_etag()
+    if query is not None:
+        return await json_response(request, payload, etag=etag and store_query_etag(etag, query))
+    return await json_response(request, payload, etag=etag, cache_key=etag)
+
+
+async def refresh_catalog():
+    """从GitHub获取最新的插件列表和stars数据，合并后保存到数据库，返回响应数据"""
+    from datetime import datetime
+    
+    db_data = load_plugins_database()
+    
+    # 带上上次保存的 ETag / Last-Modified 做条件请求
+    plugin_list_url = STORE_PLUGIN_LIST_URL
+    github_stats_url = STORE_GITHUB_STATS_URL
+    timeout = http_timeout(30)
+    validators = {}
+    if db_data and db_data.get('plugins'):
+        validators = db_data.get('upstream_validators') or {}
+    
+    async with http_session() as session:
+        # 获取插件列表
+        plugin_data, list_validator = await fetch_upstream_json(
+            session, plugin_list_url, validators.get('plugin_list'), timeout)
+        
+        # 尝试获取ComfyUI-Manager的github-stats.json（预处理的stars数据）
+        # 插件列表变化时需要完整合并 stars，不发送条件请求
+        manager_stars = {}
+        stats_validator = validators.get('github_stats') if plugin_data is None else None
+        stats_unchanged = False
+        try:
+            stats_data, stats_validator = await fetch_upstream_json(
+                session, github_stats_url, stats_validator, timeout)
+            if stats_data is None:
+                stats_unchanged = True
+            else:
+                # ComfyUI-Manager的格式：{ "owner/repo" 或仓库地址: { "stars": 123, ... }, ... }
+                for key, repo_data in stats_data.items():
+                    repo_key = normalize_repo_key(key)
+                    if repo_key and isinstance(repo_data, dict) and 'stars' in repo_data:
+                        manager_stars[repo_key] = repo_data['stars']
+                logger.info(f"✓ 成功获取ComfyUI-Manager的Stars数据，共 {len(manager_stars)} 个仓库")
+        except Exception as e:
+            logger.warning(f"⚠️ 获取ComfyUI-Manager的Stars数据失败: {e}")
+            logger.warning(f"⚠️ 将仅使用本地stars_db数据")
+            # 插件列表未变化时沿用数据库中已合并的 stars
+            stats_unchanged = plugin_data is None
+            stats_validator = validators.get('github_stats')
+        
+        if plugin_data is None and stats_unchanged:
+            # 上游两个文件都没有变化：不下载、不解析、不重写数据库，只刷新检查时间
+            _catalog_state['checked_at'] = datetime.now().isoformat()
+            logger.info("✓ 上游插件列表未变化 (304)，继续使用数据库中的插件列表")
+            return build_cached_catalog(db_data)
+        if plugin_data is None:
+            # 只有 stars 数据变化：用数据库中的插件列表重新合并
+            plugin_data = {'custom_nodes': db_data.get('plugins', [])}
+        
+        installed_names = plugin_inventory.installed_names()
+        
+        custom_nodes = plugin_data.get('custom_nodes', [])
+        local_stars = db_data.get('stars_db', {}) if db_data else {}
+        
+        # 标记stars来源（优先级：本地stars_db > Manager的github-stats > 0）
+        for node in custom_nodes:
+            repo_key = github_repo_key(node.get('reference', ''))
+            if repo_key and repo_key in local_stars:
+                node['stars_source'] = 'local'  # 我们自己更新的
+            elif repo_key and repo_key in manager_stars:
+                node['stars_source'] = 'manager'
+            else:
+                node['stars_source'] = 'none'
+        
+        # ✅ 合并Manager的stars到本地stars_db（作为备份）
+        merged_stars_db = dict(local_stars)
+        for repo_key, stars in manager_stars.items():
+            # 只有本地没有这个repo的数据时，才使用Manager的
+            if repo_key not in merged_stars_db:
+                merged_stars_db[repo_key] = stars
+        
+        save_data = {
+            'last_update': datetime.now().isoformat(),
+            'plugins': custom_nodes,
+            'stars_db': merged_stars_db,
+            'upstream_validators': {
+                'plugin_list': list_validator,
+                'github_stats': stats_validator
+            }
+        }
+        
+        # 建立索引：计算仓库键、插件名和stars（写入插件数据，随数据库一起保存）
+        index = StoreCatalogIndex(None, save_data)
+        folders = index.installed_folders(installed_names, plugin_inventory.version)
+        for i, node in enumerate(custom_nodes):
+            node['installed_folder'] = folders.get(i)
+            node['is_installed'] = i in folders
+        
+        # 保存到数据库；保存成功后直接作为新修订号的索引，不必重新读取数据库
+        if save_plugins_database(save_data):
+            use_store_index(index)
+        
+        # 统计stars来源
+        local_count = index.stars_stats['local']
+        manager_count = index.stars_stats['manager']
+        none_count = index.stars_stats['none']
+        
+        logger.info(f"✓ 插件列表已保存到数据库，共 {len(custom_nodes)} 个插件")
+        logger.info(f"  - Stars来源统计: 本地{local_count} / Manager{manager_count} / 无{none_count}")
+        
+        return {
+            'success': True,
+            'plugins': custom_nodes,
+            'total_count': len(custom_nodes),
+            'installed_count': len(installed_names),
+            'from_cache': False,
+            'stars_stats': {
+                'local': local_count,
+                'manager': manager_count,
+                'none': none_count
+            },
+            'need_update_stars': none_count > 100  # 如果超过100个插件没有stars，建议更新
+        }
+
+
+CATALOG_UPDATED_EVENT = 'node-manager.catalog-updated'
+_catalog_refresh_task = None
+
+
+def request_catalog_refresh():
+    """启动后台刷新插件列表；同一时间只有一个刷新任务，重复请求返回同一个任务"""
+    global _catalog_refresh_task
+    if _catalog_refresh_task is None or _catalog_refresh_task.done():
+        _catalog_refresh_task = start_background_task(_run_catalog_refresh())
+        # 后台刷新失败已记录日志并通知浏览器，这里取走异常避免 "exception was never retrieved"
+        _catalog_refresh_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+    return _catalog_refresh_task
+
+
+async def _run_catalog_refresh():
+    try:
+        payload = await refresh_catalog()
+    except Exception as e:
+        logger.error(f"刷新插件列表失败: {e}")
+        notify_catalog_updated({'success': False, 'error': str(e) or type(e).__name__})
+        raise
+    notify_catalog_updated({
+        'success': True,
+        'changed': not payload.get('from_cache', False),
+        'total_count': payload['total_count']
+    })
+    return payload
+
+
+def notify_catalog_updated(data):
+    try:
+        server.PromptServer.instance.send_sync(CATALOG_UPDATED_EVENT, data)
+    except Exception as e:
+        logger.debug(f"推送插件列表刷新结果失败: {e}")
 
 
 @server.PromptServer.instance.routes.get("/node-manager/store/available-plugins")
 async def get_available_plugins(request):
-    """获取可用插件列表（从数据库或GitHub）"""
+    """
+    获取可用插件列表（从数据库或GitHub）
+    分页查询参数：offset、limit、sort（default / random / stars / name / added，random 配合 seed）、
+    installed（all / installed / uninstalled）、q（空格分隔的关键词，匹配标题、描述和作者）；
+    带任一分页参数时只返回一页插件，以及 matched_count（匹配数）和 total_count（插件总数）
+    """
     try:
-        import aiohttp
         import asyncio
         from datetime import datetime, timedelta
         
         # 检查是否强制刷新（通过URL参数t或force_refresh）
         force_refresh = 't' in request.query or 'force_refresh' in request.query
+        try:
+            query = parse_store_query(request.query)
+        except ValueError as e:
+            return web.json_response({
+                'success': False,
+                'error': str(e)
+            }, status=400)
         
         if force_refresh:
-            logger.info("[插件商店] 🔄 强制刷新模式，跳过缓存")
-        
-        # 1. 尝试从数据库加载
-        db_data = load_plugins_database()
+            logger.info("[插件商店] 🔄 强制刷新模式，后台重新获取插件列表")
+        else:
+            etag = get_catalog_etag()
+            if etag and query is not None:
+                etag = store_query_etag(etag, query)
+            if etag and etag_matches(request, etag):
+                return not_modified_response(etag)
+            if etag and query is None:
+                # 插件库和安装状态都没变，直接返回上次编码好的目录
+                cached = await cached_json_response(request, etag, etag)
+                if cached is not None:
+                    return cached
+        
+        # 1. 尝试从数据库加载（分页查询且内存索引对应当前插件库时不需要读取数据库）
+        if query is not None and store_index_is_current():
+            db_data = None
+            last_update = _catalog_state['last_update']
+            has_plugins = True
+        else:
+            db_data = load_plugins_database()
+            last_update = db_data.get('last_update') if db_data else None
+            has_plugins = bool(db_data and db_data.get('plugins'))
         
         # 2. 检查数据库是否有效（1小时内），除非强制刷新
-        if db_data and not force_refresh:
-            last_update = db_data.get('last_update')
+        if (db_data or has_plugins) and not force_refresh:
+            last_update = catalog_checked_at(last_update)
             if last_update:
                 last_time = datetime.fromisoformat(last_update)
                 if datetime.now() - last_time < timedelta(hours=1):
                     # 数据库有效，直接使用
-                    installed_plugins = scan_custom_nodes_folders()
-                    installed_names = {p['name'] for p in installed_plugins}
-                    
-                    # 获取插件列表和stars数据库
-                    plugins = db_data.get('plugins', [])
-                    stars_db = db_data.get('stars_db', {})
-                    
-                    # 更新安装状态和stars（关键修复：从stars_db重新合并stars）
-                    for plugin in plugins:
-                        plugin_name = plugin.get('plugin_name', '')
-                        plugin['is_installed'] = plugin_name in installed_names
-                        
-                        # 从stars_db更新stars（修复缓存中stars为0的问题）
-                        github_url = plugin.get('reference', '')
-                        if github_url.startswith('https://github.com/'):
-                            repo_path = github_url.replace('https://github.com/', '').replace('.git', '').rstrip('/')
-                            repo_key = '/'.join(repo_path.split('/')[:2])
-                            plugin['stars'] = stars_db.get(repo_key, 0)
-                    
-                    # 统计stars来源（缓存数据中也应该有stars_source字段）
-                    local_count = sum(1 for p in plugins if p.get('stars_source') == 'local')
-                    manager_count = sum(1 for p in plugins if p.get('stars_source') == 'manager')
-                    none_count = sum(1 for p in plugins if p.get('stars_source') == 'none')
-                    
-                    logger.info(f"✓ 从缓存返回插件列表，共 {len(plugins)} 个插件")
-                    logger.info(f"  - Stars来源: 本地{local_count} / Manager{manager_count} / 无{none_count}")
-                    
-                    return web.json_response({
-                        'success': True,
-                        'plugins': plugins,
-                        'total_count': len(plugins),
-                        'installed_count': len(installed_names),
-                        'from_cache': True,
-                        'stars_stats': {
-                            'local': local_count,
-                            'manager': manager_count,
-                            'none': none_count
-                        }
-                    })
+                    return await catalog_cache_response(request, db_data, query=query)
         
-        # 3. 从GitHub获取最新数据
-        plugin_list_url = "https://raw.githubusercontent.com/ltdrdata/ComfyUI-Manager/main/custom-node-list.json"
-        github_stats_url = "https://raw.githubusercontent.com/ltdrdata/ComfyUI-Manager/main/github-stats.json"
-        timeout = aiohttp.ClientTimeout(total=30)
+        # 3. 已有插件列表时立即返回（标记 stale），在后台刷新，完成后通过 websocket 通知浏览器
+        if has_plugins:
+            request_catalog_refresh()
+            return await catalog_cache_response(request, db_data, stale=True, query=query)
         
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            # 获取插件列表
-            async with session.get(plugin_list_url) as response:
-                if response.status != 200:
-                    raise Exception(f"获取插件列表失败: HTTP {response.status}")
-                
-                text = await response.text()
-                plugin_data = json.loads(text)
-            
-            # 尝试获取ComfyUI-Manager的github-stats.json（预处理的stars数据）
-            manager_stars = {}
-            try:
-                async with session.get(github_stats_url) as response:
-                    if response.status == 200:
-                        text = await response.text()
-                        stats_data = json.loads(text)
-                        # ComfyUI-Manager的格式：{ "owner/repo": { "stars": 123, ... }, ... }
-                        for repo_key, repo_data in stats_data.items():
-                            if isinstance(repo_data, dict) and 'stars' in repo_data:
-                                manager_stars[repo_key] = repo_data['stars']
-                        logger.info(f"✓ 成功获取ComfyUI-Manager的Stars数据，共 {len(manager_stars)} 个仓库")
-            except Exception as e:
-                logger.warning(f"⚠️ 获取ComfyUI-Manager的Stars数据失败: {e}")
-                logger.warning(f"⚠️ 将仅使用本地stars_db数据")
-            
-            installed_plugins = scan_custom_nodes_folders()
-            installed_names = {p['name'] for p in installed_plugins}
-            
-            custom_nodes = plugin_data.get('custom_nodes', [])
-            
-            # 处理插件数据
-            for node in custom_nodes:
-                if 'reference' in node:
-                    github_url = node['reference']
-                    if github_url.startswith('https://github.com/'):
-                        repo_path = github_url.replace('https://github.com/', '').rstrip('/')
-                        repo_path = repo_path.rstrip('.git')
-                        plugin_name = repo_path.split('/')[-1]
-                        node['plugin_name'] = plugin_name
-                        node['is_installed'] = plugin_name in installed_names
-                    else:
-                        node['plugin_name'] = node.get('title', 'Unknown')
-                        node['is_installed'] = False
-                else:
-                    node['plugin_name'] = node.get('title', 'Unknown')
-                    node['is_installed'] = False
-                
-                # 合并stars数据（优先级：本地stars_db > Manager的github-stats > 0）
-                github_url = node.get('reference', '')
-                if github_url.startswith('https://github.com/'):
-                    repo_path = github_url.replace('https://github.com/', '').replace('.git', '').rstrip('/')
-                    repo_key = '/'.join(repo_path.split('/')[:2])
-                    
-                    # 优先使用本地stars_db（我们自己更新的）
-                    if db_data and 'stars_db' in db_data and repo_key in db_data['stars_db']:
-                        node['stars'] = db_data['stars_db'][repo_key]
-                        node['stars_source'] = 'local'  # 标记来源
-                    # 其次使用ComfyUI-Manager的数据
-                    elif repo_key in manager_stars:
-                        node['stars'] = manager_stars[repo_key]
-                        node['stars_source'] = 'manager'  # 标记来源
-                    else:
-                        node['stars'] = 0
-                        node['stars_source'] = 'none'
-                else:
-                    node['stars'] = 0
-                    node['stars_source'] = 'none'
-            
-            # ✅ 循环结束后，合并Manager的stars到本地stars_db（作为备份）
-            merged_stars_db = db_data.get('stars_db', {}) if db_data else {}
-            for repo_key, stars in manager_stars.items():
-                # 只有本地没有这个repo的数据时，才使用Manager的
-                if repo_key not in merged_stars_db:
-                    merged_stars_db[repo_key] = stars
-            
-            # 保存到数据库
-            save_data = {
-                'last_update': datetime.now().isoformat(),
-                'plugins': custom_nodes,
-                'stars_db': merged_stars_db
-            }
-            save_plugins_database(save_data)
-            
-            # 统计stars来源
-            local_count = sum(1 for n in custom_nodes if n.get('stars_source') == 'local')
-            manager_count = sum(1 for n in custom_nodes if n.get('stars_source') == 'manager')
-            none_count = sum(1 for n in custom_nodes if n.get('stars_source') == 'none')
-            
-            logger.info(f"✓ 插件列表已保存到数据库，共 {len(custom_nodes)} 个插件")
-            logger.info(f"  - Stars来源统计: 本地{local_count} / Manager{manager_count} / 无{none_count}")
-            
-            return web.json_response({
-                'success': True,
-                'plugins': custom_nodes,
-                'total_count': len(custom_nodes),
-                'installed_count': len(installed_names),
-                'from_cache': False,
-                'stars_stats': {
-                    'local': local_count,
-                    'manager': manager_count,
-                    'none': none_count
-                },
-                'need_update_stars': none_count > 100  # 如果超过100个插件没有stars，建议更新
-            })
+        # 4. 首次使用（还没有插件列表）：等待刷新完成；客户端断开时不取消共享的刷新任务
+        payload = await asyncio.shield(request_catalog_refresh())
+        if query is not None:
+            return await catalog_cache_response(request, load_plugins_database() or {}, query=query)
+        return await json_response(request, payload, etag=get_catalog_etag())
         
     except asyncio.TimeoutError:
         logger.error("获取插件列表超时")
@@ -1617,7 +4859,6 @@ async def get_available_plugins(request):
 async def update_stars_batch(request):
     """批量更新指定插件的Stars（用于懒加载）"""
     try:
-        import aiohttp
         import asyncio
         
         # 获取请求参数
@@ -1638,8 +4879,8 @@ async def update_stars_batch(request):
         if github_token:
             headers['Authorization'] = f'token {github_token}'
         
-        # 加载数据库
-        db_data = load_plugins_database()
+        # 加载数据库（只需要 stars 数据）
+        db_data = load_plugins_database(fields=('stars_db',))
         if not db_data:
             return web.json_response({
                 'success': False,
@@ -1648,6 +4889,12 @@ async def update_stars_batch(request):
         
         stars_db = db_data.get('stars_db', {})
         
+        # 统一仓库键的格式，只查询插件库中存在的仓库
+        repo_keys = list(dict.fromkeys(filter(None, map(normalize_repo_key, repo_keys))))
+        index = get_store_index()
+        if index is not None:
+            repo_keys = [repo_key for repo_key in repo_keys if repo_key in index.by_repo_key]
+        
         # 获取stars数据
         async def fetch_repo_stars(session, repo_key):
             try:
@@ -1655,8 +4902,8 @@ async def update_stars_batch(request):
                 if repo_key in stars_db and stars_db[repo_key] > 0:
                     return repo_key, stars_db[repo_key], 'cached'
                 
-                api_url = f"https://api.github.com/repos/{repo_key}"
-                async with session.get(api_url, headers=headers) as resp:
+                api_url = f"{GITHUB_API_URL}/repos/{repo_key}"
+                async with session.get(api_url, headers=headers, timeout=timeout) as resp:
                     if resp.status == 200:
                         data = await resp.json()
                         return repo_key, data.get('stargazers_count', 0), 'fetched'
@@ -1666,26 +4913,30 @@ async def update_stars_batch(request):
                 logger.debug(f"[懒加载] 获取 {repo_key} 失败: {e}")
                 return repo_key, stars_db.get(repo_key, 0), 'error'
         
-        timeout = aiohttp.ClientTimeout(total=10)
+        timeout = http_timeout(10)
         results = {}
         
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with http_session() as session:
             tasks = [fetch_repo_stars(session, repo_key) for repo_key in repo_keys]
             responses = await asyncio.gather(*tasks, return_exceptions=True)
             
-            updated_count = 0
+            fetched = {}
             for response in responses:
                 if isinstance(response, tuple):
                     repo_key, stars, source = response
                     results[repo_key] = stars
                     if source == 'fetched':
-                        stars_db[repo_key] = stars
-                        updated_count += 1
+                        fetched[repo_key] = stars
+            stars_db.update(fetched)
+            updated_count = len(fetched)
         
         # 更新数据库
         if updated_count > 0:
-            db_data['stars_db'] = stars_db
-            save_plugins_database(db_data)
+            # 只有 stars 变化：沿用当前的插件库索引，不重新读取数据库，也不打乱正在翻页的列表顺序
+            keep_index = index is not None and index is _store_index and store_index_is_current()
+            if save_plugins_database({'stars_db': stars_db}, partial=True) and keep_index:
+                index.update_stars(fetched)
+                use_store_index(index)
             logger.info(f"[懒加载] ✓ 更新了 {updated_count} 个插件的stars")
         
         return web.json_response({
@@ -1707,7 +4958,6 @@ async def update_stars_batch(request):
 async def update_stars_database(request):
     """后台更新插件Stars数据"""
     try:
-        import aiohttp
         import asyncio
         import time
         
@@ -1735,37 +4985,32 @@ async def update_stars_database(request):
         
         # 从数据库加载插件列表
         db_data = load_plugins_database()
-        if not db_data or 'plugins' not in db_data:
+        index = get_store_index(db_data) if db_data else None
+        if index is None:
             logger.error("[Stars更新] 数据库为空或没有plugins字段")
             return web.json_response({
                 'success': False,
                 'error': '请先加载插件列表'
             }, status=400)
         
-        plugins = db_data['plugins']
+        plugins = index.plugins
         stars_db = db_data.get('stars_db', {})
         
         logger.info(f"[Stars更新] 数据库中有 {len(plugins)} 个插件")
         logger.info(f"[Stars更新] 当前stars_db中有 {len(stars_db)} 条数据")
         
-        # 筛选有GitHub URL的插件
-        all_github_plugins = []
-        plugins_to_update = []
+        # GitHub插件按仓库去重（插件库中同一仓库可能出现多次）
+        all_github_repos = list(index.by_repo_key)
         
-        for plugin in plugins:
-            github_url = plugin.get('reference', '')
-            if github_url.startswith('https://github.com/'):
-                repo_path = github_url.replace('https://github.com/', '').replace('.git', '').rstrip('/')
-                repo_key = '/'.join(repo_path.split('/')[:2])
-                all_github_plugins.append((plugin, repo_key))
-                
-                # 增量更新：只更新没有stars数据的插件（除非强制全量更新）
-                if force_full_update or repo_key not in stars_db or stars_db.get(repo_key, 0) == 0:
-                    plugins_to_update.append((plugin, repo_key))
+        # 增量更新：只更新没有stars数据的仓库（除非强制全量更新）
+        plugins_to_update = [
+            repo_key for repo_key in all_github_repos
+            if force_full_update or stars_db.get(repo_key, 0) == 0
+        ]
         
-        logger.info(f"[Stars更新] 共有 {len(all_github_plugins)} 个GitHub插件")
-        logger.info(f"[Stars更新] 其中 {len(all_github_plugins) - len(plugins_to_update)} 个已有stars数据")
-        logger.info(f"[Stars更新] 需要更新 {len(plugins_to_update)} 个插件")
+        logger.info(f"[Stars更新] 共有 {len(all_github_repos)} 个GitHub仓库")
+        logger.info(f"[Stars更新] 其中 {len(all_github_repos) - len(plugins_to_update)} 个已有stars数据")
+        logger.info(f"[Stars更新] 需要更新 {len(plugins_to_update)} 个仓库")
         
         if not plugins_to_update:
             logger.warning("[Stars更新] 没有需要更新的插件")
@@ -1776,7 +5021,7 @@ async def update_stars_database(request):
             })
         
         # 批量获取stars（限制并发数量）
-        timeout = aiohttp.ClientTimeout(total=10)
+        timeout = http_timeout(10)
         updated_count = 0
         
         # 定义获取stars的函数（避免闭包问题）
@@ -1795,8 +5040,8 @@ async def update_stars_database(request):
                 return repo_key, None
             
             try:
-                api_url = f"https://api.github.com/repos/{repo_key}"
-                async with session.get(api_url, headers=headers) as resp:
+                api_url = f"{GITHUB_API_URL}/repos/{repo_key}"
+                async with session.get(api_url, headers=headers, timeout=timeout) as resp:
                     if resp.status == 200:
                         data = await resp.json()
                         return repo_key, data.get('stargazers_count', 0)
@@ -1827,7 +5072,7 @@ async def update_stars_database(request):
         
         logger.info(f"[Stars更新] 开始批量获取stars...")
         
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with http_session() as session:
             batch_num = 0
             total_batches = (len(plugins_to_update) + batch_size - 1) // batch_size
             
@@ -1839,7 +5084,7 @@ async def update_stars_database(request):
                 logger.info(f"[Stars更新] 📊 批次 {batch_num}/{total_batches} ({progress_percent:.1f}%) - 处理 {i+1}-{min(i+batch_size, len(plugins_to_update))} / {len(plugins_to_update)}")
                 
                 # 创建任务列表（修复闭包问题）
-                tasks = [fetch_single_repo_stars(session, repo_key) for plugin, repo_key in batch]
+                tasks = [fetch_single_repo_stars(session, repo_key) for repo_key in batch]
                 
                 # 并行执行
                 results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -1876,15 +5121,11 @@ async def update_stars_database(request):
         
         # 更新数据库中的plugins的stars
         plugins_updated = 0
-        for plugin in plugins:
-            github_url = plugin.get('reference', '')
-            if github_url.startswith('https://github.com/'):
-                repo_path = github_url.replace('https://github.com/', '').replace('.git', '').rstrip('/')
-                repo_key = '/'.join(repo_path.split('/')[:2])
-                old_stars = plugin.get('stars', 0)
-                new_stars = stars_db.get(repo_key, 0)
-                if new_stars > 0 and old_stars != new_stars:
-                    plugin['stars'] = new_stars
+        for repo_key, indexes in index.by_repo_key.items():
+            new_stars = stars_db.get(repo_key, 0)
+            for i in indexes:
+                if new_stars > 0 and plugins[i].get('stars', 0) != new_stars:
+                    plugins[i]['stars'] = new_stars
                     plugins_updated += 1
         
         logger.info(f"[Stars更新] 更新了 {plugins_updated} 个插件的stars字段")
@@ -1968,11 +5209,11 @@ async def install_plugin(request):
         # 获取custom_nodes目录
         custom_nodes_dir = get_custom_nodes_dir()
         
-        # 从URL提取插件名（如果没有提供）
+        # 从URL提取插件名（如果没有提供）：与 git clone 创建的文件夹名一致
         if not plugin_name:
-            if plugin_url.startswith('https://github.com/'):
-                repo_path = plugin_url.replace('https://github.com/', '').rstrip('/')
-                plugin_name = repo_path.split('/')[-1]
+            repo_key = github_repo_key(plugin_url)
+            if repo_key:
+                plugin_name = catalog_plugin_name({}, repo_key)
             else:
                 return web.json_response({
                     'success': False,
@@ -1999,6 +5240,8 @@ async def install_plugin(request):
         )
         
         stdout, stderr = await process.communicate()
+        # 目录监视可能在克隆写出 __init__.py 之前就扫描了新文件夹，克隆结束后重新扫描插件清单
+        plugin_inventory.invalidate()
         
         if process.returncode != 0:
             error_msg = stderr.decode('utf-8', errors='ignore')
@@ -2091,42 +5334,40 @@ async def detect_missing_nodes(request):
         
         logger.info(f"检测到 {len(missing_node_types)} 个缺失节点: {missing_node_types}")
         
-        # 从插件数据库中查找这些节点对应的插件
-        db_data = load_plugins_database()
+        # 从插件库索引中查找这些节点对应的插件（按插件提供的节点列表）
+        index = get_store_index()
         node_to_plugin_map = {}
         
-        if db_data and 'plugins' in db_data:
-            for plugin in db_data['plugins']:
-                plugin_name = plugin.get('plugin_name', plugin.get('title', ''))
-                github_url = plugin.get('reference', '')
-                
-                # 检查插件提供的节点列表
-                provided_nodes = plugin.get('nodes', [])
-                if isinstance(provided_nodes, list):
-                    for node_type in provided_nodes:
-                        if node_type in missing_node_types:
-                            node_to_plugin_map[node_type] = {
-                                'node_type': node_type,
-                                'plugin_name': plugin_name,
-                                'github_url': github_url,
-                                'title': plugin.get('title', plugin_name),
-                                'description': plugin.get('description', '')
-                            }
+        if index is not None:
+            for node_type in missing_node_types:
+                plugin = index.plugin_for_node(node_type)
+                if plugin is not None:
+                    plugin_name = plugin['plugin_name']
+                    node_to_plugin_map[node_type] = {
+                        'node_type': node_type,
+                        'plugin_name': plugin_name,
+                        'github_url': plugin.get('reference', ''),
+                        'title': plugin.get('title', plugin_name),
+                        'description': plugin.get('description', '')
+                    }
         
         # 构建缺失节点列表
         missing_nodes = []
         for node_type in missing_node_types:
             if node_type in node_to_plugin_map:
-                missing_nodes.append(node_to_plugin_map[node_type])
+                missing_node = node_to_plugin_map[node_type]
             else:
                 # 未找到对应插件的节点
-                missing_nodes.append({
+                missing_node = {
                     'node_type': node_type,
                     'plugin_name': f'未知插件 ({node_type})',
                     'github_url': '',
                     'title': '未知',
                     'description': '在插件数据库中未找到此节点的来源'
-                })
+                }
+            # 名称相近的已注册节点（可能是类名拼写不同或节点改名）
+            missing_node['suggestions'] = await fuzzy_lookup_nodes(node_type, limit=3)
+            missing_nodes.append(missing_node)
         
         logger.info(f"找到 {len(missing_nodes)} 个缺失节点，其中 {len([n for n in missing_nodes if n['github_url']])} 个可以自动安装")
         
@@ -2159,16 +5400,17 @@ if NODE_CLASS_MAPPINGS:
         print(f"[{PLUGIN_NAME}]    - {node_id} ({display_name})")
 
 # 测试扫描功能
-try:
-    custom_nodes_dir = get_custom_nodes_dir()
-    print(f"[{PLUGIN_NAME}] 🔍 custom_nodes目录: {custom_nodes_dir}")
-    if os.path.exists(custom_nodes_dir):
-        plugins_count = len([d for d in os.listdir(custom_nodes_dir) if os.path.isdir(os.path.join(custom_nodes_dir, d))])
-        print(f"[{PLUGIN_NAME}] ✅ 发现 {plugins_count} 个插件文件夹")
-    else:
-        print(f"[{PLUGIN_NAME}] ⚠️ custom_nodes目录不存在")
-except Exception as e:
-    print(f"[{PLUGIN_NAME}] ❌ 扫描失败: {e}")
+with startup_phase('custom_nodes_scan'):
+    try:
+        custom_nodes_dir = get_custom_nodes_dir()
+        print(f"[{PLUGIN_NAME}] 🔍 custom_nodes目录: {custom_nodes_dir}")
+        if os.path.exists(custom_nodes_dir):
+            plugins_count = len(scan_plugin_folders(custom_nodes_dir))
+            print(f"[{PLUGIN_NAME}] ✅ 发现 {plugins_count} 个插件文件夹")
+        else:
+            print(f"[{PLUGIN_NAME}] ⚠️ custom_nodes目录不存在")
+    except Exception as e:
+        print(f"[{PLUGIN_NAME}] ❌ 扫描失败: {e}")
 
 print(f"[{PLUGIN_NAME}] 🌐 API路由已注册:")
 print(f"[{PLUGIN_NAME}]   - GET  /node-manager/config")
@@ -2178,3 +5420,4 @@ print(f"[{PLUGIN_NAME}]   - GET  /node-manager/plugins")
 print(f"[{PLUGIN_NAME}]   - POST /node-manager/folder/*")
 print(f"[{PLUGIN_NAME}] ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
 
+finish_startup_report()
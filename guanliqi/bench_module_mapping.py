@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+模块映射冷启动基准测试
+
+在临时目录中生成若干个模拟插件（__init__.py + 包内 nodes.py），对比：
+  1. 旧实现：逐个文件 ast.parse + ast.walk（只看 __init__.py）
+  2. 新实现：正则扫描 import 语句，不跟随 / 跟随包内模块
+  3. 缓存命中时的耗时
+
+用法: python bench_module_mapping.py [插件数量，默认 300]
+"""
+import os
+import sys
+import ast
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import module_mapping  # noqa: E402
+
+THIRD_PARTY = ['torch', 'numpy', 'PIL', 'cv2', 'safetensors', 'transformers', 'einops', 'requests',
+               'folder_paths', 'comfy', 'server', 'nodes', 'aiohttp', 'huggingface_hub']
+
+INIT_TEMPLATE = '''"""
+{name} 插件
+示例: import something_in_a_docstring
+"""
+import os
+import sys
+import json
+from .nodes import NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS
+from . import utils
+{imports}
+
+sys.path.append(os.path.dirname(__file__))
+import {impl}
+
+WEB_DIRECTORY = "./js"
+__all__ = ["NODE_CLASS_MAPPINGS", "NODE_DISPLAY_NAME_MAPPINGS"]
+'''
+
+NODE_TEMPLATE = '''
+class {name}Node{index}:
+    """节点 {index}"""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {{"required": {{"image": ("IMAGE",), "strength": ("FLOAT", {{"default": 1.0}})}}}}
+
+    RETURN_TYPES = ("IMAGE",)
+    FUNCTION = "run"
+    CATEGORY = "{name}"
+
+    def run(self, image, strength):
+        import math
+        result = []
+        for i in range(10):
+            result.append(math.sqrt(i) * strength)
+        return (image,)
+'''
+
+
+def make_plugins(root, count):
+    for i in range(count):
+        name = f"Plugin{i:03d}"
+        folder = os.path.join(root, f"ComfyUI-{name}")
+        os.makedirs(os.path.join(folder, f"{name.lower()}_impl"))
+        imports = '\n'.join(f"import {THIRD_PARTY[(i + k) % len(THIRD_PARTY)]}" for k in range(5))
+        with open(os.path.join(folder, '__init__.py'), 'w', encoding='utf-8') as f:
+            f.write(INIT_TEMPLATE.format(name=name, imports=imports, impl=f"{name.lower()}_impl"))
+        with open(os.path.join(folder, 'nodes.py'), 'w', encoding='utf-8') as f:
+            f.write("import torch\nimport numpy as np\nfrom comfy import model_management\n")
+            f.write(f"from {name.lower()}_backend.core import Engine\n")
+            for k in range(60):
+                f.write(NODE_TEMPLATE.format(name=name, index=k))
+            f.write("NODE_CLASS_MAPPINGS = {}\nNODE_DISPLAY_NAME_MAPPINGS = {}\n")
+        with open(os.path.join(folder, 'utils.py'), 'w', encoding='utf-8') as f:
+            f.write("import os\nimport re\n" + "\n".join(f"def helper_{k}():\n    return {k}\n" for k in range(200)))
+        with open(os.path.join(folder, f"{name.lower()}_impl", '__init__.py'), 'w', encoding='utf-8') as f:
+            f.write("import torch\n")
+
+
+def legacy_mapping(custom_nodes_dir):
+    """旧实现：ast.parse + ast.walk"""
+    module_to_folder = {}
+    for folder_name in os.listdir(custom_nodes_dir):
+        init_file = os.path.join(custom_nodes_dir, folder_name, '__init__.py')
+        if not os.path.isfile(init_file):
+            continue
+        with open(init_file, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module:
+                module_to_folder[node.module.split('.')[0]] = folder_name
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    module_to_folder[alias.name.split('.')[0]] = folder_name
+    return module_to_folder
+
+
+def timed(label, func, repeat=5):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<36} {best:8.1f} ms")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    root = tempfile.mkdtemp(prefix='module_map_bench_')
+    cache_file = os.path.join(root, 'module_map_cache.json')
+    custom_nodes_dir = os.path.join(root, 'custom_nodes')
+    os.makedirs(custom_nodes_dir)
+    try:
+        make_plugins(custom_nodes_dir, count)
+        print(f"模块映射冷启动耗时（{count} 个插件，取 5 次最好成绩）")
+        timed("旧实现 ast.parse + ast.walk", lambda: legacy_mapping(custom_nodes_dir))
+        mapping, _ = timed("新实现 不跟随", lambda: module_mapping.build_module_to_folder_mapping(
+            custom_nodes_dir, follow_local=False))
+        timed("新实现 跟随包内模块", lambda: module_mapping.build_module_to_folder_mapping(
+            custom_nodes_dir, follow_local=True))
+        
+        module_mapping.build_module_to_folder_mapping(custom_nodes_dir, cache_file=cache_file)
+        timed("缓存命中", lambda: module_mapping.build_module_to_folder_mapping(
+            custom_nodes_dir, cache_file=cache_file))
+        print(f"  映射数量: {len(mapping)}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,7 @@ import { app } from "../../../scripts/app.js";
 import { api } from "../../../scripts/api.js";
 import { PLUGIN_NAME, folderState } from './modules/folder_state.js';
 import { createManagerInterface, bindEvents, injectNodePoolDeps, renderFolders } from './modules/folder_ui.js';
-import { loadConfig, initializeEventListeners, saveConfig } from './modules/folder_operations.js';
+import { loadConfig, initializeEventListeners, saveConfig, runBatchOperations } from './modules/folder_operations.js';
 import { initNodePool, nodePoolState, getUncategorizedCount, renderNodePool, updateNodePoolHeader, showNodesByPlugin, showNodesByFolder, showFavoriteNodes, showNodesByCategory, showUncategorizedNodes, showHiddenPlugins, restoreSelectedPlugins, updateSpecialFoldersCount, escapeHtml, forceCleanupPreview } from './modules/node_pool.js';
 import { initNodeEvents } from './modules/node_events.js';
 import { openModalSearch } from './modules/modal_search.js';
@@ -293,6 +293,7 @@ app.registerExtension({
                 nodePoolState,
                 renderNodePool,
                 saveConfig,
+                runBatchOperations,
                 renderFolders
             });
             
@@ -4,6 +4,7 @@
 import { api } from "../../../scripts/api.js";
 import { 
     folderState, 
+    trackConfigRevision,
     showToast, 
     showLoading,
     calculateDropTarget
@@ -14,16 +15,27 @@ import { renderFolders } from './folder_ui.js';
 const FolderAPI = {
     async getConfig() {
         const response = await api.fetchApi('/node-manager/config');
-        return await response.json();
+        return trackConfigRevision(await response.json());
     },
     
+    // 整体保存：携带修订号，配置已在其他标签页被修改时返回 409
     async saveConfig(config) {
         const response = await api.fetchApi('/node-manager/config', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ config })
+            body: JSON.stringify({ config, revision: folderState.configRevision })
         });
-        return await response.json();
+        return trackConfigRevision(await response.json());
+    },
+    
+    // 增量修改：body 为 { patch: [...] }（JSON Patch）或 { merge: {...} }（Merge Patch）
+    async patchConfig(body) {
+        const response = await api.fetchApi('/node-manager/config', {
+            method: 'PATCH',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ revision: folderState.configRevision, ...body })
+        });
+        return trackConfigRevision(await response.json());
     },
     
     async createFolder(name, parent = null) {
@@ -32,7 +44,7 @@ const FolderAPI = {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ name, parent })
         });
-        return await response.json();
+        return trackConfigRevision(await response.json());
     },
     
     async renameFolder(id, name) {
@@ -41,7 +53,7 @@ const FolderAPI = {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ id, name })
         });
-        return await response.json();
+        return trackConfigRevision(await response.json());
     },
     
     async deleteFolders(ids) {
@@ -50,7 +62,7 @@ const FolderAPI = {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ ids })
         });
-        return await response.json();
+        return trackConfigRevision(await response.json());
     },
     
     async moveFolder(id, target_parent, target_order) {
@@ -59,7 +71,7 @@ const FolderAPI = {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ id, target_parent, target_order })
         });
-        return await response.json();
+        return trackConfigRevision(await response.json());
     },
     
     async toggleFolder(id) {
@@ -68,7 +80,17 @@ const FolderAPI = {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ id })
         });
-        return await response.json();
+        return trackConfigRevision(await response.json());
+    },
+    
+    // 批量操作：operations 按顺序执行，要么全部生效要么全部不生效
+    async batch(operations) {
+        const response = await api.fetchApi('/node-manager/batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ operations })
+        });
+        return trackConfigRevision(await response.json());
     }
 };
 
@@ -139,6 +161,10 @@ async function saveConfig() {
             return true;
         } else {
             showToast('保存配置失败: ' + result.error, 'error');
+            if (result.revision !== undefined) {
+                // 配置已在其他地方被修改，重新加载最新配置
+                await loadConfig();
+            }
             return false;
         }
     } catch (error) {
@@ -148,6 +174,44 @@ async function saveConfig() {
     }
 }
 
+// 增量修改配置（修订号过期时重新加载配置）
+async function patchConfig(body) {
+    try {
+        const result = await FolderAPI.patchConfig(body);
+        
+        if (!result.success) {
+            console.error('增量修改配置失败:', result.error);
+            showToast('保存配置失败: ' + result.error, 'error');
+            if (result.revision !== undefined) {
+                // 配置已在其他地方被修改，重新加载最新配置
+                await loadConfig();
+            }
+        }
+        return result;
+    } catch (error) {
+        console.error('增量修改配置失败:', error);
+        showToast('保存配置失败', 'error');
+        return { success: false, error: error.message };
+    }
+}
+
+// 批量提交文件夹 / 节点操作（一次请求、一次保存）
+async function runBatchOperations(operations) {
+    try {
+        const result = await FolderAPI.batch(operations);
+        
+        if (!result.success) {
+            console.error('批量操作失败:', result.error, '失败位置:', result.failed_index);
+            showToast('操作失败: ' + result.error, 'error');
+        }
+        return result;
+    } catch (error) {
+        console.error('批量操作失败:', error);
+        showToast('操作失败', 'error');
+        return { success: false, error: error.message };
+    }
+}
+
 // 创建文件夹对话框
 function showCreateFolderDialog(parentId = null) {
     const dialog = document.createElement('div');
@@ -735,6 +799,8 @@ function getConfig() {
 export {
     loadConfig,
     saveConfig,
+    patchConfig,
+    runBatchOperations,
     getConfig,
     initializeEventListeners,
     showCreateFolderDialog,
@@ -6,6 +6,7 @@ const PLUGIN_NAME = "XiaoHaiNodeManager";
 // 文件夹管理状态
 const folderState = {
     config: null,
+    configRevision: null,        // 服务端配置修订号（用于增量修改 PATCH）
     selectedFolders: new Set(),
     lastSelectedFolder: null,
     draggedFolder: null,
@@ -17,6 +18,14 @@ const folderState = {
     showHiddenPlugins: false     // 是否显示隐藏的插件
 };
 
+// 记录服务端返回的配置修订号（修改配置的接口都会返回 revision）
+function trackConfigRevision(result) {
+    if (result && result.revision !== undefined) {
+        folderState.configRevision = result.revision;
+    }
+    return result;
+}
+
 // 显示提示消息
 function showToast(message, type = 'info') {
     const toast = document.createElement('div');
@@ -315,6 +324,7 @@ function showLoading(show = true) {
 export {
     PLUGIN_NAME,
     folderState,
+    trackConfigRevision,
     showToast,
     clearSelection,
     addSelection,
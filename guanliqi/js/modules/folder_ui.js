@@ -9,9 +9,13 @@ import {
     clearSelection,
     clearPluginSelection,
     addPluginSelection,
-    handlePluginSelection
+    handlePluginSelection,
+    trackConfigRevision
 } from './folder_state.js';
+import { patchConfig } from './folder_operations.js';
 import { addFolderStyles } from './folder_styles.js';
+import { fetchRegistryNodes } from './node_api.js';
+import { api } from "../../../scripts/api.js";
 
 // 节点池相关函数和状态 - 通过全局变量注入（避免循环依赖）
 let nodePoolState, getUncategorizedCount, renderNodePool, updateNodePoolHeader, escapeHtml;
@@ -397,8 +401,8 @@ function bindSearchBoxEvents() {
                     <span>⭐ 星标数</span>
                 </label>
                 <label class="nm-filter-option">
-                    <input type="radio" name="filter-sort" value="updated">
-                    <span>🕒 最近更新</span>
+                    <input type="radio" name="filter-sort" value="added">
+                    <span>🆕 最近收录</span>
                 </label>
             </div>
         `;
@@ -1808,6 +1812,12 @@ window.addEventListener('nm:nodePoolReady', () => {
     loadPluginsList();
 });
 
+// 监听后端推送的插件目录变化（安装、删除、手动拷贝插件文件夹）
+api.addEventListener('node-manager.plugins-changed', (event) => {
+    console.log('[插件列表] 插件目录已变化，重新加载:', event.detail?.changes);
+    loadPluginsList();
+});
+
 // 加载插件列表
 async function loadPluginsList() {
     try {
@@ -2594,7 +2604,7 @@ async function deletePlugins() {
             throw new Error(error.error || '删除失败');
         }
         
-        const result = await response.json();
+        const result = trackConfigRevision(await response.json());
         
         // 显示成功消息
         showToast(
@@ -2845,7 +2855,7 @@ async function togglePluginsHidden() {
             body: JSON.stringify({ pluginNames, action })
         });
         
-        const data = await response.json();
+        const data = trackConfigRevision(await response.json());
         if (data.success) {
             // 更新本地配置
             if (!folderState.config) folderState.config = {};
@@ -2879,7 +2889,7 @@ async function toggleShowHidden() {
             body: JSON.stringify({ showHidden: folderState.showHiddenPlugins })
         });
         
-        const data = await response.json();
+        const data = trackConfigRevision(await response.json());
         console.log('[显示隐藏] 服务器响应:', data);
         
         if (data.success) {
@@ -3106,21 +3116,21 @@ async function showAddPrefixDialog() {
     });
 }
 
+// 增量保存自定义节点名称（Merge Patch，值为 null 表示删除；失败时 patchConfig 已提示并重新加载配置）
+async function patchNodeCustomNames(changes) {
+    return patchConfig({ merge: { nodeCustomNames: changes } });
+}
+
 // 应用前缀
 async function applyPrefix(pluginNames, prefix, mode) {
     try {
         showToast('正在应用前缀...', 'info');
         
-        // 获取所有节点
-        const response = await fetch('/node-manager/nodes');
-        const data = await response.json();
-        
-        if (!data.success) {
-            throw new Error('获取节点列表失败');
-        }
+        // 获取所有节点（增量同步）
+        const allNodes = await fetchRegistryNodes();
         
         // 筛选出选中插件的节点
-        const affectedNodes = data.nodes.filter(node => 
+        const affectedNodes = allNodes.filter(node => 
             pluginNames.some(pluginName => {
                 // 尝试匹配插件名（包括 python_name）
                 return node.source === pluginName || 
@@ -3149,22 +3159,11 @@ async function applyPrefix(pluginNames, prefix, mode) {
             customNames[node.id] = newName;
         });
         
-        // 保存到配置
-        const saveResponse = await fetch('/node-manager/config/save', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                nodeCustomNames: {
-                    ...folderState.config.nodeCustomNames,
-                    ...customNames
-                }
-            })
-        });
-        
-        const saveResult = await saveResponse.json();
+        // 保存到配置（只提交变化的自定义名称）
+        const saveResult = await patchNodeCustomNames(customNames);
         
         if (!saveResult.success) {
-            throw new Error('保存配置失败');
+            return;
         }
         
         // 更新本地状态
@@ -3201,16 +3200,11 @@ async function removePrefix() {
     try {
         showToast('正在移除前缀...', 'info');
         
-        // 获取所有节点
-        const response = await fetch('/node-manager/nodes');
-        const data = await response.json();
-        
-        if (!data.success) {
-            throw new Error('获取节点列表失败');
-        }
+        // 获取所有节点（增量同步）
+        const allNodes = await fetchRegistryNodes();
         
         // 筛选出选中插件的节点
-        const affectedNodeIds = data.nodes
+        const affectedNodeIds = allNodes
             .filter(node => 
                 selectedPlugins.some(pluginName => {
                     return node.source === pluginName || 
@@ -3222,28 +3216,22 @@ async function removePrefix() {
         
         // 从配置中移除这些节点的自定义名称
         const newCustomNames = { ...folderState.config.nodeCustomNames };
+        const removedNames = {};
         let removedCount = 0;
         
         affectedNodeIds.forEach(nodeId => {
             if (newCustomNames[nodeId]) {
                 delete newCustomNames[nodeId];
+                removedNames[nodeId] = null;  // Merge Patch 中 null 表示删除
                 removedCount++;
             }
         });
         
-        // 保存到配置
-        const saveResponse = await fetch('/node-manager/config/save', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                nodeCustomNames: newCustomNames
-            })
-        });
-        
-        const saveResult = await saveResponse.json();
+        // 保存到配置（只提交被删除的自定义名称）
+        const saveResult = await patchNodeCustomNames(removedNames);
         
         if (!saveResult.success) {
-            throw new Error('保存配置失败');
+            return;
         }
         
         // 更新本地状态
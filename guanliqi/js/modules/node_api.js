@@ -1,24 +1,86 @@
 // js/node_api.js
 // 节点相关API调用
 
+// 注册表缓存（配合后端的 version / since 做增量同步）
+const registryCache = {
+    nodeSources: null,
+    nodeSourcesVersion: null,
+    nodes: null,          // Map: node_id -> node
+    nodesVersion: null,
+    pinyin: {}            // 随节点来源映射下发的拼音 {text: {initials, full}}
+};
+
 /**
  * 从后端获取节点到插件的映射关系
  */
 async function fetchNodeSourceMapping() {
     try {
-        const response = await fetch('/node-manager/node-sources');
+        const since = registryCache.nodeSources ? registryCache.nodeSourcesVersion : null;
+        // pinyin=1：同时下发显示名和分类的拼音，搜索时不必再请求 /search/pinyin
+        const url = since
+            ? `/node-manager/node-sources?pinyin=1&since=${encodeURIComponent(since)}`
+            : '/node-manager/node-sources?pinyin=1';
+        const response = await fetch(url);
+        
+        // 304：注册表没有变化，直接使用缓存
+        if (response.status === 304 && registryCache.nodeSources) {
+            return registryCache.nodeSources;
+        }
+        
         const data = await response.json();
         
         if (data.success) {
-            return data.node_sources || {};
+            if (data.delta && registryCache.nodeSources) {
+                // 增量：只合并新增、变化和删除的节点
+                Object.assign(registryCache.nodeSources, data.added || {}, data.changed || {});
+                (data.removed || []).forEach(nodeId => delete registryCache.nodeSources[nodeId]);
+            } else {
+                registryCache.nodeSources = data.node_sources || {};
+            }
+            Object.assign(registryCache.pinyin, data.pinyin || {});
+            registryCache.nodeSourcesVersion = data.version || null;
+            return registryCache.nodeSources;
         } else {
             console.error('获取节点来源映射失败:', data.error);
-            return {};
+            return registryCache.nodeSources || {};
         }
     } catch (error) {
         console.error('获取节点来源映射异常:', error);
-        return {};
+        return registryCache.nodeSources || {};
+    }
+}
+
+/**
+ * 从后端获取已注册节点列表（含描述），使用增量同步
+ * @returns {Promise<Array>} 节点数组
+ */
+async function fetchRegistryNodes() {
+    const since = registryCache.nodes ? registryCache.nodesVersion : null;
+    const url = since
+        ? `/node-manager/nodes?since=${encodeURIComponent(since)}`
+        : '/node-manager/nodes';
+    const response = await fetch(url);
+    
+    if (response.status === 304 && registryCache.nodes) {
+        return Array.from(registryCache.nodes.values());
+    }
+    
+    const data = await response.json();
+    if (!data.success) {
+        throw new Error(data.error || '获取节点列表失败');
     }
+    
+    if (data.delta && registryCache.nodes) {
+        [...(data.added || []), ...(data.changed || [])].forEach(node => {
+            registryCache.nodes.set(node.id, node);
+        });
+        (data.removed || []).forEach(nodeId => registryCache.nodes.delete(nodeId));
+    } else {
+        registryCache.nodes = new Map((data.nodes || []).map(node => [node.id, node]));
+    }
+    registryCache.nodesVersion = data.version || null;
+    
+    return Array.from(registryCache.nodes.values());
 }
 
 /**
@@ -95,5 +157,44 @@ async function fetchNodes() {
     }
 }
 
-export { fetchNodes };
+/**
+ * 获取服务端注册表中的节点（node_id -> node），会先做一次增量同步
+ * @returns {Promise<Map>}
+ */
+async function fetchRegistryNodeMap() {
+    await fetchRegistryNodes();
+    return registryCache.nodes;
+}
+
+/**
+ * 服务端节点搜索（/node-manager/search）
+ * @param {string} query - 关键词
+ * @param {Object} options - fields: 字段组（如 'name'），limit: 返回数量，fuzzy: 无结果时返回拼写相近的节点
+ * @returns {Promise<Array>} [{id, score, match_type, field}]，按得分排序
+ */
+async function searchNodesOnServer(query, { fields = null, limit = 50, fuzzy = false } = {}) {
+    const params = new URLSearchParams({ q: query, limit: String(limit) });
+    if (fields) {
+        params.set('fields', fields);
+    }
+    if (fuzzy) {
+        params.set('fuzzy', '1');
+    }
+    const response = await fetch(`/node-manager/search?${params}`);
+    const data = await response.json();
+    if (!data.success) {
+        throw new Error(data.error || '搜索失败');
+    }
+    return data.results;
+}
+
+/**
+ * 获取随节点来源映射下发的拼音数据
+ * @returns {Object} {text: {initials, full}}
+ */
+function getRegistryPinyin() {
+    return registryCache.pinyin;
+}
+
+export { fetchNodes, fetchRegistryNodes, fetchRegistryNodeMap, getRegistryPinyin, searchNodesOnServer };
 
@@ -5,7 +5,7 @@ import { showToast, folderState } from './folder_state.js';
 
 // 节点池和UI函数 - 通过参数注入避免循环依赖
 let showNodesByPlugin, showNodesByFolder, showFavoriteNodes, showNodesByCategory, showUncategorizedNodes, showHiddenPlugins, restoreSelectedPlugins, updateSpecialFoldersCount, nodePoolState, renderNodePool;
-let saveConfig, renderFolders;
+let saveConfig, runBatchOperations, renderFolders;
 
 /**
  * 初始化节点相关事件监听
@@ -24,6 +24,7 @@ function initNodeEvents(deps) {
         nodePoolState = deps.nodePoolState;
         renderNodePool = deps.renderNodePool;
         saveConfig = deps.saveConfig;
+        runBatchOperations = deps.runBatchOperations;
         renderFolders = deps.renderFolders;
     }
     
@@ -128,21 +129,24 @@ function initNodeEvents(deps) {
         }
         
         // 批量添加节点
-        let addedCount = 0;
+        const addedIds = [];
         let skippedCount = 0;
         
         nodeIds.forEach(nodeId => {
             if (!folderState.config.folderNodes[folderId].includes(nodeId)) {
                 folderState.config.folderNodes[folderId].push(nodeId);
-                addedCount++;
+                addedIds.push(nodeId);
             } else {
                 skippedCount++;
             }
         });
+        const addedCount = addedIds.length;
         
-        // 保存配置
+        // 保存配置（只提交新增的节点，一次请求）
         if (addedCount > 0) {
-            const success = await saveConfig();
+            const success = runBatchOperations
+                ? (await runBatchOperations([{ op: 'nodes.add', folder: folderId, nodes: addedIds }])).success
+                : await saveConfig();
             
             if (success) {
                 let message = `✅ 已添加${addedCount}个节点到文件夹`;
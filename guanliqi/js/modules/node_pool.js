@@ -1,9 +1,10 @@
 // js/node_pool.js
 // 节点池显示和管理
 
-import { fetchNodes } from './node_api.js';
-import { folderState, showToast } from './folder_state.js';
+import { fetchNodes, fetchRegistryNodeMap, getRegistryPinyin, searchNodesOnServer } from './node_api.js';
+import { folderState, showToast, trackConfigRevision } from './folder_state.js';
 import { app } from '../../../scripts/app.js';
+import { api } from '../../../scripts/api.js';
 import { openModalSearch, checkAutoCloseOnAdd } from './modal_search.js';
 
 // 节点池状态
@@ -32,7 +33,11 @@ const nodePoolState = {
     internetMode: false,        // 是否处于互联网模式
     availablePlugins: [],       // 在线可用插件列表
     internetFilter: 'all',      // 筛选：'all' | 'installed' | 'uninstalled'
-    internetSort: 'random',     // 排序：'random' | 'name' | 'updated' | 'stars'（默认随机）
+    internetSort: 'random',     // 排序：'random' | 'name' | 'added' | 'stars'（默认随机）
+    internetQuery: '',          // 在线插件搜索关键词
+    internetSeed: 0,            // 随机排序的种子（每次打开商店换一个，翻页时顺序不变）
+    internetMatched: 0,         // 符合筛选条件的插件总数
+    internetHasMore: false,     // 后端是否还有下一页
     
     searchKeyword: '',      // 当前搜索关键词
     searchResults: {        // 搜索结果
@@ -40,6 +45,7 @@ const nodePoolState = {
         folders: []
     },
     pinyinCache: {},        // 拼音数据缓存 {text: {initials, full}}
+    pinyinPreloaded: false, // 是否已预加载拼音数据
     searchHistory: [],      // 搜索历史（用于返回）
     
     // 虚拟滚动相关
@@ -65,6 +71,10 @@ async function initNodePool() {
         nodePoolState.allNodes = data.nodes;
         nodePoolState.plugins = data.plugins;
         
+        // 节点列表重新加载时同步一次服务端注册表，供名称搜索使用（搜索时不再请求）
+        registryNodeMapPromise = null;
+        loadRegistryNodeMap().catch(() => {});
+        
         console.log(`[节点池] 加载完成，共 ${data.totalCount} 个节点`);
         console.log('[节点池] 插件分组:', nodePoolState.plugins.length, '个');
         console.log('[节点池] allNodes示例:', nodePoolState.allNodes.slice(0, 3));
@@ -1906,7 +1916,7 @@ async function restorePlugin(pluginName) {
             })
         });
         
-        const data = await response.json();
+        const data = trackConfigRevision(await response.json());
         
         if (data.success) {
             // 更新本地配置
@@ -1959,7 +1969,7 @@ async function restoreSelectedPlugins() {
             })
         });
         
-        const data = await response.json();
+        const data = trackConfigRevision(await response.json());
         
         if (data.success) {
             // 更新本地配置
@@ -3053,7 +3063,7 @@ async function performSearch(keyword, inSidebar = false, mode = 'all') {
     }
     
     // 预加载拼音数据（如果包含中文关键词或第一次搜索）
-    if (Object.keys(nodePoolState.pinyinCache).length === 0 || /[\u4e00-\u9fa5]/.test(keyword)) {
+    if (!nodePoolState.pinyinPreloaded || /[\u4e00-\u9fa5]/.test(keyword)) {
         await preloadPinyinData();
     }
     
@@ -3069,6 +3079,105 @@ async function performSearch(keyword, inSidebar = false, mode = 'all') {
     }
 }
 
+// 服务端名称搜索最多返回的节点数
+const SERVER_SEARCH_LIMIT = 2000;
+
+// 服务端注册表中的节点（node_id -> node），节点池加载时获取，失败时下次搜索再重试
+let registryNodeMapPromise = null;
+
+function loadRegistryNodeMap() {
+    if (!registryNodeMapPromise) {
+        registryNodeMapPromise = fetchRegistryNodeMap().catch(error => {
+            registryNodeMapPromise = null;
+            throw error;
+        });
+    }
+    return registryNodeMapPromise;
+}
+
+/**
+ * 在本地逐个匹配节点名称（支持拼音）
+ * 与服务端搜索一致：空格分隔的多个词之间为"且"关系，得分为各词得分之和
+ */
+function matchNodeNamesLocally(nodes, keyword) {
+    const terms = [...new Set(keyword.toLowerCase().split(/\s+/).filter(Boolean))];
+    const results = [];
+    nodes.forEach(node => {
+        const displayName = getNodeDisplayName(node);
+        let score = 0;
+        let best = null;
+        for (const term of terms) {
+            const match = matchText(displayName, term);
+            if (!match.matched) {
+                return;
+            }
+            score += match.score;
+            if (!best || match.score > best.score) {
+                best = match;
+            }
+        }
+        
+        if (best) {
+            results.push({
+                type: 'node',
+                node,
+                score,
+                matchedFields: ['name'],
+                matchType: best.type
+            });
+        }
+    });
+    return results;
+}
+
+/**
+ * 搜索节点名称
+ * 显示名与服务端一致的节点交给 /node-manager/search 的索引匹配，
+ * 只有前端改过标题的节点（如界面翻译）在本地匹配；服务端不可用时全部在本地匹配
+ * 没有匹配时服务端会返回拼写相近的节点（matchType 为 fuzzy）
+ */
+async function searchNodeNames(keyword) {
+    let remoteResults;
+    let registryNodes;
+    try {
+        [remoteResults, registryNodes] = await Promise.all([
+            searchNodesOnServer(keyword, { fields: 'name', limit: SERVER_SEARCH_LIMIT, fuzzy: true }),
+            loadRegistryNodeMap()
+        ]);
+    } catch (error) {
+        console.warn('[搜索] 服务端搜索不可用，改用本地搜索:', error);
+        return matchNodeNamesLocally(nodePoolState.allNodes, keyword);
+    }
+    
+    const customNames = folderState.config?.nodeCustomNames || {};
+    const localNodes = [];
+    const indexedNodes = new Map();
+    nodePoolState.allNodes.forEach(node => {
+        const registryNode = registryNodes.get(node.id);
+        const serverName = registryNode && (customNames[node.id] || registryNode.display_name);
+        if (serverName && serverName === getNodeDisplayName(node)) {
+            indexedNodes.set(node.id, node);
+        } else {
+            localNodes.push(node);
+        }
+    });
+    
+    const results = [];
+    remoteResults.forEach(result => {
+        const node = indexedNodes.get(result.id);
+        if (node) {
+            results.push({
+                type: 'node',
+                node,
+                score: result.score,
+                matchedFields: ['name'],
+                matchType: result.match_type
+            });
+        }
+    });
+    return results.concat(matchNodeNamesLocally(localNodes, keyword));
+}
+
 /**
  * 搜索节点、文件夹和插件（支持拼音）
  * @param {string} keyword - 搜索关键词
@@ -3079,20 +3188,7 @@ async function searchNodes(keyword, mode = 'all') {
     
     // 节点模式：只搜索节点名称
     if (mode === 'node') {
-        nodePoolState.allNodes.forEach(node => {
-            const displayName = getNodeDisplayName(node);
-            const match = matchText(displayName, keyword);
-            
-            if (match.matched) {
-                results.push({
-                    type: 'node',
-                    node,
-                    score: match.score,
-                    matchedFields: ['name'],
-                    matchType: match.type
-                });
-            }
-        });
+        results.push(...await searchNodeNames(keyword));
         
         // 排序并返回
         return results.sort((a, b) => b.score - a.score);
@@ -3101,20 +3197,7 @@ async function searchNodes(keyword, mode = 'all') {
     // 综合模式或文件夹模式：搜索节点名称（仅综合模式）、文件夹、插件
     // 1. 搜索节点名称（仅综合模式）
     if (mode === 'all') {
-        nodePoolState.allNodes.forEach(node => {
-            const displayName = getNodeDisplayName(node);
-            const match = matchText(displayName, keyword);
-            
-            if (match.matched) {
-                results.push({
-                    type: 'node',
-                    node,
-                    score: match.score,
-                    matchedFields: ['name'],
-                    matchType: match.type
-                });
-            }
-        });
+        results.push(...await searchNodeNames(keyword));
     }
     
     // 2. 搜索自定义文件夹名称（综合模式和文件夹模式）
@@ -3924,7 +4007,7 @@ function initSidebarSearch() {
         }
         
         // 预加载拼音数据（如果需要）
-        if (Object.keys(nodePoolState.pinyinCache).length === 0) {
+        if (!nodePoolState.pinyinPreloaded) {
             await preloadPinyinData();
         }
         
@@ -3942,7 +4025,7 @@ function initSidebarSearch() {
         if (!keyword || !callback) return;
         
         // 预加载拼音数据（如果需要）
-        if (Object.keys(nodePoolState.pinyinCache).length === 0) {
+        if (!nodePoolState.pinyinPreloaded) {
             await preloadPinyinData();
         }
         
@@ -3999,6 +4082,10 @@ async function fetchPinyinData(texts) {
  * 预加载拼音数据（节点和文件夹名称）
  */
 async function preloadPinyinData() {
+    // 节点来源映射已附带注册表中名称的拼音，先合并，只请求剩余的文本
+    Object.assign(nodePoolState.pinyinCache, getRegistryPinyin());
+    nodePoolState.pinyinPreloaded = true;
+    
     const texts = [];
     
     // 收集所有需要拼音的文本
@@ -4091,7 +4178,7 @@ async function performSidebarSearch(keyword) {
     renderNodePool([]);
     
     // 预加载拼音数据（如果还没加载）
-    if (Object.keys(nodePoolState.pinyinCache).length === 0) {
+    if (!nodePoolState.pinyinPreloaded) {
         await preloadPinyinData();
     }
     
@@ -4522,8 +4609,43 @@ function openSidebarSearch() {
 
 // ========== 互联网模式相关函数 ==========
 
+// 在线插件每页数量（后端分页、筛选和排序，首屏只需要一页）
+const ONLINE_PAGE_SIZE = 60;
+
+// 最近一次在线插件请求的序号：快速切换筛选或输入搜索时，丢弃过期请求的结果
+let onlineRequestSeq = 0;
+
 /**
- * 加载在线可用插件列表（后端有缓存，直接请求即可）
+ * 请求一页在线插件（按当前的搜索、筛选和排序）
+ */
+async function fetchOnlinePluginsPage(offset, forceRefresh = false) {
+    const params = new URLSearchParams({
+        offset: String(offset),
+        limit: String(ONLINE_PAGE_SIZE),
+        sort: nodePoolState.internetSort,
+        installed: nodePoolState.internetFilter
+    });
+    if (nodePoolState.internetSort === 'random') {
+        params.set('seed', String(nodePoolState.internetSeed));
+    }
+    if (nodePoolState.internetQuery) {
+        params.set('q', nodePoolState.internetQuery);
+    }
+    // 添加时间戳：让后端在后台刷新插件列表（接口立即返回当前列表，刷新完成后推送 catalog-updated）
+    if (forceRefresh) {
+        params.set('t', String(Date.now()));
+    }
+    
+    const response = await fetch(`/node-manager/store/available-plugins?${params}`);
+    const data = await response.json();
+    if (!data.success) {
+        throw new Error(data.error || '获取插件列表失败');
+    }
+    return data;
+}
+
+/**
+ * 加载在线可用插件列表（只请求第一页）
  */
 async function loadAvailablePlugins(forceRefresh = true) {
     try {
@@ -4538,31 +4660,32 @@ async function loadAvailablePlugins(forceRefresh = true) {
             `;
         }
         
-        // 每次都强制刷新（添加时间戳绕过缓存）
-        const timestamp = forceRefresh ? `?t=${Date.now()}` : '';
-        const response = await fetch(`/node-manager/store/available-plugins${timestamp}`);
-        const data = await response.json();
+        // 🎲 每次打开商店换一个随机种子：顺序每次不同，所有插件都有机会被优先刷新
+        if (forceRefresh) {
+            nodePoolState.internetSeed = Math.floor(Math.random() * 2147483647);
+            nodePoolState.internetQuery = '';
+        }
         
-        if (!data.success) {
-            throw new Error(data.error || '获取插件列表失败');
+        const requestSeq = ++onlineRequestSeq;
+        const data = await fetchOnlinePluginsPage(0, forceRefresh);
+        if (requestSeq !== onlineRequestSeq) {
+            return;
         }
         
         nodePoolState.availablePlugins = data.plugins || [];
+        nodePoolState.internetMatched = data.matched_count || 0;
+        nodePoolState.internetHasMore = !!data.has_more;
         nodePoolState.internetMode = true;
         
-        // 🎲 随机打乱插件顺序：让每次打开都不同，所有插件都有机会被优先刷新
-        shuffleArray(nodePoolState.availablePlugins);
-        
-        // 日志：让用户知道确实在随机刷新
-        console.log('[互联网] 插件列表加载完成，总数:', nodePoolState.availablePlugins.length);
-        console.log('[互联网] 🎲 已随机打乱顺序，每次点击都会看到不同的排序结果');
+        console.log('[互联网] 插件列表加载完成，总数:', data.total_count, '首屏:', nodePoolState.availablePlugins.length);
         if (data.stars_stats) {
             const { local, manager, none } = data.stars_stats;
             // Stars数据来源统计（静默）
         }
         
         // 直接显示在线插件（已包含合并后的stars数据：本地 > Manager > 0）
-        showOnlinePlugins();
+        updateNodePoolHeader(`🌐 互联网插件`, nodePoolState.internetMatched);
+        renderOnlinePlugins(nodePoolState.availablePlugins);
         
         // 启动懒加载：优先更新可见插件，后台更新其他插件
         setTimeout(() => {
@@ -4592,70 +4715,127 @@ async function loadAvailablePlugins(forceRefresh = true) {
     }
 }
 
+// 后端在后台刷新完插件列表后推送通知：列表有变化且正在浏览在线插件时重新加载（不带时间戳，直接取新列表）
+api.addEventListener('node-manager.catalog-updated', (event) => {
+    const detail = event.detail || {};
+    if (!detail.success) {
+        console.warn('[互联网] 后台刷新插件列表失败:', detail.error);
+        return;
+    }
+    const internetBtn = document.getElementById('nm-search-mode-internet');
+    if (detail.changed && nodePoolState.internetMode && internetBtn?.classList.contains('active')) {
+        console.log('[互联网] 插件列表已更新，重新加载，总数:', detail.total_count);
+        loadAvailablePlugins(false);
+    }
+});
+
 /**
- * 显示在线插件列表
+ * 显示在线插件列表（搜索、筛选和排序由后端完成，只请求第一页）
  */
-function showOnlinePlugins(searchQuery = '') {
+async function showOnlinePlugins(searchQuery = '') {
     console.log('[互联网] 显示在线插件, 搜索:', searchQuery);
+    nodePoolState.internetQuery = searchQuery;
     
-    let plugins = [...nodePoolState.availablePlugins];
-    
-    // 应用搜索过滤
-    if (searchQuery) {
-        const query = searchQuery.toLowerCase();
-        plugins = plugins.filter(plugin => {
-            const title = (plugin.title || '').toLowerCase();
-            const description = (plugin.description || '').toLowerCase();
-            const author = (plugin.author || '').toLowerCase();
-            return title.includes(query) || description.includes(query) || author.includes(query);
-        });
+    const requestSeq = ++onlineRequestSeq;
+    let data;
+    try {
+        data = await fetchOnlinePluginsPage(0);
+    } catch (error) {
+        console.error('[互联网] 获取插件列表失败:', error);
+        showToast(`获取插件列表失败: ${error.message}`, 'error');
+        return;
     }
-    
-    // 应用安装状态过滤
-    if (nodePoolState.internetFilter === 'installed') {
-        plugins = plugins.filter(p => p.is_installed);
-    } else if (nodePoolState.internetFilter === 'uninstalled') {
-        plugins = plugins.filter(p => !p.is_installed);
-    }
-    
-    // 应用排序（random = 保持随机打乱的顺序，不排序）
-    if (nodePoolState.internetSort !== 'random') {
-        plugins.sort((a, b) => {
-            switch (nodePoolState.internetSort) {
-                case 'name':
-                    return (a.title || '').localeCompare(b.title || '');
-                case 'updated':
-                    return (b.updated_at || 0) - (a.updated_at || 0);
-                case 'stars':
-                    return (b.stars || 0) - (a.stars || 0);
-                default:
-                    return 0;
-            }
-        });
-    } else {
-        console.log('[互联网] 🎲 使用随机排序，保持打乱后的顺序');
+    if (requestSeq !== onlineRequestSeq) {
+        return;
     }
     
+    nodePoolState.availablePlugins = data.plugins || [];
+    nodePoolState.internetMatched = data.matched_count || 0;
+    nodePoolState.internetHasMore = !!data.has_more;
+    
     // 更新header
-    updateNodePoolHeader(`🌐 互联网插件`, plugins.length);
+    updateNodePoolHeader(`🌐 互联网插件`, nodePoolState.internetMatched);
     
     // 渲染插件列表
-    renderOnlinePlugins(plugins);
+    renderOnlinePlugins(nodePoolState.availablePlugins);
     
     // 触发懒加载：更新当前显示的插件
+    const plugins = nodePoolState.availablePlugins;
+    setTimeout(() => {
+        onPluginListChanged(plugins);
+    }, 100);
+}
+
+/**
+ * 加载下一页在线插件，追加到列表末尾
+ */
+async function loadMoreOnlinePlugins() {
+    const requestSeq = ++onlineRequestSeq;
+    let data;
+    try {
+        data = await fetchOnlinePluginsPage(nodePoolState.availablePlugins.length);
+    } catch (error) {
+        console.error('[互联网] 加载更多插件失败:', error);
+        showToast(`加载更多插件失败: ${error.message}`, 'error');
+        renderLoadMoreButton();
+        return;
+    }
+    if (requestSeq !== onlineRequestSeq) {
+        return;
+    }
+    
+    const plugins = data.plugins || [];
+    nodePoolState.availablePlugins.push(...plugins);
+    nodePoolState.internetMatched = data.matched_count || 0;
+    nodePoolState.internetHasMore = !!data.has_more;
+    
+    renderOnlinePlugins(plugins, true);
     setTimeout(() => {
         onPluginListChanged(plugins);
     }, 100);
 }
 
 /**
- * 渲染在线插件卡片
+ * 渲染"加载更多"按钮（后端还有下一页时）
+ */
+function renderLoadMoreButton() {
+    const poolBody = document.getElementById('nm-node-pool-body');
+    if (!poolBody) return;
+    
+    poolBody.querySelector('.nm-online-load-more')?.remove();
+    if (!nodePoolState.internetHasMore) {
+        return;
+    }
+    
+    const button = document.createElement('button');
+    button.className = 'nm-online-load-more';
+    button.textContent = `加载更多（已显示 ${nodePoolState.availablePlugins.length} / ${nodePoolState.internetMatched}）`;
+    button.style.cssText = `
+        display: block;
+        margin: 16px auto;
+        padding: 8px 16px;
+        border: 1px solid var(--border-color);
+        border-radius: 6px;
+        background: var(--comfy-input-bg);
+        color: var(--input-text);
+        cursor: pointer;
+    `;
+    button.addEventListener('click', () => {
+        button.disabled = true;
+        button.textContent = '⏳ 加载中...';
+        loadMoreOnlinePlugins();
+    });
+    poolBody.appendChild(button);
+}
+
+/**
+ * 渲染在线插件列表（append=true 时追加到已有列表末尾）
  */
-function renderOnlinePlugins(plugins) {
+function renderOnlinePlugins(plugins, append = false) {
     const poolBody = document.getElementById('nm-node-pool-body');
     if (!poolBody) return;
     
-    if (plugins.length === 0) {
+    if (plugins.length === 0 && !append) {
         poolBody.innerHTML = `
             <div class="nm-empty-state">
                 <div class="nm-empty-state-icon">🔍</div>
@@ -4665,13 +4845,17 @@ function renderOnlinePlugins(plugins) {
         return;
     }
     
-    poolBody.innerHTML = '';
+    if (!append) {
+        poolBody.innerHTML = '';
+    }
     
     plugins.forEach(plugin => {
         const card = createOnlinePluginCard(plugin);
         poolBody.appendChild(card);
     });
     
+    renderLoadMoreButton();
+    
     // Stars数据由后端管理，无需前端处理
 }
 
@@ -4779,18 +4963,6 @@ async function installOnlinePlugin(button, plugin) {
 window.nodePoolState = nodePoolState;
 window.nodePoolState.reloadOnlinePlugins = loadAvailablePlugins;
 
-/**
- * 随机打乱数组（Fisher-Yates 洗牌算法）
- * 让每次打开插件商店都有不同的顺序，所有插件都有机会被优先刷新
- */
-function shuffleArray(array) {
-    for (let i = array.length - 1; i > 0; i--) {
-        const j = Math.floor(Math.random() * (i + 1));
-        [array[i], array[j]] = [array[j], array[i]];
-    }
-    return array;
-}
-
 /**
  * ===============================
  * 懒加载Stars刷新系统
@@ -4820,6 +4992,10 @@ const lazyLoadState = {
  * 提取插件的repo_key
  */
 function extractRepoKey(plugin) {
+    // 后端建立插件库索引时已统一计算仓库键
+    if (plugin.repo_key !== undefined) {
+        return plugin.repo_key;
+    }
     const githubUrl = plugin.reference || '';
     if (!githubUrl.startsWith('https://github.com/')) {
         return null;
@@ -0,0 +1,304 @@
+"""
+模块名到插件文件夹名的映射
+
+只扫描 import 语句（str.find 定位关键字后逐行正则匹配，不做完整的 AST 解析），解析结果按文件的 (mtime, 大小) 缓存，
+可选地跟随 __init__.py 直接导入的包内模块（只跟随一层），以找到节点实际所在子模块导入的顶层模块名
+
+本模块不依赖 ComfyUI，可以单独导入（见 bench_module_mapping.py）
+"""
+import os
+import re
+import sys
+import json
+import logging
+import tempfile
+
+logger = logging.getLogger("XiaoHaiNodeManager")
+
+CACHE_FORMAT = 2
+
+# 每个文件最多扫描的字节数（import 语句基本都在文件开头）
+MAX_SCAN_BYTES = 512 * 1024
+
+# 标准库模块不可能是插件的模块名，不参与映射
+STDLIB_MODULES = frozenset(getattr(sys, 'stdlib_module_names', ())) | {'__future__'}
+
+# 以 from / import 开头的一行（允许缩进，函数内的延迟导入也算）
+_IMPORT_LINE_RE = re.compile(
+    r'[ \t]*(?:'
+    r'from[ \t]+(\.*)[ \t]*([A-Za-z_][\w.]*)?[ \t]+import[ \t]*(\([^)]*\)|[^\n#;]*)'
+    r'|import[ \t]+([^\n#;]+))'
+)
+
+_NAME_RE = re.compile(r'[A-Za-z_][\w.]*')
+_COMMENT_RE = re.compile(r'#[^\n]*')
+
+
+def iter_import_statements(source):
+    """
+    逐个返回 import 语句的匹配结果
+    先用 str.find 定位 "import" 关键字，只对所在行做正则匹配；
+    位于三引号字符串（文档字符串）中的行按引号计数跳过
+    """
+    pos = 0
+    checked = 0
+    last_line = -1
+    double_quotes = single_quotes = 0
+    while True:
+        index = source.find('import', pos)
+        if index < 0:
+            return
+        pos = index + 6
+        line_start = source.rfind('\n', 0, index) + 1
+        if line_start == last_line:
+            continue
+        last_line = line_start
+        double_quotes += source.count('"""', checked, line_start)
+        single_quotes += source.count("'''", checked, line_start)
+        checked = line_start
+        if double_quotes % 2 or single_quotes % 2:
+            continue
+        match = _IMPORT_LINE_RE.match(source, line_start)
+        if match:
+            yield match
+
+
+def scan_imports(source):
+    """
+    扫描源码中的 import 语句
+    返回 (absolute, relative)：
+      absolute - 绝对导入的完整模块名列表（按出现顺序去重）
+      relative - 一级相对导入的包内模块路径列表，如 from .nodes.core import X -> 'nodes.core'，
+                 from . import utils -> 'utils'
+    """
+    absolute = []
+    relative = []
+    
+    for match in iter_import_statements(source):
+        dots, module, imported, plain = match.groups()
+        if plain is not None:
+            # import a.b as c, d
+            for part in plain.split(','):
+                name = _NAME_RE.match(part.strip())
+                if name:
+                    absolute.append(name.group(0))
+        elif dots:
+            # 只跟随当前包内的模块（from .. import 指向包外）
+            if len(dots) != 1:
+                continue
+            if module:
+                relative.append(module)
+            else:
+                for part in _COMMENT_RE.sub('', imported).strip('()').split(','):
+                    name = _NAME_RE.match(part.strip())
+                    if name and '.' not in name.group(0):
+                        relative.append(name.group(0))
+        elif module:
+            absolute.append(module)
+    
+    return list(dict.fromkeys(absolute)), list(dict.fromkeys(relative))
+
+
+def top_level_modules(modules):
+    """完整模块名 -> 去掉标准库后的顶层模块名（按顺序去重）"""
+    result = []
+    for module in modules:
+        top = module.split('.')[0]
+        if top and top not in STDLIB_MODULES:
+            result.append(top)
+    return list(dict.fromkeys(result))
+
+
+def _read_source(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read(MAX_SCAN_BYTES)
+
+
+def _file_stat(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def resolve_local_module(folder_path, dotted):
+    """包内模块路径 -> 文件路径（a.b -> a/b.py 或 a/b/__init__.py），不存在时返回 None"""
+    base = os.path.join(folder_path, *dotted.split('.'))
+    for candidate in (base + '.py', os.path.join(base, '__init__.py')):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def scan_plugin(folder_path, follow_local=False):
+    """
+    扫描一个插件文件夹，返回缓存条目：
+      files            - {相对路径: [mtime_ns, 大小]}，用于判断缓存是否失效
+      modules          - __init__.py 导入的顶层模块名
+      followed_modules - 跟随的包内模块导入的顶层模块名（优先级低于 modules）
+    __init__.py 不存在时返回 None
+    """
+    init_file = os.path.join(folder_path, '__init__.py')
+    try:
+        files = {'__init__.py': _file_stat(init_file)}
+    except OSError:
+        return None
+    
+    absolute, relative = scan_imports(_read_source(init_file))
+    entry = {
+        'path': init_file,
+        'files': files,
+        'modules': top_level_modules(absolute),
+        'followed_modules': []
+    }
+    
+    if not follow_local:
+        return entry
+    
+    # 相对导入的包内模块，以及与包内文件同名的绝对导入（插件把自身目录加入 sys.path 的情况）
+    targets = relative + [name for name in absolute if '.' not in name]
+    followed = []
+    for dotted in dict.fromkeys(targets):
+        path = resolve_local_module(folder_path, dotted)
+        if path is None or path == init_file:
+            continue
+        rel_path = os.path.relpath(path, folder_path).replace(os.sep, '/')
+        if rel_path in files:
+            continue
+        try:
+            files[rel_path] = _file_stat(path)
+            followed.extend(scan_imports(_read_source(path))[0])
+        except OSError as e:
+            logger.debug(f"读取 {path} 失败: {e}")
+    
+    primary = set(entry['modules'])
+    entry['followed_modules'] = [m for m in top_level_modules(followed) if m not in primary]
+    return entry
+
+
+def entry_is_current(entry, folder_path):
+    """缓存条目记录的所有文件 (mtime, 大小) 都未变化时返回 True"""
+    if not entry or entry.get('path') != os.path.join(folder_path, '__init__.py'):
+        return False
+    try:
+        for rel_path, recorded in entry.get('files', {}).items():
+            if _file_stat(os.path.join(folder_path, *rel_path.split('/'))) != recorded:
+                return False
+    except OSError:
+        return False
+    return True
+
+
+def load_cache(cache_file, follow_local):
+    """读取缓存 {文件夹名: 条目}；格式或跟随选项不一致时视为空"""
+    if not cache_file:
+        return {}
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') == CACHE_FORMAT and data.get('follow_local') == follow_local:
+            return data.get('entries', {})
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.debug(f"读取模块映射缓存失败: {e}")
+    return {}
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp',
+                                    dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def save_cache(cache_file, entries, follow_local, write_file=None):
+    try:
+        data = json.dumps({'format': CACHE_FORMAT, 'follow_local': follow_local, 'entries': entries},
+                          ensure_ascii=False)
+        (write_file or _write_atomic)(cache_file, data.encode('utf-8'))
+    except Exception as e:
+        logger.debug(f"保存模块映射缓存失败: {e}")
+
+
+def _list_plugin_folders(custom_nodes_dir):
+    folders = []
+    with os.scandir(custom_nodes_dir) as it:
+        for item in it:
+            # 跳过隐藏文件夹和 __pycache__
+            if item.name.startswith('.') or item.name == '__pycache__':
+                continue
+            try:
+                if item.is_dir():
+                    folders.append(item.name)
+            except OSError:
+                continue
+    return folders
+
+
+def build_module_to_folder_mapping(custom_nodes_dir, cache_file=None, follow_local=False, write_file=None):
+    """
+    扫描 custom_nodes 目录，建立模块名到文件夹名的映射
+    用于处理文件夹名和模块名不一致的情况（如 bizyair -> bizyengine）
+    返回 (映射, 统计信息)
+    """
+    stats = {'plugins': 0, 'parsed': 0}
+    module_to_folder = {}
+    
+    if not os.path.isdir(custom_nodes_dir):
+        return module_to_folder, stats
+    
+    cache = load_cache(cache_file, follow_local)
+    
+    def scan(folder_name):
+        try:
+            return scan_plugin(os.path.join(custom_nodes_dir, folder_name), follow_local)
+        except Exception as e:
+            logger.debug(f"分析插件 {folder_name} 时出错: {e}")
+            return None
+    
+    try:
+        folders = _list_plugin_folders(custom_nodes_dir)
+        # 先校验缓存，只重新扫描文件有变化的插件
+        results = {}
+        misses = []
+        for folder_name in folders:
+            entry = cache.get(folder_name)
+            if entry_is_current(entry, os.path.join(custom_nodes_dir, folder_name)):
+                results[folder_name] = entry
+            else:
+                misses.append(folder_name)
+        
+        scanned = [scan(folder_name) for folder_name in misses]
+        for folder_name, entry in zip(misses, scanned):
+            results[folder_name] = entry
+        stats['parsed'] = sum(1 for entry in scanned if entry is not None)
+    except Exception as e:
+        logger.error(f"建立模块映射时出错: {e}")
+        return module_to_folder, stats
+    
+    # 按目录顺序组装，同名模块以最后一个文件夹为准
+    entries = {}
+    for folder_name in folders:
+        entry = results.get(folder_name)
+        if entry is not None:
+            entries[folder_name] = entry
+            for module in entry['modules']:
+                module_to_folder[module] = folder_name
+    
+    # 跟随模块导入的名称只补充 __init__.py 中没有出现过的
+    for folder_name, entry in entries.items():
+        for module in entry.get('followed_modules', ()):
+            module_to_folder.setdefault(module, folder_name)
+    
+    stats['plugins'] = len(entries)
+    if cache_file and (stats['parsed'] or entries.keys() != cache.keys()):
+        save_cache(cache_file, entries, follow_local, write_file)
+    
+    return module_to_folder, stats
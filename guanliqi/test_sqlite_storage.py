@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+测试 SQLite 存储后端的启动导入
+
+把插件复制到临时目录的 custom_nodes/ 下（不会改动真实的 data/），以 NODE_MANAGER_STORAGE=sqlite 导入插件，检查：
+  1. 首次运行时已有的 plugins_database.json 能完整导入，并记录导入标记
+  2. 旧版（以列表下标为主键）的 catalog_plugins 表能迁移，不会退回 JSON 存储
+
+用法: python test_sqlite_storage.py <ComfyUI 根目录>
+"""
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import asyncio
+import tempfile
+import importlib.util
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PLUGINS = [
+    {'title': 'Impact Pack', 'reference': 'https://github.com/ltdrdata/ComfyUI-Impact-Pack.git'},
+    {'title': 'Local Plugin', 'reference': 'file:///plugins/local'},
+    {'title': 'Impact Pack (mirror)', 'reference': 'https://github.com/ltdrdata/ComfyUI-Impact-Pack'},
+]
+PLUGINS_DB = {
+    'plugins': PLUGINS,
+    'stars_db': {'ltdrdata/ComfyUI-Impact-Pack': 2000},
+    'last_update': '2024-01-01T00:00:00'
+}
+
+
+def prepare_plugin(root):
+    """复制插件到 root/custom_nodes/node_manager_test，返回插件目录"""
+    target = os.path.join(root, 'custom_nodes', 'node_manager_test')
+    shutil.copytree(PLUGIN_DIR, target, ignore=shutil.ignore_patterns('data', '__pycache__', '.git'))
+    os.makedirs(os.path.join(target, 'data'))
+    return target
+
+
+def import_plugin(plugin_dir, name):
+    """以 SQLite 后端导入插件模块（检查完成后调用 module.storage.close()）"""
+    os.environ['NODE_MANAGER_STORAGE'] = 'sqlite'
+    os.environ['NODE_MANAGER_AUTO_INSTALL'] = '0'
+    os.environ['NODE_MANAGER_WATCH'] = '0'
+    spec = importlib.util.spec_from_file_location(name, os.path.join(plugin_dir, '__init__.py'),
+                                                  submodule_search_locations=[plugin_dir])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def check(label, condition):
+    print(f"  {'✓' if condition else '❌'} {label}")
+    return condition
+
+
+def test_json_import(root):
+    print("\n1. 首次运行导入 plugins_database.json")
+    plugin_dir = prepare_plugin(root)
+    with open(os.path.join(plugin_dir, 'data', 'plugins_database.json'), 'w', encoding='utf-8') as f:
+        json.dump(PLUGINS_DB, f, ensure_ascii=False)
+
+    # 检查插件启动时创建的存储，不重新打开数据库（重新打开会再次尝试导入）
+    module = import_plugin(plugin_dir, 'node_manager_test_import')
+    storage = module.storage
+    data = storage.load_plugins_database() or {}
+    imported = None
+    if storage.name == 'sqlite':
+        with storage._db_lock:
+            imported = storage._get_meta('imported_plugins_db')
+    storage.close()
+
+    ok = check("使用 SQLite 存储", module.storage.name == 'sqlite')
+    ok &= check("插件列表完整且顺序不变", data.get('plugins') == PLUGINS)
+    ok &= check("stars_db 已导入", data.get('stars_db') == PLUGINS_DB['stars_db'])
+    ok &= check("已记录导入标记", imported == '1')
+    return ok
+
+
+def test_legacy_table(root):
+    print("\n2. 迁移旧版 catalog_plugins 表")
+    plugin_dir = prepare_plugin(root)
+    conn = sqlite3.connect(os.path.join(plugin_dir, 'data', 'node_manager.db'))
+    with conn:
+        conn.execute('CREATE TABLE catalog_plugins (key INTEGER PRIMARY KEY, value TEXT NOT NULL)')
+        conn.executemany('INSERT INTO catalog_plugins (key, value) VALUES (?, ?)',
+                         [(i, json.dumps(plugin)) for i, plugin in enumerate(PLUGINS)])
+    conn.close()
+
+    module = import_plugin(plugin_dir, 'node_manager_test_legacy')
+    storage = module.storage
+    data = storage.load_plugins_database() or {}
+    keys = sorted(storage._cached_rows('catalog_plugins')) if storage.name == 'sqlite' else []
+    storage.close()
+
+    ok = check("使用 SQLite 存储（没有退回 JSON）", module.storage.name == 'sqlite')
+    ok &= check("插件列表完整且顺序不变", data.get('plugins') == PLUGINS)
+    ok &= check("行键为仓库键", keys == ['file:///plugins/local', 'ltdrdata/ComfyUI-Impact-Pack',
+                                        'ltdrdata/ComfyUI-Impact-Pack#2'])
+    return ok
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return False
+    comfyui_root = os.path.abspath(sys.argv[1])
+    sys.path.insert(0, comfyui_root)
+
+    import server
+    if getattr(server.PromptServer, 'instance', None) is None:
+        server.PromptServer(asyncio.new_event_loop())
+
+    print("=" * 60)
+    print("SQLite 存储启动导入测试")
+    print("=" * 60)
+
+    ok = True
+    for test in (test_json_import, test_legacy_table):
+        root = tempfile.mkdtemp(prefix='node_manager_sqlite_')
+        try:
+            ok &= test(root)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print("\n" + ("✅ 全部通过" if ok else "❌ 存在失败项"))
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)